@@ -0,0 +1,208 @@
+"""
+ADMISSION CONTROL
+Rate limits and concurrency caps for the LLM-backed endpoints
+
+Chat, debate and quest generation pass through `admit()` before doing any
+work. Requests are refused fast with a 429 and Retry-After instead of
+queueing behind a flood of LLM calls:
+
+- Token buckets in Redis (one global, one per player) cap the rate of LLM
+  work across every replica. Both are checked and charged in one Lua call,
+  so a request refused by one bucket doesn't spend tokens in the other.
+- Each endpoint has a per-process concurrency cap. Requests wait for a slot
+  only up to ADMISSION_QUEUE_TIMEOUT, and only while the wait line is short.
+
+Health, status and admin routes never go through admission, so they stay
+responsive while the expensive endpoints are shedding load.
+"""
+
+import os
+import math
+import time
+import asyncio
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException
+
+from store import get_redis
+from logs import get_logger
+from metrics import ADMISSION_REJECTED
+from personas import persona_registry
+
+log = get_logger(__name__)
+
+# =============================================================================
+# CONFIGURATION
+# =============================================================================
+
+# LLM calls per minute, and how many may burst at once
+GLOBAL_RATE_PER_MIN = float(os.getenv("GLOBAL_RATE_PER_MIN", 120))
+GLOBAL_BURST = int(os.getenv("GLOBAL_BURST", 30))
+PLAYER_RATE_PER_MIN = float(os.getenv("PLAYER_RATE_PER_MIN", 6))
+PLAYER_BURST = int(os.getenv("PLAYER_BURST", 3))
+
+# Longest a request may wait for a concurrency slot before it is shed
+ADMISSION_QUEUE_TIMEOUT = float(os.getenv("ADMISSION_QUEUE_TIMEOUT", 2))
+
+
+@dataclass(frozen=True)
+class EndpointLimit:
+    concurrency: int   # Requests handled at once per process
+    max_waiting: int   # Requests allowed to wait for a slot
+    cost: int          # LLM calls charged to the token buckets
+
+
+ENDPOINT_LIMITS: Dict[str, EndpointLimit] = {
+    "chat": EndpointLimit(int(os.getenv("CHAT_CONCURRENCY", 16)), 32, cost=1),
+    # A debate asks every debating persona once
+    "debate": EndpointLimit(int(os.getenv("DEBATE_CONCURRENCY", 2)), 2, cost=max(1, len(persona_registry.debaters))),
+    "quest": EndpointLimit(int(os.getenv("QUEST_CONCURRENCY", 8)), 16, cost=1),
+}
+
+# =============================================================================
+# TOKEN BUCKETS
+# =============================================================================
+
+# KEYS: bucket keys. ARGV: now, cost, then rate/capacity per key.
+# Returns {allowed, seconds until the cost would fit} (wait as a string;
+# Lua numbers are truncated to integers on the way out).
+TOKEN_BUCKET_LUA = """
+local now = tonumber(ARGV[1])
+local cost = tonumber(ARGV[2])
+local levels = {}
+local wait = 0
+for i, key in ipairs(KEYS) do
+    local rate = tonumber(ARGV[1 + i * 2])
+    local capacity = tonumber(ARGV[2 + i * 2])
+    local state = redis.call('HMGET', key, 'tokens', 'ts')
+    local tokens = tonumber(state[1]) or capacity
+    local ts = tonumber(state[2]) or now
+    tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+    levels[i] = tokens
+    if tokens < cost then
+        wait = math.max(wait, (cost - tokens) / rate)
+    end
+end
+local allowed = wait == 0 and 1 or 0
+for i, key in ipairs(KEYS) do
+    local rate = tonumber(ARGV[1 + i * 2])
+    local capacity = tonumber(ARGV[2 + i * 2])
+    local tokens = levels[i]
+    if allowed == 1 then tokens = tokens - cost end
+    redis.call('HSET', key, 'tokens', tostring(tokens), 'ts', tostring(now))
+    redis.call('EXPIRE', key, math.ceil(capacity / rate) + 1)
+end
+return {allowed, tostring(wait)}
+"""
+
+_script = None
+_script_client = None
+
+async def take_tokens(buckets: List[Tuple[str, float, int]], cost: int) -> float:
+    """
+    Charge `cost` tokens to every bucket, or none of them
+
+    Args:
+        buckets: (key, tokens per second, capacity) for each bucket
+        cost: Tokens this request needs
+
+    Returns:
+        0 if admitted, otherwise seconds until it would be
+    """
+    global _script, _script_client
+    r = await get_redis()
+    if _script is None or _script_client is not r:
+        _script, _script_client = r.register_script(TOKEN_BUCKET_LUA), r
+
+    args: list = [time.time(), cost]
+    for _, rate, capacity in buckets:
+        args.extend([rate, capacity])
+    allowed, wait = await _script(keys=[key for key, _, _ in buckets], args=args)
+    return 0.0 if int(allowed) else float(wait)
+
+# =============================================================================
+# CONCURRENCY GATES
+# =============================================================================
+
+class Overloaded(Exception):
+    """No concurrency slot could be had within the latency budget"""
+
+
+class ConcurrencyGate:
+    """Semaphore with a bounded, time-limited wait line"""
+
+    def __init__(self, limit: int, max_waiting: int):
+        self.semaphore = asyncio.Semaphore(limit)
+        self.max_waiting = max_waiting
+        self.waiting = 0
+
+    @asynccontextmanager
+    async def slot(self, timeout: float) -> AsyncIterator[None]:
+        if self.semaphore.locked() and self.waiting >= self.max_waiting:
+            raise Overloaded()
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self.semaphore.acquire(), timeout)
+        except asyncio.TimeoutError:
+            raise Overloaded()
+        finally:
+            self.waiting -= 1
+        try:
+            yield
+        finally:
+            self.semaphore.release()
+
+
+_gates: Dict[str, ConcurrencyGate] = {
+    name: ConcurrencyGate(limit.concurrency, limit.max_waiting)
+    for name, limit in ENDPOINT_LIMITS.items()
+}
+
+# =============================================================================
+# ADMISSION
+# =============================================================================
+
+def _reject(endpoint: str, reason: str, retry_after: float, detail: str) -> HTTPException:
+    ADMISSION_REJECTED.labels(endpoint, reason).inc()
+    return HTTPException(
+        status_code=429,
+        detail=detail,
+        headers={"Retry-After": str(max(1, math.ceil(retry_after)))}
+    )
+
+@asynccontextmanager
+async def admit(endpoint: str, player: Optional[str] = None, cost: Optional[int] = None) -> AsyncIterator[None]:
+    """
+    Hold admission for one request to an expensive endpoint
+
+    Args:
+        endpoint: Key in ENDPOINT_LIMITS
+        player: Player charged for the request (None = global bucket only)
+        cost: Tokens to charge instead of the endpoint's cost (e.g. one per
+              quest in a bulk request); capped at the global burst
+
+    Raises:
+        HTTPException(429) with Retry-After when rate limited or overloaded
+    """
+    limit = ENDPOINT_LIMITS[endpoint]
+
+    buckets = [("ratelimit:global", GLOBAL_RATE_PER_MIN / 60, GLOBAL_BURST)]
+    if player:
+        buckets.append((f"ratelimit:player:{player.lower()}", PLAYER_RATE_PER_MIN / 60, PLAYER_BURST))
+    try:
+        wait = await take_tokens(buckets, min(cost or limit.cost, GLOBAL_BURST))
+    except Exception as e:
+        # Rate limiting is a safety valve; losing Redis shouldn't stop chat
+        log.warning("rate_limit_unavailable", endpoint=endpoint, error=str(e))
+        wait = 0.0
+    if wait:
+        who = f"{player} is" if player and len(buckets) > 1 else "The AIs are"
+        raise _reject(endpoint, "rate_limited", wait, f"{who} being asked too often; try again shortly")
+
+    try:
+        async with _gates[endpoint].slot(ADMISSION_QUEUE_TIMEOUT):
+            yield
+    except Overloaded:
+        raise _reject(endpoint, "overloaded", ADMISSION_QUEUE_TIMEOUT, "Too many requests in progress; try again shortly")
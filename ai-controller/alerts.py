@@ -0,0 +1,193 @@
+"""
+PUSH ALERTS
+Health transitions and notable events published over Redis pub/sub
+
+The controller watches its own servers every few seconds (reusing the cached
+status snapshot) and publishes JSON messages on NOTIFY_CHANNEL when a server
+goes down or recovers, players join or leave, a chaos event plays or a quest
+is completed. Subscribers such as the Discord bot get alerts within seconds
+instead of polling /health.
+
+Flapping is damped by requiring a state change to be seen on consecutive
+checks before it counts. Server transitions are then published only when
+they differ from the last state announced, recorded in Redis, which also
+stops several API replicas from announcing the same transition. Other
+alerts are gated by a Redis cooldown key.
+"""
+
+import os
+import json
+import asyncio
+from datetime import datetime
+from typing import Dict, Optional, Set, Tuple
+
+from store import get_redis
+from servers import registry
+from status import get_status
+from bus import bus
+from logs import get_logger
+
+log = get_logger(__name__)
+
+# =============================================================================
+# CONFIGURATION
+# =============================================================================
+
+NOTIFY_CHANNEL = os.getenv("NOTIFY_CHANNEL", "chaos:notify")
+HEALTH_CHECK_INTERVAL = float(os.getenv("HEALTH_CHECK_INTERVAL", 10))  # 0 disables the watcher
+ALERT_CONFIRM_CHECKS = int(os.getenv("ALERT_CONFIRM_CHECKS", 2))      # Checks a new state must persist
+ALERT_COOLDOWN = int(os.getenv("ALERT_COOLDOWN", 300))                # Seconds before repeating an alert
+ROSTER_COOLDOWN = int(os.getenv("ROSTER_COOLDOWN", 60))               # Seconds between join/leave per player
+ALERT_STATE_TTL = 86400                                                # Forget a server's announced state after a day
+
+# =============================================================================
+# PUBLISHING
+# =============================================================================
+
+async def publish(kind: str, **data) -> None:
+    """
+    Publish a notification; failures are logged, never raised
+
+    Args:
+        kind: Message type (server_down, server_up, player_join, player_leave,
+              chaos, quest_completed)
+        **data: JSON-serializable fields for the message
+    """
+    message = {"type": kind, "timestamp": datetime.now().isoformat(), **data}
+    try:
+        r = await get_redis()
+        await r.publish(NOTIFY_CHANNEL, json.dumps(message, default=str))
+    except Exception as e:
+        log.warning("notify_publish_failed", kind=kind, error=str(e))
+
+async def publish_once(key: str, kind: str, cooldown: int = ALERT_COOLDOWN, **data) -> bool:
+    """
+    Publish unless the same alert went out within `cooldown` seconds
+
+    Returns:
+        True if the notification was published
+    """
+    try:
+        r = await get_redis()
+        if not await r.set(f"notify:cooldown:{key}", "1", nx=True, ex=cooldown):
+            return False
+    except Exception as e:
+        log.warning("alert_cooldown_failed", key=key, error=str(e))
+        return False
+    await publish(kind, **data)
+    return True
+
+async def publish_transition(key: str, state: str, kind: str, **data) -> bool:
+    """
+    Publish a state change unless `state` is already the last one announced
+
+    Unlike a cooldown this never hides a real transition: a server that goes
+    down again right after recovering is reported again.
+
+    Returns:
+        True if the notification was published
+    """
+    try:
+        r = await get_redis()
+        previous = await r.set(f"notify:state:{key}", state, get=True, ex=ALERT_STATE_TTL)
+    except Exception as e:
+        log.warning("alert_state_failed", key=key, error=str(e))
+        return False
+    if previous == state:
+        return False
+    await publish(kind, **data)
+    return True
+
+# =============================================================================
+# HEALTH WATCHER
+# =============================================================================
+
+class HealthWatcher:
+    """
+    Turns periodic status snapshots into debounced transition alerts
+
+    Servers are assumed up at start, so one that is already down is
+    reported once the confirmation checks pass.
+    """
+
+    def __init__(self, interval: float = HEALTH_CHECK_INTERVAL, confirm: int = ALERT_CONFIRM_CHECKS):
+        self.interval = interval
+        self.confirm = max(1, confirm)
+        self.states: Dict[str, str] = {}
+        self.pending: Dict[str, Tuple[str, int]] = {}
+        self.rosters: Dict[str, Set[str]] = {}
+
+    def observe(self, key: str, state: str) -> Optional[str]:
+        """
+        Record one observation
+
+        Returns:
+            The new state once it has been seen `confirm` times in a row,
+            otherwise None
+        """
+        if self.states.setdefault(key, "up") == state:
+            self.pending.pop(key, None)
+            return None
+
+        seen = self.pending.get(key)
+        count = seen[1] + 1 if seen and seen[0] == state else 1
+        if count < self.confirm:
+            self.pending[key] = (state, count)
+            return None
+
+        self.pending.pop(key, None)
+        self.states[key] = state
+        return state
+
+    async def check(self) -> None:
+        """Take one snapshot and publish whatever changed"""
+        snapshot = await get_status(registry.names(), max_age=min(self.interval / 2, 2))
+
+        for name, server in snapshot["servers"].items():
+            state = "up" if server["rcon"] == "ok" else "down"
+            changed = self.observe(f"rcon:{name}", state)
+            if changed:
+                bus.emit("health", relay=False, server=name, state=changed, detail=server["rcon"])
+                await publish_transition(
+                    f"health:{name}", changed, f"server_{changed}",
+                    server=name, detail=server["rcon"]
+                )
+            if state == "up":
+                await self._roster(name, set(server["players"]))
+            else:
+                # Re-baseline after an outage rather than replaying it as joins/leaves
+                self.rosters.pop(name, None)
+
+        # Redis outages can only be announced once Redis is back
+        if self.observe("redis", "up" if snapshot["redis"] == "ok" else "down") == "up":
+            await publish_once("health:redis:up", "redis_up")
+
+    async def _roster(self, server: str, players: Set[str]) -> None:
+        previous = self.rosters.get(server)
+        self.rosters[server] = players
+        if previous is None:
+            return  # First sight of this server is the baseline
+        joined, left = players - previous, previous - players
+        if joined or left:
+            # Every replica watches for itself, so these aren't relayed
+            bus.emit("roster", relay=False, server=server, joined=sorted(joined),
+                     left=sorted(left), players=sorted(players))
+        for player in sorted(joined):
+            await publish_once(f"roster:{server}:{player}:join", "player_join", ROSTER_COOLDOWN,
+                               server=server, player=player)
+        for player in sorted(left):
+            await publish_once(f"roster:{server}:{player}:leave", "player_leave", ROSTER_COOLDOWN,
+                               server=server, player=player)
+
+    async def run(self, stop: asyncio.Event) -> None:
+        """Check every `interval` seconds until `stop` is set"""
+        log.info("health_watcher_started", channel=NOTIFY_CHANNEL, interval=self.interval)
+        while not stop.is_set():
+            try:
+                await self.check()
+            except Exception as e:
+                log.warning("health_check_failed", error=str(e))
+            try:
+                await asyncio.wait_for(stop.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
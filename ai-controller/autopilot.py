@@ -0,0 +1,209 @@
+"""
+CHAOS AUTOPILOT
+Schedules chaos events from inside the controller
+
+Every AUTOPILOT_TICK seconds one controller replica (the leader, elected
+through a Redis key) checks each server. An event is due once its gap,
+drawn between CHAOS_INTERVAL_MIN and CHAOS_INTERVAL_MAX hours, has passed
+since the last one. The gap shrinks as more players are online:
+
+    effective gap = gap / min(1 + AUTOPILOT_PLAYER_SCALE * (players - 1), AUTOPILOT_MAX_SPEEDUP)
+
+Empty servers are skipped. When a due server is empty, the event is held
+back until AUTOPILOT_JOIN_GRACE seconds after the check, so newcomers get a
+moment before the sky falls. Due events go through the same job dispatch as
+/chaos/trigger.
+
+Per-server state lives in the Redis hash autopilot:<server>, so a new leader
+picks up the schedule where the old one left off.
+"""
+
+import os
+import time
+import uuid
+import random
+import socket
+import asyncio
+from datetime import datetime
+from typing import Dict, List, Optional, Set
+
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
+
+from store import get_redis
+from servers import registry
+from status import get_status
+from events import CHAOS_EVENTS
+from jobs import dispatch
+from logs import get_logger
+
+log = get_logger(__name__)
+
+# =============================================================================
+# CONFIGURATION
+# =============================================================================
+
+AUTOPILOT_ENABLED = os.getenv("AUTOPILOT_ENABLED", "false").lower() == "true"
+ENABLE_CHAOS_EVENTS = os.getenv("ENABLE_CHAOS_EVENTS", "true").lower() == "true"
+AUTOPILOT_TICK = float(os.getenv("AUTOPILOT_TICK", 60))                     # Seconds between checks
+CHAOS_INTERVAL_MIN = float(os.getenv("CHAOS_INTERVAL_MIN", 2))              # Hours
+CHAOS_INTERVAL_MAX = float(os.getenv("CHAOS_INTERVAL_MAX", 4))              # Hours
+AUTOPILOT_PLAYER_SCALE = float(os.getenv("AUTOPILOT_PLAYER_SCALE", 0.25))   # Speedup per extra player
+AUTOPILOT_MAX_SPEEDUP = float(os.getenv("AUTOPILOT_MAX_SPEEDUP", 4))
+AUTOPILOT_JOIN_GRACE = float(os.getenv("AUTOPILOT_JOIN_GRACE", 600))        # Seconds
+
+LEADER_KEY = "autopilot:leader"
+LEADER_TTL = int(max(AUTOPILOT_TICK * 3, 30))
+STATE_KEY = "autopilot:{server}"
+
+# Extend or release the leader key only while we still own it
+RENEW_LUA = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('EXPIRE', KEYS[1], ARGV[2])
+end
+return 0
+"""
+RELEASE_LUA = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+# =============================================================================
+# SCHEDULING
+# =============================================================================
+
+def draw_gap() -> float:
+    """Seconds between events at one player"""
+    return random.uniform(CHAOS_INTERVAL_MIN, CHAOS_INTERVAL_MAX) * 3600
+
+def speedup(players: int) -> float:
+    """How much sooner events come with this many players online"""
+    return min(1 + AUTOPILOT_PLAYER_SCALE * max(0, players - 1), AUTOPILOT_MAX_SPEEDUP)
+
+def next_due(state: Dict[str, str], players: int) -> float:
+    """Timestamp the server's next event is due, given who is online now"""
+    last = float(state.get("last_at", 0))
+    gap = float(state.get("gap", 0))
+    return max(last + gap / speedup(players), float(state.get("hold_until", 0)))
+
+
+class Autopilot:
+    """Leader-elected chaos scheduler driven by APScheduler"""
+
+    def __init__(self, tick: float = AUTOPILOT_TICK):
+        self.tick_seconds = tick
+        self.instance = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.scheduler = AsyncIOScheduler()
+        self.playing: Set[asyncio.Task] = set()
+        self.leader = False
+
+    def start(self) -> None:
+        self.scheduler.add_job(
+            self.tick, "interval", seconds=self.tick_seconds,
+            next_run_time=datetime.now(), max_instances=1, coalesce=True
+        )
+        self.scheduler.start()
+        log.info("autopilot_started", instance=self.instance, tick=self.tick_seconds)
+
+    async def stop(self) -> None:
+        if self.scheduler.running:
+            self.scheduler.shutdown(wait=False)
+        if self.leader:
+            try:
+                r = await get_redis()
+                await r.eval(RELEASE_LUA, 1, LEADER_KEY, self.instance)
+            except Exception as e:
+                log.warning("autopilot_release_failed", error=str(e))
+        for task in list(self.playing):
+            task.cancel()
+
+    async def elect(self) -> bool:
+        """Take or keep leadership; only the leader schedules events"""
+        r = await get_redis()
+        if await r.set(LEADER_KEY, self.instance, nx=True, ex=LEADER_TTL):
+            leader = True
+        else:
+            leader = bool(await r.eval(RENEW_LUA, 1, LEADER_KEY, self.instance, LEADER_TTL))
+        if leader != self.leader:
+            log.info("autopilot_leadership", instance=self.instance, leader=leader)
+        self.leader = leader
+        return leader
+
+    async def tick(self) -> None:
+        """One scheduling pass over every server"""
+        try:
+            if not ENABLE_CHAOS_EVENTS or not await self.elect():
+                return
+            await self.schedule(registry.names())
+        except Exception as e:
+            log.warning("autopilot_tick_failed", error=str(e))
+
+    async def schedule(self, servers: List[str]) -> None:
+        r = await get_redis()
+        status = await get_status(servers, max_age=min(self.tick_seconds / 2, 10))
+        async with r.pipeline(transaction=False) as pipe:
+            for server in servers:
+                pipe.hgetall(STATE_KEY.format(server=server))
+            states = await pipe.execute()
+
+        now = time.time()
+        updates: Dict[str, Dict] = {}
+        for server, state in zip(servers, states):
+            probe = status["servers"].get(server, {})
+            players = probe.get("count", 0)
+            if not state:
+                # First sight: start the clock rather than firing at once
+                updates[server] = {"last_at": now, "gap": draw_gap()}
+                continue
+            if probe.get("rcon") != "ok" or now < next_due(state, players):
+                continue
+            if players == 0:
+                updates[server] = {"hold_until": now + AUTOPILOT_JOIN_GRACE, "skipped": int(state.get("skipped", 0)) + 1}
+                continue
+
+            event = random.choice(CHAOS_EVENTS)["name"]
+            updates[server] = {"last_at": now, "gap": draw_gap(), "last_event": event, "players": players, "hold_until": 0}
+            self.play(event, server)
+
+        if updates:
+            async with r.pipeline(transaction=False) as pipe:
+                for server, fields in updates.items():
+                    pipe.hset(STATE_KEY.format(server=server), mapping=fields)
+                await pipe.execute()
+
+    def play(self, event: str, server: str) -> None:
+        """Dispatch an event without holding up the next tick"""
+        log.info("autopilot_event", chaos_event=event, server=server)
+        task = asyncio.create_task(dispatch("chaos", {"event": event, "servers": [server]}))
+        self.playing.add(task)
+        task.add_done_callback(self._played)
+
+    def _played(self, task: asyncio.Task) -> None:
+        self.playing.discard(task)
+        if not task.cancelled() and task.exception():
+            log.warning("autopilot_event_failed", error=str(task.exception()))
+
+# =============================================================================
+# STATE
+# =============================================================================
+
+async def get_schedule(servers: List[str], status: Optional[Dict] = None) -> Dict:
+    """Leader and per-server schedule for the API"""
+    r = await get_redis()
+    async with r.pipeline(transaction=False) as pipe:
+        pipe.get(LEADER_KEY)
+        for server in servers:
+            pipe.hgetall(STATE_KEY.format(server=server))
+        leader, *states = await pipe.execute()
+
+    schedule = {}
+    for server, state in zip(servers, states):
+        players = (status or {}).get("servers", {}).get(server, {}).get("count", 1)
+        schedule[server] = {
+            "last_event": state.get("last_event"),
+            "last_at": datetime.fromtimestamp(float(state["last_at"])).isoformat() if state.get("last_at") else None,
+            "next_due": datetime.fromtimestamp(next_due(state, players)).isoformat() if state else None,
+            "skipped_empty": int(state.get("skipped", 0)),
+        }
+    return {"enabled": AUTOPILOT_ENABLED and ENABLE_CHAOS_EVENTS, "leader": leader, "servers": schedule}
@@ -0,0 +1,262 @@
+"""
+CONTROLLER BENCHMARK
+Load scenarios against main.app with a fake RCON server, stub LLMs and fakeredis
+
+Runs entirely in-process: requests go through the full ASGI stack
+(middleware, routing, handlers) via httpx's ASGI transport, RCON goes over
+real sockets to FakeRconServer, and Redis is fakeredis unless --redis-url
+points at a real instance.
+
+Usage (from ai-controller/):
+    pip install -r bench/requirements.txt
+    python bench/bench_controller.py [--scenarios status,chat] [--duration 10] [--concurrency 20]
+
+Scenarios: status, players, chat, chaos, debate, quest. Chaos and debate
+playback sleeps are scaled by --playback-scale (default 0.01) so bursts
+measure the controller rather than dramatic pauses.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Tuple
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+from fake_rcon import DEFAULT_PLAYERS, FakeRconServer  # noqa: E402
+
+PASSWORD = "bench"
+TOPICS = ["Best early-game base location", "Are creepers misunderstood?", "Redstone or command blocks?"]
+
+# =============================================================================
+# SCENARIOS
+# =============================================================================
+
+# Each builds one request: (method, path, params, json body)
+Request = Tuple[str, str, Dict, Dict]
+
+def _status(rng: random.Random, servers: List[str]) -> Request:
+    return "GET", "/status", {}, None
+
+def _players(rng: random.Random, servers: List[str]) -> Request:
+    return "GET", "/players", {"server": rng.choice(servers)}, None
+
+def _chat(rng: random.Random, servers: List[str]) -> Request:
+    return "POST", "/ai/chat", {}, {
+        "player": rng.choice(DEFAULT_PLAYERS),
+        "message": "Where should I look for diamonds?",
+        "persona": rng.choice(["oracle", "architect", "explorer"]),
+        "server": rng.choice(servers)
+    }
+
+def _chaos(rng: random.Random, servers: List[str]) -> Request:
+    return "POST", "/chaos/trigger", {"server": rng.choice(servers)}, None
+
+def _debate(rng: random.Random, servers: List[str]) -> Request:
+    return "POST", "/ai/debate", {"topic": rng.choice(TOPICS), "server": rng.choice(servers)}, None
+
+def _quest(rng: random.Random, servers: List[str]) -> Request:
+    return "POST", f"/quest/generate/{rng.choice(DEFAULT_PLAYERS)}", {"server": rng.choice(servers)}, None
+
+SCENARIOS: Dict[str, Callable[[random.Random, List[str]], Request]] = {
+    "status": _status,
+    "players": _players,
+    "chat": _chat,
+    "chaos": _chaos,
+    "debate": _debate,
+    "quest": _quest,
+}
+
+# =============================================================================
+# RESULTS
+# =============================================================================
+
+@dataclass
+class Result:
+    scenario: str
+    elapsed: float = 0.0
+    latencies: List[float] = field(default_factory=list)
+    errors: Dict[str, int] = field(default_factory=dict)
+    rcon_commands: int = 0
+
+    def percentile(self, pct: float) -> float:
+        """Nearest-rank percentile in milliseconds"""
+        if not self.latencies:
+            return 0.0
+        ordered = sorted(self.latencies)
+        index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+        return ordered[index] * 1000
+
+    def summary(self) -> Dict:
+        total = len(self.latencies) + sum(self.errors.values())
+        return {
+            "scenario": self.scenario,
+            "requests": total,
+            "errors": self.errors,
+            "rps": round(total / self.elapsed, 1) if self.elapsed else 0.0,
+            "p50_ms": round(self.percentile(50), 2),
+            "p90_ms": round(self.percentile(90), 2),
+            "p99_ms": round(self.percentile(99), 2),
+            "max_ms": round(max(self.latencies) * 1000, 2) if self.latencies else 0.0,
+            "rcon_per_request": round(self.rcon_commands / total, 2) if total else 0.0,
+        }
+
+# =============================================================================
+# HARNESS
+# =============================================================================
+
+def start_fake_servers(args) -> List[FakeRconServer]:
+    """Start the fake RCON servers and point the controller's registry at them"""
+    servers = [
+        FakeRconServer(password=PASSWORD, latency_ms=args.rcon_latency_ms, jitter_ms=args.rcon_jitter_ms).start()
+        for _ in range(args.servers)
+    ]
+    os.environ["RCON_PASSWORD"] = PASSWORD
+    os.environ["MC_SERVERS"] = json.dumps([
+        {"name": f"mc{i + 1}", "host": s.host, "port": s.port, "groups": ["bench"]}
+        for i, s in enumerate(servers)
+    ])
+    return servers
+
+class _ScaledAsyncio:
+    """asyncio with sleep() scaled, for modules whose pauses are cosmetic"""
+
+    def __init__(self, scale: float):
+        self.scale = scale
+
+    def __getattr__(self, name):
+        return getattr(asyncio, name)
+
+    async def sleep(self, delay: float, result=None):
+        return await asyncio.sleep(delay * self.scale, result)
+
+def prepare_controller(args):
+    """Import the controller with stubbed providers and the chosen Redis backend"""
+    # Quiet, trace-free defaults so the report isn't drowned in request logs
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    os.environ.setdefault("TRACE_EXPORTER", "none")
+    for key in ("ANTHROPIC_API_KEY", "OPENAI_API_KEY", "GOOGLE_API_KEY"):
+        os.environ.setdefault(key, "bench")
+    # A handful of bench players would drain the per-player buckets in
+    # seconds; lift the rate limits but keep the production concurrency caps
+    for key in ("GLOBAL_RATE_PER_MIN", "GLOBAL_BURST", "PLAYER_RATE_PER_MIN", "PLAYER_BURST"):
+        os.environ.setdefault(key, "1000000")
+
+    import store
+    if args.redis_url:
+        store.REDIS_URL = args.redis_url
+    else:
+        import fakeredis
+        fake = fakeredis.aioredis.FakeRedis(decode_responses=True)
+        store._client = store.InstrumentedRedis(connection_pool=fake.connection_pool)
+
+    import main
+    import providers
+    import events
+    import jobs
+    import stub_llm
+
+    stub_llm.install(providers.providers, scale=args.llm_scale, seed=args.seed)
+    events.asyncio = _ScaledAsyncio(args.playback_scale)
+    jobs.asyncio = _ScaledAsyncio(args.playback_scale)
+    return main.app
+
+async def run_scenario(client, name: str, args, servers: List[FakeRconServer], names: List[str]) -> Result:
+    """Closed-loop load: `concurrency` clients issue requests back to back until the deadline"""
+    build = SCENARIOS[name]
+    result = Result(name)
+    rng = random.Random(args.seed)
+    rcon_before = sum(s.commands for s in servers)
+    start = time.perf_counter()
+    deadline = start + args.duration
+
+    async def client_loop():
+        while time.perf_counter() < deadline:
+            # A real socket always yields; in-process cache hits may not, which
+            # would let one client monopolise the loop
+            await asyncio.sleep(0)
+            method, path, params, body = build(rng, names)
+            sent = time.perf_counter()
+            try:
+                resp = await client.request(method, path, params=params, json=body, timeout=None)
+                if resp.status_code >= 400:
+                    result.errors[str(resp.status_code)] = result.errors.get(str(resp.status_code), 0) + 1
+                    continue
+            except Exception as e:
+                result.errors[type(e).__name__] = result.errors.get(type(e).__name__, 0) + 1
+                continue
+            result.latencies.append(time.perf_counter() - sent)
+
+    await asyncio.gather(*(client_loop() for _ in range(args.concurrency)))
+    result.elapsed = time.perf_counter() - start
+    result.rcon_commands = sum(s.commands for s in servers) - rcon_before
+    return result
+
+def print_report(results: List[Result]) -> None:
+    header = f"{'scenario':<10} {'requests':>9} {'errors':>7} {'rps':>9} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9} {'max ms':>9} {'rcon/req':>9}"
+    print(header)
+    print("-" * len(header))
+    for result in results:
+        s = result.summary()
+        errors = sum(s["errors"].values())
+        print(
+            f"{s['scenario']:<10} {s['requests']:>9} {errors:>7} {s['rps']:>9.1f} {s['p50_ms']:>9.2f} "
+            f"{s['p90_ms']:>9.2f} {s['p99_ms']:>9.2f} {s['max_ms']:>9.2f} {s['rcon_per_request']:>9.2f}"
+        )
+        if s["errors"]:
+            print(f"{'':<10} errors: {s['errors']}")
+
+async def run(args) -> List[Result]:
+    import httpx
+
+    servers = start_fake_servers(args)
+    app = prepare_controller(args)
+    names = [f"mc{i + 1}" for i in range(len(servers))]
+
+    results = []
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            for name in args.scenarios:
+                results.append(await run_scenario(client, name, args, servers, names))
+
+    for server in servers:
+        server.stop()
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", default="status,players,chat,chaos,debate,quest",
+                        help="Comma-separated scenarios to run in order")
+    parser.add_argument("--duration", type=float, default=10, help="Seconds per scenario")
+    parser.add_argument("--concurrency", type=int, default=20, help="Concurrent clients")
+    parser.add_argument("--servers", type=int, default=1, help="Fake Minecraft servers")
+    parser.add_argument("--rcon-latency-ms", type=float, default=2.0)
+    parser.add_argument("--rcon-jitter-ms", type=float, default=1.0)
+    parser.add_argument("--llm-scale", type=float, default=1.0, help="Multiplier on stub LLM latency")
+    parser.add_argument("--playback-scale", type=float, default=0.01, help="Multiplier on chaos/debate pauses")
+    parser.add_argument("--redis-url", help="Use a real Redis (e.g. redis://localhost:6379/15) instead of fakeredis")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", dest="json_out", help="Also write the summary as JSON to this file")
+    args = parser.parse_args()
+    args.scenarios = [s.strip() for s in args.scenarios.split(",") if s.strip()]
+    unknown = [s for s in args.scenarios if s not in SCENARIOS]
+    if unknown:
+        parser.error(f"Unknown scenarios: {', '.join(unknown)}")
+
+    results = asyncio.run(run(args))
+    print_report(results)
+    if args.json_out:
+        with open(args.json_out, "w", encoding="utf-8") as f:
+            json.dump([r.summary() for r in results], f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
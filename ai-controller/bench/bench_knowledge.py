@@ -0,0 +1,80 @@
+"""
+KNOWLEDGE BENCHMARK
+Checks retrieval quality on sample queries and measures lookup throughput
+
+Each fixture names snippet ids that must come back in the top
+KNOWLEDGE_TOP_K for its query, so ranking changes (weights, stopwords,
+corpus edits) can't quietly ground personas on the wrong facts. The index
+is built from the bundled corpus into a temporary directory.
+
+Usage (from ai-controller/):
+    python bench/bench_knowledge.py [--iterations 2000]
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from knowledge import KNOWLEDGE_DIR, KNOWLEDGE_TOP_K, KnowledgeIndex, build_index  # noqa: E402
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "knowledge_queries.json")
+
+# =============================================================================
+# QUALITY
+# =============================================================================
+
+def validate(index: KnowledgeIndex, cases: list, k: int) -> int:
+    failures = 0
+    for case in cases:
+        found = [doc["id"] for doc in index.search(case["query"], k)]
+        missing = [doc_id for doc_id in case["expected"] if doc_id not in found]
+        if missing:
+            failures += 1
+            print(f"FAIL {case['query']!r}: missing {missing}, got {found}")
+    return failures
+
+# =============================================================================
+# THROUGHPUT
+# =============================================================================
+
+def bench(index: KnowledgeIndex, queries: list, iterations: int) -> None:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        for query in queries:
+            index.search(query)
+    elapsed = time.perf_counter() - start
+    total = iterations * len(queries)
+    print(f"search {total / elapsed:>12,.0f} lookups/s  {elapsed / total * 1e6:>7.2f} µs/lookup")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--k", type=int, default=KNOWLEDGE_TOP_K)
+    args = parser.parse_args()
+
+    with open(FIXTURES, encoding="utf-8") as f:
+        cases = json.load(f)
+
+    with tempfile.TemporaryDirectory() as out:
+        summary = build_index(KNOWLEDGE_DIR, out)
+        index = KnowledgeIndex(KNOWLEDGE_DIR, out)
+        if not index.load():
+            sys.exit("Index failed to load")
+        print(f"Index: {summary['documents']} snippets, {summary['terms']} terms")
+
+        failures = validate(index, cases, args.k)
+        print(f"Queries: {len(cases) - failures}/{len(cases)} returned their expected snippets in the top {args.k}\n")
+
+        bench(index, [c["query"] for c in cases], args.iterations)
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
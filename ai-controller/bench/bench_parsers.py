@@ -0,0 +1,126 @@
+"""
+PARSER BENCHMARK
+Validates the RCON fixture corpus and measures parse throughput
+
+Usage (from ai-controller/):
+    python bench/bench_parsers.py [--iterations 20000]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from dataclasses import asdict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from parsers import (  # noqa: E402
+    parse_list, parse_seed, parse_whitelist, parse_entity_count,
+    parse_data_get, parse_item_stack, parse_tick_query,
+)
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "rcon_responses.json")
+
+PARSERS = {
+    "list": parse_list,
+    "seed": parse_seed,
+    "whitelist": parse_whitelist,
+    "entity_count": parse_entity_count,
+    "data_get": parse_data_get,
+    "tick_query": parse_tick_query,
+}
+
+# =============================================================================
+# CORPUS VALIDATION
+# =============================================================================
+
+def _normalize(value):
+    """Tuples -> lists so results compare equal to JSON fixtures"""
+    if isinstance(value, tuple):
+        return [_normalize(v) for v in value]
+    if isinstance(value, dict):
+        return {k: _normalize(v) for k, v in value.items()}
+    return value
+
+
+def check_case(kind: str, case: dict) -> list:
+    """Return a list of mismatch descriptions for one fixture"""
+    result = PARSERS[kind](case["response"])
+    expected = case["expected"]
+
+    if expected is None:
+        return [] if result is None else [f"expected no parse, got {result}"]
+    if result is None:
+        return ["parser returned None"]
+
+    actual = _normalize(asdict(result))
+    errors = []
+    for key, want in expected.items():
+        if key == "item":
+            item = parse_item_stack(result.raw)
+            got = _normalize(asdict(item)) if item else None
+        else:
+            got = actual.get(key)
+        if got != want:
+            errors.append(f"{key}: expected {want!r}, got {got!r}")
+    return errors
+
+
+def validate(corpus: dict) -> int:
+    failures = 0
+    for kind, cases in corpus.items():
+        for case in cases:
+            errors = check_case(kind, case)
+            if errors:
+                failures += 1
+                label = f"{kind} [{case['platform']} {case['version']}]"
+                print(f"FAIL {label}: {case['response']!r}")
+                for error in errors:
+                    print(f"     {error}")
+    return failures
+
+# =============================================================================
+# THROUGHPUT
+# =============================================================================
+
+def legacy_list_parse(output: str) -> list:
+    """The original split-on-last-colon roster parser, for comparison"""
+    if ":" in output:
+        players_part = output.split(":")[-1].strip()
+        if players_part:
+            return [p.strip() for p in players_part.split(",") if p.strip()]
+    return []
+
+
+def bench(name: str, func, samples: list, iterations: int) -> None:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        for sample in samples:
+            func(sample)
+    elapsed = time.perf_counter() - start
+    total = iterations * len(samples)
+    print(f"{name:<14} {total / elapsed:>12,.0f} parses/s  {elapsed / total * 1e6:>7.2f} µs/parse")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+
+    with open(FIXTURES, encoding="utf-8") as f:
+        corpus = json.load(f)
+
+    total = sum(len(cases) for cases in corpus.values())
+    failures = validate(corpus)
+    print(f"Corpus: {total - failures}/{total} fixtures parsed correctly\n")
+
+    for kind, cases in corpus.items():
+        bench(kind, PARSERS[kind], [c["response"] for c in cases], args.iterations)
+    bench("list (legacy)", legacy_list_parse, [c["response"] for c in corpus["list"]], args.iterations)
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+"""
+FAKE RCON SERVER
+Speaks the Source RCON protocol with vanilla-style responses and tunable latency
+
+Used by the controller benchmark in place of a Minecraft server; it can
+also run standalone for manual testing:
+    python bench/fake_rcon.py --port 25575 --password pw --latency-ms 3
+"""
+
+import argparse
+import random
+import socket
+import struct
+import threading
+import time
+from typing import Dict, List, Optional
+
+SERVERDATA_AUTH = 3
+SERVERDATA_AUTH_RESPONSE = 2
+SERVERDATA_RESPONSE_VALUE = 0
+
+# Vanilla splits long responses into packets of this many body bytes
+MAX_RESPONSE_CHUNK = 4096
+
+DEFAULT_PLAYERS = ["AlikeRazon", "TheOracle", "TheArchitect", "TheExplorer"]
+
+# SNBT answers to `data get entity <player> <path>`
+ENTITY_DATA = {
+    "Pos": "[-128.53125d, 64.0d, 301.6999999880791d]",
+    "Dimension": '"minecraft:overworld"',
+    "Health": "18.5f",
+    "SelectedItem": '{count: 1, id: "minecraft:diamond_pickaxe"}',
+}
+
+# =============================================================================
+# CANNED RESPONSES
+# =============================================================================
+
+def vanilla_response(command: str, players: List[str]) -> str:
+    """What a 1.21 vanilla server would answer, closely enough for the parsers"""
+    verb, _, rest = command.partition(" ")
+    if verb == "list":
+        return f"There are {len(players)} of a max of 20 players online: {', '.join(players)}"
+    if verb == "tick" and rest == "query":
+        mspt = random.uniform(8, 20)
+        return (
+            "The game is running normallyTarget tick rate: 20.0 per second.\n"
+            f"Average time per tick: {mspt:.1f}ms (Target: 50.0ms)"
+            f"Percentiles: P50: {mspt * 0.9:.1f}ms P95: {mspt * 1.4:.1f}ms P99: {mspt * 1.8:.1f}ms, sample: 100"
+        )
+    if verb == "seed":
+        return "Seed: [-4172144997902289642]"
+    if verb == "time" and rest.startswith("query"):
+        return f"The time is {random.randint(0, 24000)}"
+    if verb == "difficulty" and not rest:
+        return "The difficulty is Hard"
+    if verb == "weather":
+        return f"Set the weather to {rest.split(' ')[0] or 'clear'}"
+    if verb == "data" and rest.startswith("get entity"):
+        args = rest.split(" ")
+        target = args[2] if len(args) > 2 else "@s"
+        path = args[3] if len(args) > 3 else "Pos"
+        return f"{target} has the following entity data: {ENTITY_DATA.get(path, ENTITY_DATA['Pos'])}"
+    if verb == "execute":
+        return f"Test passed, count: {random.randint(0, 20)}"
+    if verb in ("tellraw", "title", "playsound", "particle"):
+        return ""
+    if verb == "say":
+        return ""
+    if verb == "summon":
+        return "Summoned new entity"
+    if verb == "effect":
+        return f"Applied effect to {len(players)} targets"
+    if verb == "give":
+        return f"Gave 1 item to {len(players)} players"
+    if verb == "whitelist" and rest == "list":
+        return f"There are {len(players)} whitelisted player(s): {', '.join(players)}"
+    return f"Executed {verb}"
+
+# =============================================================================
+# SERVER
+# =============================================================================
+
+class FakeRconServer:
+    """
+    Threaded RCON server
+
+    Args:
+        host, port: Where to listen (port 0 picks a free one)
+        password: Required auth password
+        latency_ms: Median time to answer each command
+        jitter_ms: Standard deviation added to the latency (clamped at 0)
+        players: Names returned by `list`
+        responses: Exact-command overrides for the canned responses
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        password: str = "bench",
+        latency_ms: float = 2.0,
+        jitter_ms: float = 1.0,
+        players: Optional[List[str]] = None,
+        responses: Optional[Dict[str, str]] = None
+    ):
+        self.password = password
+        self.latency = latency_ms / 1000
+        self.jitter = jitter_ms / 1000
+        self.players = players if players is not None else list(DEFAULT_PLAYERS)
+        self.responses = responses or {}
+        self.commands = 0
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._sock.bind((host, port))
+        self._sock.listen(128)
+        self.host, self.port = self._sock.getsockname()
+        self._stopped = threading.Event()
+
+    def start(self) -> "FakeRconServer":
+        threading.Thread(target=self._accept_loop, daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        self._stopped.set()
+        self._sock.close()
+
+    def _accept_loop(self) -> None:
+        while not self._stopped.is_set():
+            try:
+                conn, _ = self._sock.accept()
+            except OSError:
+                return
+            conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            threading.Thread(target=self._handle, args=(conn,), daemon=True).start()
+
+    @staticmethod
+    def _recv_exact(conn: socket.socket, size: int) -> Optional[bytes]:
+        data = b""
+        while len(data) < size:
+            chunk = conn.recv(size - len(data))
+            if not chunk:
+                return None
+            data += chunk
+        return data
+
+    @staticmethod
+    def _packet(request_id: int, packet_type: int, body: bytes) -> bytes:
+        payload = struct.pack("<ii", request_id, packet_type) + body + b"\x00\x00"
+        return struct.pack("<i", len(payload)) + payload
+
+    def _handle(self, conn: socket.socket) -> None:
+        authed = False
+        with conn:
+            while not self._stopped.is_set():
+                header = self._recv_exact(conn, 4)
+                if header is None:
+                    return
+                (length,) = struct.unpack("<i", header)
+                payload = self._recv_exact(conn, length)
+                if payload is None:
+                    return
+                request_id, packet_type = struct.unpack("<ii", payload[:8])
+                body = payload[8:-2].decode("utf-8")
+
+                if packet_type == SERVERDATA_AUTH:
+                    authed = body == self.password
+                    conn.sendall(self._packet(request_id if authed else -1, SERVERDATA_AUTH_RESPONSE, b""))
+                    continue
+                if not authed:
+                    return  # Vanilla drops unauthenticated clients
+
+                self.commands += 1
+                delay = max(0.0, random.gauss(self.latency, self.jitter))
+                if delay:
+                    time.sleep(delay)
+                response = self.responses.get(body)
+                if response is None:
+                    response = vanilla_response(body, self.players)
+                encoded = response.encode("utf-8")
+                chunks = [encoded[i:i + MAX_RESPONSE_CHUNK] for i in range(0, len(encoded), MAX_RESPONSE_CHUNK)] or [b""]
+                conn.sendall(b"".join(self._packet(request_id, SERVERDATA_RESPONSE_VALUE, c) for c in chunks))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=25575)
+    parser.add_argument("--password", default="bench")
+    parser.add_argument("--latency-ms", type=float, default=2.0)
+    parser.add_argument("--jitter-ms", type=float, default=1.0)
+    args = parser.parse_args()
+
+    server = FakeRconServer(args.host, args.port, args.password, args.latency_ms, args.jitter_ms).start()
+    print(f"Fake RCON listening on {server.host}:{server.port} (password {args.password!r})")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
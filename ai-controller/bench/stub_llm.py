@@ -0,0 +1,102 @@
+"""
+STUB LLM PROVIDERS
+Stand-ins for the Anthropic, OpenAI and Gemini clients with realistic latency
+
+Latency is log-normal per provider (median and spread taken from typical
+small-model completions of ~100 tokens), and responses carry usage data
+shaped like each SDK's so token accounting runs as in production.
+"""
+
+import asyncio
+import math
+import random
+from types import SimpleNamespace
+from typing import Dict, Tuple
+
+# Provider -> (median seconds, log-normal sigma)
+LATENCY_PROFILES: Dict[str, Tuple[float, float]] = {
+    "claude": (0.9, 0.35),
+    "gpt": (0.7, 0.40),
+    "gemini": (0.6, 0.45),
+}
+
+REPLIES = [
+    "Seek the ancient ruins beyond the eastern ridge, traveler.",
+    "Try a 9x9 tree farm with bone meal dispensers for quick wood.",
+    "Zombies massing near spawn! Torch the cave entrance to the north.",
+    "Diamonds lie deepest at Y -58. Bring water and patience.",
+    "Build your base into the hillside: stone walls, fewer creepers.",
+]
+
+
+class StubLatency:
+    """Samples per-provider completion latency"""
+
+    def __init__(self, scale: float = 1.0, seed: int = 0):
+        self.scale = scale
+        self.random = random.Random(seed)
+
+    async def wait(self, provider: str) -> None:
+        median, sigma = LATENCY_PROFILES[provider]
+        delay = self.random.lognormvariate(math.log(median), sigma) * self.scale
+        await asyncio.sleep(delay)
+
+    def reply(self) -> str:
+        return self.random.choice(REPLIES)
+
+    @staticmethod
+    def tokens(*texts: str) -> int:
+        # ~4 characters per token is close enough for accounting load
+        return max(1, sum(len(t) for t in texts) // 4)
+
+
+def stub_clients(latency: StubLatency) -> Dict[str, object]:
+    """Objects that quack like the SDK clients personas.py calls"""
+
+    async def claude_create(model, max_tokens, system, messages, **kwargs):
+        await latency.wait("claude")
+        text = latency.reply()
+        return SimpleNamespace(
+            content=[SimpleNamespace(text=text)],
+            usage=SimpleNamespace(
+                input_tokens=latency.tokens(system, messages[-1]["content"]),
+                output_tokens=latency.tokens(text)
+            )
+        )
+
+    async def openai_create(model, messages, max_tokens=None, **kwargs):
+        await latency.wait("gpt")
+        text = latency.reply()
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=text))],
+            usage=SimpleNamespace(
+                prompt_tokens=latency.tokens(*(m["content"] for m in messages)),
+                completion_tokens=latency.tokens(text)
+            )
+        )
+
+    class GeminiChat:
+        async def send_message_async(self, prompt, **kwargs):
+            await latency.wait("gemini")
+            text = latency.reply()
+            return SimpleNamespace(
+                text=text,
+                usage_metadata=SimpleNamespace(
+                    prompt_token_count=latency.tokens(prompt),
+                    candidates_token_count=latency.tokens(text)
+                )
+            )
+
+    gemini_model = SimpleNamespace(start_chat=lambda history=None: GeminiChat())
+
+    return {
+        "claude": SimpleNamespace(messages=SimpleNamespace(create=claude_create)),
+        "gpt": SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=openai_create))),
+        "gemini": SimpleNamespace(GenerativeModel=lambda model_name: gemini_model),
+    }
+
+
+def install(providers, scale: float = 1.0, seed: int = 0) -> None:
+    """Swap the real SDK clients in the provider registry for stubs"""
+    for name, client in stub_clients(StubLatency(scale, seed)).items():
+        providers.get(name).use(client)
@@ -0,0 +1,199 @@
+"""
+EVENT BUS
+In-process fan-out of controller activity to live subscribers
+
+Chat replies, chaos progress (one event per command), quest changes and
+roster changes are emitted here and streamed to /stream clients. Emitting
+never blocks: every subscriber has a bounded queue, and a subscriber that
+falls behind loses its oldest events instead of slowing the controller.
+
+Events that can originate in another process (a worker playing a queued
+chaos event, another API replica) are also relayed through a Redis channel,
+so every replica's subscribers see the whole picture.
+"""
+
+import os
+import uuid
+import asyncio
+import itertools
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Deque, Dict, Iterable, Optional, Set
+
+import orjson
+
+from store import get_redis
+from logs import get_logger
+
+log = get_logger(__name__)
+
+# =============================================================================
+# CONFIGURATION
+# =============================================================================
+
+STREAM_CHANNEL = os.getenv("STREAM_CHANNEL", "chaos:stream")
+SUBSCRIBER_QUEUE_SIZE = int(os.getenv("SUBSCRIBER_QUEUE_SIZE", 256))
+RELAY_QUEUE_SIZE = 1024
+
+# =============================================================================
+# EVENTS & SUBSCRIPTIONS
+# =============================================================================
+
+@dataclass(frozen=True, slots=True)
+class Event:
+    """One bus event; `payload` is serialized once and shared by all subscribers"""
+    seq: int
+    type: str
+    payload: str
+
+class Subscription:
+    """
+    Bounded, drop-oldest queue of events for one client
+
+    Args:
+        topics: Event types to receive (None = everything)
+        maxsize: Events buffered before the oldest are dropped
+    """
+
+    def __init__(self, topics: Optional[Iterable[str]] = None, maxsize: int = SUBSCRIBER_QUEUE_SIZE):
+        self.topics = set(topics) if topics else None
+        self.queue: Deque[Event] = deque(maxlen=maxsize)
+        self.dropped = 0
+        self._ready = asyncio.Event()
+
+    def wants(self, kind: str) -> bool:
+        return self.topics is None or kind in self.topics
+
+    def put(self, event: Event) -> None:
+        if len(self.queue) == self.queue.maxlen:
+            self.dropped += 1
+        self.queue.append(event)
+        self._ready.set()
+
+    async def get(self, timeout: Optional[float] = None) -> Optional[Event]:
+        """Next event, or None if nothing arrives within `timeout` seconds"""
+        while not self.queue:
+            self._ready.clear()
+            try:
+                await asyncio.wait_for(self._ready.wait(), timeout)
+            except asyncio.TimeoutError:
+                return None
+        return self.queue.popleft()
+
+    def take_dropped(self) -> int:
+        """Events lost since the last call"""
+        dropped, self.dropped = self.dropped, 0
+        return dropped
+
+# =============================================================================
+# BUS
+# =============================================================================
+
+class EventBus:
+    """Fan events out to subscriptions and, optionally, to other processes"""
+
+    def __init__(self):
+        self.subscribers: Set[Subscription] = set()
+        # Tags relayed events so this bus doesn't deliver its own twice
+        self.origin = uuid.uuid4().hex[:12]
+        self._seq = itertools.count(1)
+        self._outbox: Deque[bytes] = deque(maxlen=RELAY_QUEUE_SIZE)
+        self._outbox_ready: Optional[asyncio.Event] = None
+
+    def subscribe(self, topics: Optional[Iterable[str]] = None, maxsize: int = SUBSCRIBER_QUEUE_SIZE) -> Subscription:
+        sub = Subscription(topics, maxsize)
+        self.subscribers.add(sub)
+        return sub
+
+    def unsubscribe(self, sub: Subscription) -> None:
+        self.subscribers.discard(sub)
+
+    def _deliver(self, message: Dict) -> None:
+        kind = message["type"]
+        targets = [sub for sub in self.subscribers if sub.wants(kind)]
+        if not targets:
+            return
+        seq = next(self._seq)
+        event = Event(seq, kind, orjson.dumps({"seq": seq, **message}).decode())
+        for sub in targets:
+            sub.put(event)
+
+    def emit(self, kind: str, relay: bool = True, **data) -> None:
+        """
+        Publish an event without blocking
+
+        Must be called from the event loop thread.
+
+        Args:
+            kind: Event type (chat, chaos, quest, roster, health)
+            relay: Also forward to other processes through Redis; pass False
+                   for events every replica produces on its own
+            **data: JSON-serializable fields
+        """
+        message = {"type": kind, "timestamp": datetime.now().isoformat(), **data}
+        self._deliver(message)
+        if relay and self._outbox_ready is not None:
+            self._outbox.append(orjson.dumps({"origin": self.origin, **message}))
+            self._outbox_ready.set()
+
+    # -------------------------------------------------------------------------
+    # Redis relay
+    # -------------------------------------------------------------------------
+
+    async def _forward(self) -> None:
+        """Drain the outbox into Redis"""
+        r = await get_redis()
+        while True:
+            await self._outbox_ready.wait()
+            self._outbox_ready.clear()
+            while self._outbox:
+                batch = [self._outbox.popleft() for _ in range(len(self._outbox))]
+                try:
+                    async with r.pipeline(transaction=False) as pipe:
+                        for payload in batch:
+                            pipe.publish(STREAM_CHANNEL, payload)
+                        await pipe.execute()
+                except Exception as e:
+                    log.warning("stream_relay_failed", events=len(batch), error=str(e))
+
+    async def _receive(self) -> None:
+        """Deliver events relayed by other processes"""
+        while True:
+            try:
+                r = await get_redis()
+                async with r.pubsub() as pubsub:
+                    await pubsub.subscribe(STREAM_CHANNEL)
+                    async for message in pubsub.listen():
+                        if message.get("type") != "message":
+                            continue
+                        event = orjson.loads(message["data"])
+                        if event.pop("origin", None) != self.origin:
+                            self._deliver(event)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                log.warning("stream_relay_lost", error=str(e))
+                await asyncio.sleep(1)
+
+    async def run_relay(self, receive: bool = True) -> None:
+        """
+        Forward emitted events to Redis (and deliver others' events locally)
+        until cancelled
+
+        Args:
+            receive: Also subscribe to other processes' events; workers,
+                     which have no stream clients, only send
+        """
+        self._outbox_ready = asyncio.Event()
+        tasks = [asyncio.create_task(self._forward())]
+        if receive:
+            tasks.append(asyncio.create_task(self._receive()))
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+            self._outbox_ready = None
+
+bus = EventBus()
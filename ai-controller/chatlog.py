@@ -0,0 +1,212 @@
+"""
+IN-GAME CHAT
+Follows each server's logs/latest.log and answers @persona mentions
+
+A player typing "@oracle where are the diamonds?" in game gets the same
+treatment as a POST to /ai/chat: the persona answers in chat, and the
+exchange lands in chat:log and the /stream feed.
+
+The log is followed by offset, never re-read: each poll stats the file and
+reads only the bytes appended since the last one, in a worker thread so the
+event loop never touches the disk. When the server rotates latest.log
+(new inode or the file shrinking) the rest of the old file is drained and
+the new one is read from the start. Following starts at the end of the file,
+so a restart doesn't replay old chat.
+
+Every replica may follow the same log; each chat line is claimed through a
+Redis key built from its file position, so only one replica answers it.
+"""
+
+import os
+import re
+import asyncio
+from typing import Dict, List, Optional, Set, Tuple
+
+from fastapi import HTTPException
+
+from store import get_redis
+from servers import registry
+from parsers import MENTION_RE, ChatLine, parse_chat_line
+from personas import persona_registry
+from minecraft import fan_out, mc_whisper
+from admission import admit
+from jobs import play_chat
+from logs import get_logger
+
+log = get_logger(__name__)
+
+# =============================================================================
+# CONFIGURATION
+# =============================================================================
+
+CHAT_INGEST_ENABLED = os.getenv("CHAT_INGEST_ENABLED", "false").lower() == "true"
+CHAT_POLL_INTERVAL = float(os.getenv("CHAT_POLL_INTERVAL", 0.5))   # Seconds between log polls
+CHAT_READ_LIMIT = 1024 * 1024                                        # Bytes read per poll at most
+CHAT_CLAIM_TTL = 300                                                 # Seconds a line stays claimed
+
+# Players whose chat is never routed (the Node bots, whose names are in .env)
+CHAT_IGNORE_PLAYERS = {
+    name.strip().lower()
+    for name in os.getenv("CHAT_IGNORE_PLAYERS", "TheOracle,TheArchitect,TheExplorer").split(",")
+    if name.strip()
+}
+
+# =============================================================================
+# LOG TAILING
+# =============================================================================
+
+class LogTailer:
+    """
+    Incremental reader for a log file that gets rotated
+
+    Not thread-safe; one tailer is polled from one thread at a time.
+    """
+
+    def __init__(self, path: str, from_start: bool = False):
+        self.path = path
+        self.from_start = from_start
+        self.file = None
+        self.inode: Optional[int] = None
+        self.offset = 0
+        self.partial = b""
+
+    def close(self) -> None:
+        if self.file:
+            self.file.close()
+        self.file = None
+
+    def _open(self, stat: os.stat_result, at_end: bool) -> None:
+        self.close()
+        self.file = open(self.path, "rb")
+        self.inode = stat.st_ino
+        self.offset = stat.st_size if at_end else 0
+        self.file.seek(self.offset)
+        self.partial = b""
+
+    def _read(self) -> List[Tuple[int, str]]:
+        data = self.file.read(CHAT_READ_LIMIT)
+        if not data:
+            return []
+        start = self.offset - len(self.partial)
+        self.offset += len(data)
+        *complete, self.partial = (self.partial + data).split(b"\n")
+
+        lines = []
+        for raw in complete:
+            lines.append((start, raw.decode("utf-8", errors="replace").rstrip("\r")))
+            start += len(raw) + 1
+        return lines
+
+    def poll(self) -> List[Tuple[int, str]]:
+        """
+        Complete lines appended since the last poll
+
+        Returns:
+            (byte offset of the line, line) pairs
+        """
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return []
+
+        if self.file is None:
+            self._open(stat, at_end=not self.from_start)
+            self.from_start = True  # Files that appear later are read in full
+            return []
+
+        lines = []
+        if stat.st_ino != self.inode or stat.st_size < self.offset:
+            # Rotated: finish the old file, then start the new one from the top
+            lines.extend(self._read())
+            self._open(stat, at_end=False)
+        lines.extend(self._read())
+        return lines
+
+# =============================================================================
+# MENTION ROUTING
+# =============================================================================
+
+def _alias(text: str) -> str:
+    return re.sub(r"[^a-z0-9]", "", text.lower())
+
+# "@oracle" and "@TheOracle" both reach The Oracle
+PERSONA_ALIASES: Dict[str, str] = {}
+for _key, _persona in persona_registry.personas.items():
+    PERSONA_ALIASES[_alias(_persona.name)] = _key
+    PERSONA_ALIASES[_alias(_key)] = _key
+
+def mentioned_persona(chat: ChatLine) -> Optional[str]:
+    """First persona a chat line mentions"""
+    for mention in chat.mentions:
+        persona = PERSONA_ALIASES.get(_alias(mention))
+        if persona:
+            return persona
+    return None
+
+
+class ChatIngest:
+    """Follows one server's log and answers persona mentions"""
+
+    def __init__(self, server: str, path: str):
+        self.server = server
+        self.tailer = LogTailer(path)
+        self.replies: Set[asyncio.Task] = set()
+
+    async def run(self, stop: asyncio.Event) -> None:
+        log.info("chat_ingest_started", server=self.server, path=self.tailer.path)
+        try:
+            while not stop.is_set():
+                try:
+                    lines = await asyncio.to_thread(self.tailer.poll)
+                    for offset, line in lines:
+                        await self.handle(offset, line)
+                except Exception as e:
+                    log.warning("chat_ingest_failed", server=self.server, error=str(e))
+                try:
+                    await asyncio.wait_for(stop.wait(), CHAT_POLL_INTERVAL)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            self.tailer.close()
+            for task in list(self.replies):
+                task.cancel()
+
+    async def handle(self, offset: int, line: str) -> None:
+        chat = parse_chat_line(line)
+        if chat is None or not chat.mentions or chat.player.lower() in CHAT_IGNORE_PLAYERS:
+            return
+        persona = mentioned_persona(chat)
+        if persona is None:
+            return
+
+        # Claim the line so other replicas following the same log skip it
+        r = await get_redis()
+        claim = f"chatlog:{self.server}:{self.tailer.inode}:{offset}"
+        if not await r.set(claim, "1", nx=True, ex=CHAT_CLAIM_TTL):
+            return
+
+        message = " ".join(MENTION_RE.sub("", chat.message).split()) or "Hello!"
+        task = asyncio.create_task(self.reply(persona, chat.player, message))
+        self.replies.add(task)
+        task.add_done_callback(self.replies.discard)
+
+    async def reply(self, persona: str, player: str, message: str) -> None:
+        """Answer in game, under the same admission limits as /ai/chat"""
+        try:
+            async with admit("chat", player=player):
+                await play_chat({"persona": persona, "player": player, "message": message, "servers": [self.server]})
+        except HTTPException as e:
+            await fan_out(self.server, mc_whisper, player, f"{e.detail} ({e.headers['Retry-After']}s)")
+        except Exception as e:
+            log.warning("chat_reply_failed", server=self.server, persona=persona, player=player, error=str(e))
+
+
+def start_chat_ingest(stop: asyncio.Event) -> List[asyncio.Task]:
+    """Follow every server that has a log file configured"""
+    if not CHAT_INGEST_ENABLED:
+        return []
+    return [
+        asyncio.create_task(ChatIngest(server.name, server.log_file).run(stop))
+        for server in registry.servers.values()
+        if server.log_file
+    ]
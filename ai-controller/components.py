@@ -0,0 +1,257 @@
+"""
+TEXT COMPONENTS
+JSON text component builder for tellraw, title and actionbar
+
+Everything is serialized through orjson, so quotes, backslashes, newlines
+and unicode in LLM output are always escaped correctly. Legacy § codes are
+converted into structured components instead of being sent raw.
+
+Long replies are word-wrapped into several chat lines (CHAT_LINE_WIDTH
+characters each), one tellraw per line, so they can go out in one RCON batch
+instead of being cut off.
+"""
+
+import os
+from functools import lru_cache
+from typing import Dict, List, Optional, Union
+
+import orjson
+
+Component = Union[str, Dict, List]
+
+CHAT_LINE_WIDTH = int(os.getenv("CHAT_LINE_WIDTH", 100))   # Characters per chat line
+
+# =============================================================================
+# COLORS & FORMATTING
+# =============================================================================
+
+LEGACY_COLORS = {
+    "0": "black",
+    "1": "dark_blue",
+    "2": "dark_green",
+    "3": "dark_aqua",
+    "4": "dark_red",
+    "5": "dark_purple",
+    "6": "gold",
+    "7": "gray",
+    "8": "dark_gray",
+    "9": "blue",
+    "a": "green",
+    "b": "aqua",
+    "c": "red",
+    "d": "light_purple",
+    "e": "yellow",
+    "f": "white",
+}
+
+LEGACY_STYLES = {
+    "k": "obfuscated",
+    "l": "bold",
+    "m": "strikethrough",
+    "n": "underlined",
+    "o": "italic",
+}
+
+# Friendly names used across the controller that are not valid JSON colors
+COLOR_ALIASES = {
+    "purple": "dark_purple",
+    "pink": "light_purple",
+}
+
+VALID_COLORS = frozenset(LEGACY_COLORS.values())
+
+
+def normalize_color(color: Optional[str]) -> Optional[str]:
+    """Map a color name or #RRGGBB to a value tellraw accepts (None if invalid)"""
+    if not color:
+        return None
+    color = COLOR_ALIASES.get(color, color)
+    if color in VALID_COLORS:
+        return color
+    if len(color) == 7 and color[0] == "#":
+        try:
+            int(color[1:], 16)
+            return color
+        except ValueError:
+            return None
+    return None
+
+# =============================================================================
+# BUILDERS
+# =============================================================================
+
+def component(
+    text: str,
+    color: Optional[str] = None,
+    bold: bool = False,
+    italic: bool = False,
+    underlined: bool = False,
+    click: Optional[Dict] = None,
+    hover: Optional[str] = None,
+    extra: Optional[List[Component]] = None
+) -> Dict:
+    """
+    Build a single text component
+
+    Args:
+        text: Literal text (escaped on serialization)
+        color: Color name or #RRGGBB
+        bold, italic, underlined: Style flags
+        click: Click event from run_command/suggest_command/open_url
+        hover: Hover tooltip text
+        extra: Child components
+
+    Returns:
+        Component dict
+    """
+    comp = {"text": text}
+    color = normalize_color(color)
+    if color:
+        comp["color"] = color
+    if bold:
+        comp["bold"] = True
+    if italic:
+        comp["italic"] = True
+    if underlined:
+        comp["underlined"] = True
+    if click:
+        comp["clickEvent"] = click
+    if hover:
+        comp["hoverEvent"] = {"action": "show_text", "contents": hover}
+    if extra:
+        comp["extra"] = extra
+    return comp
+
+def run_command(command: str) -> Dict:
+    """Click event that runs a command"""
+    return {"action": "run_command", "value": command if command.startswith("/") else f"/{command}"}
+
+def suggest_command(command: str) -> Dict:
+    """Click event that pre-fills the chat box"""
+    return {"action": "suggest_command", "value": command}
+
+def open_url(url: str) -> Dict:
+    """Click event that opens a URL"""
+    return {"action": "open_url", "value": url}
+
+def from_legacy(text: str, color: Optional[str] = None, bold: bool = False) -> Component:
+    """
+    Convert a string with § codes into components
+
+    Args:
+        text: Text that may contain §-prefixed color/style codes
+        color: Base color applied where no § color is active
+        bold: Base bold flag
+
+    Returns:
+        A single component, or a list when the text has several styled runs
+    """
+    if "§" not in text:
+        return component(text, color, bold)
+
+    base = {"text": ""}
+    base_color = normalize_color(color)
+    if base_color:
+        base["color"] = base_color
+    if bold:
+        base["bold"] = True
+
+    parts: List[Component] = [base]
+    style: Dict = {}
+    chunks = text.split("§")
+
+    if chunks[0]:
+        parts.append({"text": chunks[0]})
+
+    for chunk in chunks[1:]:
+        if not chunk:
+            continue
+        code, run = chunk[0].lower(), chunk[1:]
+        if code in LEGACY_COLORS:
+            # A color code resets styles, as in vanilla
+            style = {"color": LEGACY_COLORS[code]}
+        elif code in LEGACY_STYLES:
+            style = dict(style)
+            style[LEGACY_STYLES[code]] = True
+        elif code == "r":
+            style = {}
+        else:
+            # Unknown code: keep the text, drop the marker
+            run = chunk
+        if run:
+            part = {"text": run}
+            part.update(style)
+            parts.append(part)
+
+    # tellraw treats the first list element as the parent of the rest
+    return parts
+
+# =============================================================================
+# SERIALIZATION
+# =============================================================================
+
+def dumps(comp: Component) -> str:
+    """Serialize a component to compact JSON"""
+    return orjson.dumps(comp).decode()
+
+def text_json(message: str, color: Optional[str] = None, bold: bool = False) -> str:
+    """Serialize arbitrary (possibly untrusted) text with § handling"""
+    return dumps(from_legacy(message, color, bold))
+
+@lru_cache(maxsize=512)
+def static_json(message: str, color: Optional[str] = None, bold: bool = False) -> str:
+    """Cached text_json for fixed strings such as event announcements"""
+    return text_json(message, color, bold)
+
+def tellraw(target: str, comp: Component) -> str:
+    """Build a tellraw command"""
+    return f"tellraw {target} {dumps(comp)}"
+
+# =============================================================================
+# WRAPPING
+# =============================================================================
+
+def wrap(text: str, width: int = CHAT_LINE_WIDTH, first: int = 0) -> List[str]:
+    """
+    Word-wrap text into chat lines
+
+    Args:
+        text: Text to wrap (whitespace is collapsed)
+        width: Characters per line
+        first: Characters already taken on the first line (e.g. a name tag)
+
+    Returns:
+        Lines, at least one
+    """
+    lines: List[str] = []
+    line = ""
+    room = max(width - first, 1)
+    for word in text.split():
+        if line and len(line) + 1 + len(word) > room:
+            lines.append(line)
+            line, room = "", width
+        if line:
+            line += " " + word
+            continue
+        while len(word) > room:
+            # Words longer than the room left on a fresh line are split,
+            # including a first word that doesn't fit beside the name tag
+            lines.append(word[:room])
+            word, room = word[room:], width
+        line = word
+    lines.append(line)
+    return lines
+
+def tellraw_lines(target: str, prefix: str, text: str, color: Optional[str] = None) -> List[str]:
+    """
+    tellraw commands for a long message, one per wrapped line
+
+    Args:
+        target: Player or selector
+        prefix: Shown before the first line only, e.g. "§7[The Oracle]§r "
+        text: Message body
+        color: Base color of every line
+    """
+    lines = wrap(text, first=len(prefix.replace("§", "")) - prefix.count("§"))
+    lines[0] = prefix + lines[0]
+    return [f"tellraw {target} {text_json(line, color)}" for line in lines]
@@ -0,0 +1,198 @@
+"""
+CHAOS DATAPACK
+Compiles CHAOS_EVENTS into a datapack so an event is one RCON call
+
+Each event becomes a `chaos:<slug>` function that shows the announcement
+and hands the rest of the timeline to the server's tick scheduler:
+
+    data/chaos/function/meteor_shower.mcfunction       title, then schedules:
+    data/chaos/function/meteor_shower/t20.mcfunction   announcement (1s)
+    data/chaos/function/meteor_shower/t60.mcfunction   first command (3s)
+    ...
+
+Steps are scheduled with `append`, so an event triggered twice in quick
+succession plays twice instead of replacing its pending steps.
+
+Build it into a world (the controller also does this at startup when
+CHAOS_DATAPACK_DIR is set):
+    python datapack.py /data/world/datapacks
+
+At runtime, events play through `function chaos:<slug>` on servers where
+`datapack list enabled` shows the pack, and fall back to command-by-command
+RCON playback elsewhere.
+"""
+
+import os
+import re
+import sys
+import json
+import shutil
+import asyncio
+from typing import Dict, List, Optional, Tuple
+
+from components import static_json
+from minecraft import rcon_command, fan_out
+from logs import get_logger
+
+log = get_logger(__name__)
+
+# =============================================================================
+# CONFIGURATION
+# =============================================================================
+
+CHAOS_DATAPACK = os.getenv("CHAOS_DATAPACK", "auto").lower()   # auto | off
+CHAOS_DATAPACK_DIR = os.getenv("CHAOS_DATAPACK_DIR", "")       # world/datapacks to build into at startup
+DATAPACK_FORMAT = int(os.getenv("DATAPACK_FORMAT", 48))        # 48 = 1.21-1.21.1
+
+PACK_NAME = "chaos"
+NAMESPACE = "chaos"
+TICKS_PER_SECOND = 20
+
+# Event timeline, shared with the RCON playback in events.py
+TITLE = "§c⚠ CHAOS EVENT ⚠"
+ANNOUNCE_DELAY = 1.0
+COMMANDS_DELAY = 2.0
+
+# =============================================================================
+# COMPILER
+# =============================================================================
+
+def slug(name: str) -> str:
+    """Function name for an event: "Meteor Shower" -> "meteor_shower" """
+    return re.sub(r"[^a-z0-9]+", "_", name.lower()).strip("_")
+
+def function_dir() -> str:
+    # 1.21 (format 45+) renamed the folder from "functions" to "function"
+    return "function" if DATAPACK_FORMAT >= 45 else "functions"
+
+def timeline(event: Dict) -> List[Tuple[int, List[str]]]:
+    """The event's commands grouped by tick offset from the trigger"""
+    steps: Dict[int, List[str]] = {0: [
+        "title @a times 10 70 20",
+        f"title @a subtitle {static_json(event['announce'])}",
+        f"title @a title {static_json(TITLE, None, True)}",
+    ]}
+    at = ANNOUNCE_DELAY
+    steps.setdefault(round(at * TICKS_PER_SECOND), []).append(
+        f"tellraw @a {static_json(event['announce'], 'white')}"
+    )
+    at += COMMANDS_DELAY
+    delay = event.get("delay_between", 0.5)
+    for command in event["commands"]:
+        steps.setdefault(round(at * TICKS_PER_SECOND), []).append(command)
+        at += delay
+    return sorted(steps.items())
+
+def step_function(event: Dict, ticks: int) -> str:
+    """The scheduled function holding an event's commands for one tick offset"""
+    return f"{NAMESPACE}:{slug(event['name'])}/t{ticks}"
+
+def compile_event(event: Dict) -> Dict[str, str]:
+    """
+    mcfunction files for one event
+
+    Returns:
+        Path relative to the function folder -> file contents
+    """
+    name = slug(event["name"])
+    files: Dict[str, str] = {}
+    entry = [f"# {event['name']}: {event['description']}"]
+    for ticks, commands in timeline(event):
+        if ticks == 0:
+            entry.extend(commands)
+            continue
+        files[f"{name}/t{ticks}.mcfunction"] = "\n".join(commands) + "\n"
+        entry.append(f"schedule function {step_function(event, ticks)} {ticks}t append")
+    files[f"{name}.mcfunction"] = "\n".join(entry) + "\n"
+    return files
+
+def compile_pack(events: List[Dict]) -> Dict[str, str]:
+    """Every file in the pack, relative to the pack folder"""
+    files = {
+        "pack.mcmeta": json.dumps({
+            "pack": {"pack_format": DATAPACK_FORMAT, "description": "Chaos AI events (generated)"}
+        }, indent=2) + "\n"
+    }
+    base = f"data/{NAMESPACE}/{function_dir()}"
+    for event in events:
+        for path, content in compile_event(event).items():
+            files[f"{base}/{path}"] = content
+    return files
+
+def build_datapack(datapacks_dir: str, events: List[Dict]) -> bool:
+    """
+    Write the pack into a world's datapacks folder
+
+    Args:
+        datapacks_dir: The world's datapacks directory
+        events: Events to compile
+
+    Returns:
+        True if anything changed (the server needs a `reload`)
+    """
+    root = os.path.join(datapacks_dir, PACK_NAME)
+    files = compile_pack(events)
+
+    existing = {}
+    if os.path.isdir(root):
+        for folder, _, names in os.walk(root):
+            for filename in names:
+                path = os.path.join(folder, filename)
+                with open(path, encoding="utf-8") as f:
+                    existing[os.path.relpath(path, root).replace(os.sep, "/")] = f.read()
+    if existing == files:
+        return False
+
+    # Rebuild from scratch so renamed or removed events don't linger
+    shutil.rmtree(root, ignore_errors=True)
+    for path, content in files.items():
+        target = os.path.join(root, *path.split("/"))
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        with open(target, "w", encoding="utf-8") as f:
+            f.write(content)
+    return True
+
+# =============================================================================
+# RUNTIME
+# =============================================================================
+
+# Server name -> whether the pack is enabled there
+_enabled: Dict[str, bool] = {}
+
+def datapack_enabled(server: str) -> bool:
+    """Whether `function chaos:<event>` works on a server (checked once per server)"""
+    if CHAOS_DATAPACK == "off":
+        return False
+    if server not in _enabled:
+        output = rcon_command("datapack list enabled", server)
+        if output.startswith("RCON Error"):
+            return False  # Ask again once the server is reachable
+        _enabled[server] = f"file/{PACK_NAME}" in output
+        log.info("chaos_datapack", server=server, enabled=_enabled[server])
+    return _enabled[server]
+
+def forget(server: str) -> None:
+    """Re-check a server next time (e.g. its function call failed)"""
+    _enabled.pop(server, None)
+
+def function_command(event: Dict) -> str:
+    return f"function {NAMESPACE}:{slug(event['name'])}"
+
+async def install(events: List[Dict], target: Optional[str] = "all") -> None:
+    """Build into CHAOS_DATAPACK_DIR and reload the servers if the pack changed"""
+    if not CHAOS_DATAPACK_DIR or CHAOS_DATAPACK == "off":
+        return
+    changed = await asyncio.to_thread(build_datapack, CHAOS_DATAPACK_DIR, events)
+    log.info("chaos_datapack_built", path=CHAOS_DATAPACK_DIR, changed=changed, events=len(events))
+    if changed:
+        await fan_out(target, rcon_command, "reload")
+        _enabled.clear()
+
+
+if __name__ == "__main__":
+    from events import CHAOS_EVENTS
+
+    if len(sys.argv) != 2:
+        sys.exit("Usage: python datapack.py <world>/datapacks")
+    changed = build_datapack(sys.argv[1], CHAOS_EVENTS)
+    print(f"{'Wrote' if changed else 'Unchanged'}: {os.path.join(sys.argv[1], PACK_NAME)} ({len(CHAOS_EVENTS)} events)")
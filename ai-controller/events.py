@@ -6,7 +6,22 @@ Defines all the random chaos events that can trigger in the world
 import random
 import asyncio
 from typing import Optional
-from minecraft import rcon_command, mc_say, mc_title
+from minecraft import rcon_command, mc_say, mc_title, current_server
+from servers import registry
+from bus import bus
+from datapack import (
+    ANNOUNCE_DELAY, COMMANDS_DELAY, TICKS_PER_SECOND, TITLE,
+    datapack_enabled, forget, function_command, step_function, timeline,
+)
+from ticks import CHAOS_LAG_WAIT, current, is_heavy, overloaded, spawns_entities, wait_for_headroom
+from world import redundant, restorer, world
+from logs import get_logger
+from metrics import CHAOS_EVENT_SECONDS, timed
+
+log = get_logger(__name__)
+
+# Seconds before a scheduled summon step that the datapack playback checks for lag
+STEP_CHECK_LEAD = 0.25
 
 # =============================================================================
 # CHAOS EVENT DEFINITIONS
@@ -199,16 +214,21 @@ CHAOS_EVENTS = [
 # EVENT TRIGGERING
 # =============================================================================
 
-async def trigger_chaos_event(event_name: Optional[str] = None) -> dict:
+async def trigger_chaos_event(event_name: Optional[str] = None, server: Optional[str] = None) -> dict:
     """
     Trigger a chaos event
     
     Args:
         event_name: Specific event to trigger, or None for random
+        server: Server to play the event on (defaults to the context server)
         
     Returns:
-        The triggered event dict
+        The event dict that played (a lighter one if the server was lagging)
     """
+    if server:
+        # Runs in its own task when fanned out, so this stays local to it
+        current_server.set(server)
+
     # Select event
     if event_name:
         event = next((e for e in CHAOS_EVENTS if e["name"].lower() == event_name.lower()), None)
@@ -218,24 +238,113 @@ async def trigger_chaos_event(event_name: Optional[str] = None) -> dict:
     else:
         event = random.choice(CHAOS_EVENTS)
     
+    name = current_server.get() or registry.default
+
+    # Hold off while the server is lagging; if it doesn't recover, play
+    # something that adds no entities instead
+    lagging = await wait_for_headroom(name)
+    if lagging and is_heavy(event):
+        lighter = [e for e in CHAOS_EVENTS if not is_heavy(e)]
+        log.warning("chaos_downgraded", chaos_event=event["name"], server=name, mspt=lagging.mspt)
+        event = random.choice(lighter)
+
+    # Remember the weather etc. so the event's changes can be undone later
+    prior = await asyncio.to_thread(world.current, name)
+
+    with timed(CHAOS_EVENT_SECONDS, event=event["name"], server=name):
+        # The generated datapack plays the whole timeline from one command,
+        # but can't leave a step out: events with a command that would change
+        # nothing (`weather thunder` in a storm) play command by command
+        if not (await asyncio.to_thread(pack_playable, event, name) and await play_function(event, name)):
+            await play_commands(event, name)
+
+    restorer.after_event(event["commands"], name, prior)
+
+    return event
+
+def pack_playable(event: dict, name: str) -> bool:
+    """Whether the datapack can play the whole event as compiled (blocking)"""
+    if not datapack_enabled(name):
+        return False
+    skipped = [cmd for cmd in event["commands"] if redundant(cmd, name)]
+    if skipped:
+        log.info("chaos_function_bypassed", chaos_event=event["name"], server=name, redundant=skipped)
+        return False
+    return True
+
+async def play_function(event: dict, name: str) -> bool:
+    """
+    Play an event through its `function chaos:<event>`; False if the server lacks it
+
+    The call returns once the first step has run and the server schedules
+    the rest, so this waits out the compiled timeline before returning:
+    callers hold the server's playback lock until the event has really ended.
+    Like the RCON playback, summons are dropped while the server lags: just
+    before a summon step is due, its scheduled function is cleared if the
+    latest tick sample is over the limit.
+    """
+    cmd = function_command(event)
+    result = await asyncio.to_thread(rcon_command, cmd)
+    if result.startswith("RCON Error") or "Unknown function" in result:
+        log.warning("chaos_function_failed", chaos_event=event["name"], server=name, result=result)
+        forget(name)
+        return False
+    bus.emit("chaos", phase="start", event=event["name"], server=name, total=1)
+    bus.emit("chaos", phase="command", event=event["name"], server=name,
+             index=1, total=1, command=cmd, result=result)
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    steps = timeline(event)
+    for ticks, commands in steps[1:]:
+        if not all(spawns_entities(c) for c in commands):
+            continue
+        await asyncio.sleep(max(0.0, started + ticks / TICKS_PER_SECOND - STEP_CHECK_LEAD - loop.time()))
+        tick = await current(name)
+        if overloaded(tick):
+            step = step_function(event, ticks)
+            await asyncio.to_thread(rcon_command, f"schedule clear {step}")
+            log.warning("chaos_step_skipped", chaos_event=event["name"], server=name, step=step, mspt=tick.mspt)
+            bus.emit("chaos", phase="command", event=event["name"], server=name,
+                     index=1, total=1, command=step, result="skipped: server lagging")
+    await asyncio.sleep(max(0.0, started + steps[-1][0] / TICKS_PER_SECOND - loop.time()))
+    bus.emit("chaos", phase="done", event=event["name"], server=name, total=1)
+    return True
+
+async def play_commands(event: dict, name: str) -> None:
+    """Play an event command by command over RCON"""
+    total = len(event["commands"])
+    bus.emit("chaos", phase="start", event=event["name"], server=name, total=total)
+
     # Announce with title
-    mc_title("§c⚠ CHAOS EVENT ⚠", event["announce"])
-    await asyncio.sleep(1)
-    mc_say(event["announce"])
-    
+    await asyncio.to_thread(mc_title, TITLE, event["announce"], static=True)
+    await asyncio.sleep(ANNOUNCE_DELAY)
+    await asyncio.to_thread(mc_say, event["announce"], static=True)
+
     # Wait for dramatic effect
-    await asyncio.sleep(2)
-    
+    await asyncio.sleep(COMMANDS_DELAY)
+
     # Execute commands
     delay = event.get("delay_between", 0.5)
-    for cmd in event["commands"]:
+    for index, cmd in enumerate(event["commands"], 1):
+        if spawns_entities(cmd) and overloaded(await wait_for_headroom(name, CHAOS_LAG_WAIT / 3)):
+            log.warning("chaos_command_skipped", chaos_event=event["name"], server=name, command=cmd)
+            bus.emit("chaos", phase="command", event=event["name"], server=name,
+                     index=index, total=total, command=cmd, result="skipped: server lagging")
+            continue
+        if await asyncio.to_thread(redundant, cmd, name):
+            bus.emit("chaos", phase="command", event=event["name"], server=name,
+                     index=index, total=total, command=cmd, result="skipped: already set")
+            continue
         try:
-            await asyncio.to_thread(rcon_command, cmd)
+            result = await asyncio.to_thread(rcon_command, cmd)
         except Exception as e:
-            print(f"Failed to execute command '{cmd}': {e}")
+            log.error("chaos_command_failed", chaos_event=event["name"], server=name, command=cmd, error=str(e))
+            result = f"Error: {e}"
+        bus.emit("chaos", phase="command", event=event["name"], server=name,
+                 index=index, total=total, command=cmd, result=result)
         await asyncio.sleep(delay)
-    
-    return event
+
+    bus.emit("chaos", phase="done", event=event["name"], server=name, total=total)
 
 def get_event_by_name(name: str) -> Optional[dict]:
     """Get an event by name"""
@@ -0,0 +1,425 @@
+"""
+JOB QUEUE
+Redis-coordinated work distribution between API replicas and workers
+
+With EXECUTION_MODE=queue the API only enqueues jobs (chaos events,
+announcements, debates) onto a Redis stream; `worker.py` processes claim
+them through a consumer group, so each job runs exactly once no matter how
+many API replicas or uvicorn workers are running. With the default
+EXECUTION_MODE=inline the API runs the same handlers itself.
+
+Either way, playback on a server holds a Redis lock for that server so
+events from different replicas never interleave their RCON output. The
+lock is renewed while playback runs, so it covers the whole event however
+long it takes (a chaos event's datapack timeline, a debate waiting on LLMs).
+"""
+
+import os
+import json
+import uuid
+import asyncio
+import socket
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from redis.exceptions import LockError, ResponseError
+
+from store import get_redis
+from events import trigger_chaos_event
+from minecraft import fan_out, mc_say, mc_say_lines, mc_title
+from personas import persona_registry, get_ai_response
+from players import describe_player
+from alerts import publish
+from bus import bus
+from logs import bind_request_id, current_request_id, get_logger
+from tracing import SpanKind, extract_context, inject_context, span
+
+log = get_logger(__name__)
+
+# =============================================================================
+# CONFIGURATION
+# =============================================================================
+
+EXECUTION_MODE = os.getenv("EXECUTION_MODE", "inline")  # inline | queue
+
+JOB_STREAM = "chaos:jobs"
+JOB_GROUP = "chaos-workers"
+JOB_STREAM_MAXLEN = 10000
+JOB_TTL = 86400                       # Job status hashes live for a day
+JOB_CLAIM_IDLE_MS = int(os.getenv("JOB_CLAIM_IDLE_MS", 60000))  # Idle time before a job counts as abandoned
+WORKER_CONCURRENCY = int(os.getenv("WORKER_CONCURRENCY", 8))
+
+SERVER_LOCK_TTL = int(os.getenv("SERVER_LOCK_TTL", 120))    # Seconds a lock outlives a dead holder
+SERVER_LOCK_WAIT = int(os.getenv("SERVER_LOCK_WAIT", 300))  # Seconds to queue behind another playback
+
+# =============================================================================
+# SERVER LOCKS
+# =============================================================================
+
+@asynccontextmanager
+async def server_locks(servers: List[str]) -> AsyncIterator[None]:
+    """
+    Hold the playback lock for each server
+
+    Locks are taken in sorted order so overlapping multi-server jobs
+    cannot deadlock each other. While held they are renewed every third of
+    SERVER_LOCK_TTL, so they only expire if this process stops.
+    """
+    r = await get_redis()
+    held = []
+    keeper = None
+    try:
+        for server in sorted(set(servers)):
+            lock = r.lock(f"lock:server:{server}", timeout=SERVER_LOCK_TTL, blocking_timeout=SERVER_LOCK_WAIT)
+            if not await lock.acquire():
+                raise LockError(f"Timed out waiting for server {server}")
+            held.append(lock)
+        keeper = asyncio.create_task(_renew_locks(held))
+        yield
+    finally:
+        if keeper:
+            keeper.cancel()
+        for lock in reversed(held):
+            try:
+                await lock.release()
+            except LockError:
+                # Expired during a long playback; someone else may own it now
+                log.warning("server_lock_expired", lock=lock.name)
+
+async def _renew_locks(held: List) -> None:
+    while True:
+        await asyncio.sleep(SERVER_LOCK_TTL / 3)
+        for lock in held:
+            try:
+                await lock.reacquire()
+            except LockError:
+                log.warning("server_lock_lost", lock=lock.name)
+            except Exception as e:
+                # Redis hiccup; the next renewal may still make it in time
+                log.warning("server_lock_renew_failed", lock=lock.name, error=str(e))
+
+# =============================================================================
+# JOB HANDLERS
+# =============================================================================
+
+async def play_chaos(payload: Dict) -> Dict:
+    """Play one chaos event on each target server"""
+    event_name = payload["event"]
+    servers = payload["servers"]
+
+    async def play(server: str) -> str:
+        # trigger_chaos_event returns once the event has finished on the
+        # server (datapack timelines included), so the lock spans playback
+        async with server_locks([server]):
+            return (await trigger_chaos_event(event_name, server))["name"]
+
+    # A lagging server may play a lighter event than the one requested
+    played = dict(zip(servers, await asyncio.gather(*(play(server) for server in servers))))
+
+    r = await get_redis()
+    timestamp = datetime.now().isoformat()
+    async with r.pipeline(transaction=False) as pipe:
+        for server in servers:
+            pipe.lpush("chaos:events", f"{timestamp}|{played[server]}|{server}")
+        pipe.ltrim("chaos:events", 0, 99)  # Keep last 100 events
+        await pipe.execute()
+    await publish("chaos", event=event_name, servers=servers, played=played)
+
+    return {"event": event_name, "servers": servers, "played": played, "timestamp": timestamp}
+
+async def play_announcement(payload: Dict) -> Dict:
+    """Broadcast a chat or title announcement"""
+    targets = ",".join(payload["servers"])
+    if payload.get("title"):
+        await fan_out(targets, mc_title, payload["message"])
+    else:
+        await fan_out(targets, mc_say, payload["message"], payload.get("color", "white"))
+    return {"message": payload["message"], "servers": payload["servers"]}
+
+async def play_chat(payload: Dict) -> Dict:
+    """Ask one persona and say its reply in game"""
+    persona = persona_registry.get(payload["persona"])
+    servers = payload["servers"]
+    # Cached game state only; the chat path never waits on RCON for it
+    context = await describe_player(servers[0], payload["player"])
+    response = await get_ai_response(
+        payload["persona"], payload["message"], payload["player"], context, billed_to=payload["player"]
+    )
+    await fan_out(",".join(servers), mc_say_lines, f"§7[{persona.name}]§r ", response, persona.color)
+
+    r = await get_redis()
+    async with r.pipeline(transaction=False) as pipe:
+        pipe.lpush("chat:log", f"{datetime.now().isoformat()}|{payload['persona']}|{payload['player']}|{payload['message']}|{response}")
+        pipe.ltrim("chat:log", 0, 999)  # Keep last 1000 messages
+        await pipe.execute()
+    bus.emit("chat", persona=payload["persona"], player=payload["player"], message=payload["message"],
+             response=response, servers=servers)
+
+    return {
+        "persona": payload["persona"],
+        "name": persona.name,
+        "response": response,
+        "timestamp": datetime.now().isoformat()
+    }
+
+async def play_debate(payload: Dict) -> Dict:
+    """Have every persona weigh in on a topic, one after another"""
+    topic = payload["topic"]
+    servers = payload["servers"]
+    targets = ",".join(servers)
+    responses = {}
+
+    async with server_locks(servers):
+        # Announce debate start
+        await fan_out(targets, mc_title, "§d§l🎭 AI DEBATE 🎭", f"§7Topic: {topic[:50]}")
+        await asyncio.sleep(2)
+
+        for persona in persona_registry.debaters:
+            prompt = f"Give your brief opinion on this Minecraft debate topic: {topic}"
+            # Nobody asked for the debate, so no player's budget pays for it
+            response = await get_ai_response(persona, prompt, "Debate")
+            responses[persona] = response
+            bus.emit("chat", persona=persona, player="Debate", message=topic, response=response, servers=servers)
+
+            # Send to Minecraft with delay
+            await fan_out(targets, mc_say_lines, f"§7[{persona_registry.get(persona).name}]§r ", response)
+            await asyncio.sleep(3)  # Delay between responses
+
+    # Log debate
+    r = await get_redis()
+    await r.lpush("debates:log", f"{datetime.now().isoformat()}|{topic}|{responses}")
+
+    return {
+        "topic": topic,
+        "responses": responses,
+        "timestamp": datetime.now().isoformat()
+    }
+
+JOB_HANDLERS: Dict[str, Callable[[Dict], Awaitable[Dict]]] = {
+    "chaos": play_chaos,
+    "announce": play_announcement,
+    "debate": play_debate,
+    "chat": play_chat,
+}
+
+# =============================================================================
+# PRODUCER SIDE
+# =============================================================================
+
+async def enqueue(kind: str, payload: Dict) -> str:
+    """
+    Queue a job for the workers
+
+    Returns:
+        Job ID (poll /jobs/{id} or use wait_for_job)
+    """
+    if kind not in JOB_HANDLERS:
+        raise ValueError(f"Unknown job kind: {kind}")
+
+    r = await get_redis()
+    job_id = uuid.uuid4().hex
+    async with r.pipeline(transaction=True) as pipe:
+        pipe.hset(f"job:{job_id}", mapping={
+            "kind": kind,
+            "status": "queued",
+            "created": datetime.now().isoformat()
+        })
+        pipe.expire(f"job:{job_id}", JOB_TTL)
+        pipe.xadd(
+            JOB_STREAM,
+            {
+                "id": job_id,
+                "kind": kind,
+                "payload": json.dumps(payload),
+                "request_id": current_request_id() or "",
+                "trace": json.dumps(inject_context())
+            },
+            maxlen=JOB_STREAM_MAXLEN,
+            approximate=True
+        )
+        await pipe.execute()
+    return job_id
+
+async def get_job(job_id: str) -> Optional[Dict]:
+    """Get a job's status, with its result decoded"""
+    r = await get_redis()
+    job = await r.hgetall(f"job:{job_id}")
+    if not job:
+        return None
+    if "result" in job:
+        job["result"] = json.loads(job["result"])
+    return job
+
+async def wait_for_job(job_id: str, timeout: float) -> Optional[Dict]:
+    """Block until a job finishes (or the timeout passes) and return it"""
+    r = await get_redis()
+    await r.blpop([f"job:{job_id}:done"], timeout=timeout)
+    return await get_job(job_id)
+
+async def dispatch(kind: str, payload: Dict, wait: float = 0) -> Tuple[Optional[str], Optional[Dict]]:
+    """
+    Run a job inline or hand it to the workers, depending on EXECUTION_MODE
+
+    Args:
+        kind: Job kind (chaos, announce, debate, chat)
+        payload: Handler payload
+        wait: In queue mode, seconds to wait for the result (0 = fire and forget)
+
+    Returns:
+        (job_id, result) - job_id is None inline, result is None while still queued
+    """
+    if EXECUTION_MODE != "queue":
+        with span(f"job {kind}", **{"job.kind": kind, "job.mode": "inline"}):
+            return None, await JOB_HANDLERS[kind](payload)
+
+    job_id = await enqueue(kind, payload)
+    if wait <= 0:
+        return job_id, None
+    job = await wait_for_job(job_id, wait)
+    if job and job.get("status") == "done":
+        return job_id, job.get("result")
+    return job_id, None
+
+# =============================================================================
+# WORKER SIDE
+# =============================================================================
+
+async def ensure_group() -> None:
+    """Create the stream and consumer group if they don't exist"""
+    r = await get_redis()
+    try:
+        await r.xgroup_create(JOB_STREAM, JOB_GROUP, id="0", mkstream=True)
+    except ResponseError as e:
+        if "BUSYGROUP" not in str(e):
+            raise
+
+async def _keep_claimed(msg_id: str, consumer: str) -> None:
+    """
+    Reset a running job's idle time so other workers don't reclaim it
+
+    Jobs can wait SERVER_LOCK_WAIT for a server and then play for minutes,
+    far past JOB_CLAIM_IDLE_MS; only a worker that stops refreshing (i.e.
+    died) lets its jobs go idle.
+    """
+    r = await get_redis()
+    while True:
+        await asyncio.sleep(JOB_CLAIM_IDLE_MS / 3000)
+        try:
+            await r.xclaim(JOB_STREAM, JOB_GROUP, consumer, 0, [msg_id], justid=True)
+        except Exception as e:
+            log.warning("job_claim_refresh_failed", msg_id=msg_id, error=str(e))
+
+async def process_job(msg_id: str, fields: Dict[str, str], consumer: Optional[str] = None) -> None:
+    """
+    Run one claimed job and record its outcome
+
+    Args:
+        msg_id: Stream entry ID
+        fields: Stream entry fields
+        consumer: This worker's consumer name, to keep the entry claimed
+            while the job runs
+    """
+    r = await get_redis()
+    if not fields:
+        # Entry was trimmed from the stream while pending
+        await r.xack(JOB_STREAM, JOB_GROUP, msg_id)
+        return
+    job_id = fields.get("id", msg_id)
+    key = f"job:{job_id}"
+    # Worker logs carry the ID of the request that queued the job
+    bind_request_id(fields.get("request_id"))
+
+    # A job another worker already started is never replayed: a chaos
+    # event half-played by a crashed worker is better dropped than doubled
+    status = await r.hget(key, "status")
+    if status not in (None, "queued"):
+        if status == "running":
+            await r.hset(key, mapping={"status": "failed", "error": "worker lost during playback"})
+        await r.xack(JOB_STREAM, JOB_GROUP, msg_id)
+        return
+
+    await r.hset(key, mapping={"status": "running", "started": datetime.now().isoformat()})
+    keeper = asyncio.create_task(_keep_claimed(msg_id, consumer)) if consumer else None
+    # Continue the trace of the request that queued the job
+    parent = extract_context(json.loads(fields.get("trace") or "{}"))
+    try:
+        with span(f"job {fields['kind']}", SpanKind.CONSUMER, parent=parent,
+                  **{"job.id": job_id, "job.kind": fields["kind"], "job.mode": "queue"}):
+            result = await JOB_HANDLERS[fields["kind"]](json.loads(fields["payload"]))
+        outcome = {"status": "done", "result": json.dumps(result, default=str)}
+    except Exception as e:
+        log.error("job_failed", job_id=job_id, kind=fields.get("kind"), error=str(e))
+        outcome = {"status": "failed", "error": str(e)}
+    finally:
+        if keeper:
+            keeper.cancel()
+
+    outcome["finished"] = datetime.now().isoformat()
+    async with r.pipeline(transaction=False) as pipe:
+        pipe.hset(key, mapping=outcome)
+        pipe.expire(key, JOB_TTL)
+        pipe.rpush(f"{key}:done", "1")
+        pipe.expire(f"{key}:done", 60)
+        pipe.xack(JOB_STREAM, JOB_GROUP, msg_id)
+        await pipe.execute()
+
+async def run_worker(
+    consumer: Optional[str] = None,
+    concurrency: int = WORKER_CONCURRENCY,
+    stop: Optional[asyncio.Event] = None
+) -> None:
+    """
+    Claim and run jobs until `stop` is set
+
+    Args:
+        consumer: Consumer name within the group (defaults to host-pid)
+        concurrency: Jobs run in parallel by this worker
+        stop: Event that ends the loop (in-flight jobs are awaited)
+    """
+    consumer = consumer or f"{socket.gethostname()}-{os.getpid()}"
+    stop = stop or asyncio.Event()
+    await ensure_group()
+    r = await get_redis()
+
+    slots = asyncio.Semaphore(concurrency)
+    running: set = set()
+    last_reclaim = 0.0
+    loop = asyncio.get_running_loop()
+    log.info("worker_started", consumer=consumer, stream=JOB_STREAM, concurrency=concurrency)
+
+    async def run(msg_id: str, fields: Dict[str, str]) -> None:
+        try:
+            await process_job(msg_id, fields, consumer)
+        finally:
+            slots.release()
+
+    def start(messages: List) -> None:
+        for msg_id, fields in messages:
+            task = asyncio.create_task(run(msg_id, fields))
+            running.add(task)
+            task.add_done_callback(running.discard)
+
+    while not stop.is_set():
+        await slots.acquire()
+
+        # Periodically take over jobs stuck with a dead consumer
+        if loop.time() - last_reclaim > JOB_CLAIM_IDLE_MS / 1000:
+            last_reclaim = loop.time()
+            reclaimed = await r.xautoclaim(
+                JOB_STREAM, JOB_GROUP, consumer, min_idle_time=JOB_CLAIM_IDLE_MS, count=1
+            )
+            claimed = reclaimed[1]
+            if claimed:
+                start(claimed)
+                continue
+
+        entries = await r.xreadgroup(JOB_GROUP, consumer, {JOB_STREAM: ">"}, count=1, block=2000)
+        messages = [m for _, batch in entries or [] for m in batch]
+        if messages:
+            start(messages)
+        else:
+            slots.release()
+
+    if running:
+        await asyncio.gather(*running, return_exceptions=True)
@@ -0,0 +1,266 @@
+"""
+KNOWLEDGE INDEX
+BM25 retrieval over a bundled corpus of Minecraft facts
+
+knowledge/corpus.jsonl holds short snippets (recipes, mob behaviour, ore
+heights), one {"id", "topic", "title", "text"} object per line; any other
+*.jsonl in KNOWLEDGE_DIR is indexed too. The title names the snippet's
+subject ("Diamond ore") and counts TITLE_WEIGHT times, so a snippet about
+diamonds outranks short ones that only mention a diamond pickaxe. The
+index is built offline (the Docker image builds it):
+
+    python knowledge.py build
+
+which writes KNOWLEDGE_INDEX (default knowledge/index/): the vocabulary and
+snippets as JSON, and the postings as NumPy arrays (per term: document ids
+and precomputed BM25 weights). At runtime the arrays are memory-mapped on
+the first lookup, so neither NumPy nor the index is loaded at startup. A
+lookup adds up the postings of the query's terms and returns the best
+KNOWLEDGE_TOP_K snippets scoring at least KNOWLEDGE_MIN_SCORE, in well under
+a millisecond.
+
+get_ai_response puts the snippets ahead of the player's message for
+personas with "knowledge" enabled (the default).
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import glob
+import math
+import hashlib
+import asyncio
+import threading
+from collections import Counter
+from typing import Any, Dict, List, Tuple
+
+from logs import get_logger
+
+log = get_logger(__name__)
+
+# =============================================================================
+# CONFIGURATION
+# =============================================================================
+
+KNOWLEDGE_ENABLED = os.getenv("KNOWLEDGE_ENABLED", "true").lower() == "true"
+KNOWLEDGE_DIR = os.getenv(
+    "KNOWLEDGE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "knowledge")
+)
+KNOWLEDGE_INDEX = os.getenv("KNOWLEDGE_INDEX", os.path.join(KNOWLEDGE_DIR, "index"))
+KNOWLEDGE_TOP_K = int(os.getenv("KNOWLEDGE_TOP_K", 3))
+KNOWLEDGE_MIN_SCORE = float(os.getenv("KNOWLEDGE_MIN_SCORE", 1.5))
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+TITLE_WEIGHT = 3   # Times a title term counts towards its snippet's term frequency
+
+STOPWORDS = frozenset("""
+a an and are as at be but by can do does for from has have how i if in into is it its
+me my of on or so that the their them then there these they this to too up was we
+what when where which who why will with you your yours please tell know find get
+any some all just about like should would could need want hey hello oracle architect explorer
+""".split())
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+# Question words (stopwords themselves) that say what kind of fact is
+# wanted add these terms to the query, at EXPANSION_WEIGHT so they only
+# break ties between snippets about the same subject
+QUERY_EXPANSIONS = {
+    "where": ("spawn", "generate"),
+}
+EXPANSION_WEIGHT = 0.3
+
+# =============================================================================
+# TOKENIZING
+# =============================================================================
+
+def stem(word: str) -> str:
+    """Fold plurals so "diamonds" matches "diamond" (deliberately crude)"""
+    if len(word) > 4 and word.endswith("ies"):
+        return word[:-3] + "y"
+    if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+        return word[:-1]
+    return word
+
+def tokenize(text: str) -> List[str]:
+    return [stem(w) for w in TOKEN_RE.findall(text.lower()) if w not in STOPWORDS]
+
+def query_terms(query: str) -> Dict[str, float]:
+    """Query tokens (weight 1) plus the expansions of any question words"""
+    terms = dict.fromkeys(tokenize(query), 1.0)
+    for word in TOKEN_RE.findall(query.lower()):
+        for term in QUERY_EXPANSIONS.get(word, ()):
+            terms.setdefault(term, EXPANSION_WEIGHT)
+    return terms
+
+# =============================================================================
+# BUILD
+# =============================================================================
+
+def document_terms(doc: Dict) -> Counter:
+    """Term frequencies of a snippet, its title weighted TITLE_WEIGHT times"""
+    terms = Counter(tokenize(f"{doc.get('topic', '')} {doc['text']}"))
+    for term in tokenize(doc.get("title", "")):
+        terms[term] += TITLE_WEIGHT
+    return terms
+
+def corpus_files(directory: str = KNOWLEDGE_DIR) -> List[str]:
+    return sorted(glob.glob(os.path.join(directory, "*.jsonl")))
+
+def corpus_digest(paths: List[str]) -> str:
+    digest = hashlib.sha1()
+    for path in paths:
+        with open(path, "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+def build_index(directory: str = KNOWLEDGE_DIR, out: str = KNOWLEDGE_INDEX) -> Dict[str, Any]:
+    """
+    Build the index from every *.jsonl corpus in a directory
+
+    Args:
+        directory: Holds the corpus files
+        out: Directory the index is written to
+
+    Returns:
+        Summary (documents, terms, postings)
+    """
+    import numpy as np
+
+    paths = corpus_files(directory)
+    docs: List[Dict] = []
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            docs.extend(json.loads(line) for line in f if line.strip())
+
+    counts = [document_terms(d) for d in docs]
+    lengths = [sum(c.values()) for c in counts]
+    avgdl = sum(lengths) / max(len(docs), 1)
+
+    postings: Dict[str, List[Tuple[int, float]]] = {}
+    for doc_id, (terms, length) in enumerate(zip(counts, lengths)):
+        norm = K1 * (1 - B + B * length / avgdl)
+        for term, tf in terms.items():
+            postings.setdefault(term, []).append((doc_id, tf * (K1 + 1) / (tf + norm)))
+
+    vocab = sorted(postings)
+    term_ptr = np.zeros(len(vocab) + 1, dtype=np.int32)
+    doc_ids, weights = [], []
+    for i, term in enumerate(vocab):
+        entries = postings[term]
+        idf = math.log(1 + (len(docs) - len(entries) + 0.5) / (len(entries) + 0.5))
+        doc_ids.extend(d for d, _ in entries)
+        weights.extend(w * idf for _, w in entries)
+        term_ptr[i + 1] = len(doc_ids)
+
+    os.makedirs(out, exist_ok=True)
+    np.save(os.path.join(out, "term_ptr.npy"), term_ptr)
+    np.save(os.path.join(out, "doc_ids.npy"), np.asarray(doc_ids, dtype=np.int32))
+    np.save(os.path.join(out, "weights.npy"), np.asarray(weights, dtype=np.float32))
+    meta = {
+        "digest": corpus_digest(paths),
+        "terms": {term: i for i, term in enumerate(vocab)},
+        "docs": [{"id": d.get("id"), "topic": d.get("topic"), "title": d.get("title"), "text": d["text"]} for d in docs]
+    }
+    with open(os.path.join(out, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False)
+    return {"documents": len(docs), "terms": len(vocab), "postings": len(doc_ids)}
+
+# =============================================================================
+# SEARCH
+# =============================================================================
+
+class KnowledgeIndex:
+    """Memory-mapped BM25 index, opened on first use"""
+
+    def __init__(self, directory: str = KNOWLEDGE_DIR, path: str = KNOWLEDGE_INDEX):
+        self.path = path
+        self.directory = directory
+        self.loaded = False
+        self.available = False
+        self._lock = threading.Lock()
+
+    def load(self) -> bool:
+        """Open the index (blocking, once); False if it hasn't been built"""
+        with self._lock:
+            if self.loaded:
+                return self.available
+            self.loaded = True
+            if not os.path.exists(os.path.join(self.path, "meta.json")):
+                log.warning("knowledge_index_missing", path=self.path, hint="python knowledge.py build")
+                return False
+            started = time.perf_counter()
+            try:
+                import numpy as np
+
+                with open(os.path.join(self.path, "meta.json"), encoding="utf-8") as f:
+                    meta = json.load(f)
+                self.np = np
+                self.terms: Dict[str, int] = meta["terms"]
+                self.docs: List[Dict] = meta["docs"]
+                self.term_ptr = np.load(os.path.join(self.path, "term_ptr.npy"), mmap_mode="r")
+                self.doc_ids = np.load(os.path.join(self.path, "doc_ids.npy"), mmap_mode="r")
+                self.weights = np.load(os.path.join(self.path, "weights.npy"), mmap_mode="r")
+            except Exception as e:
+                # Answers just go ungrounded; chat keeps working
+                log.warning("knowledge_index_unavailable", path=self.path, error=str(e))
+                return False
+            if meta["digest"] != corpus_digest(corpus_files(self.directory)):
+                log.warning("knowledge_index_stale", path=self.path, hint="python knowledge.py build")
+            self.available = True
+            log.info("knowledge_index_loaded", documents=len(self.docs), terms=len(self.terms),
+                     seconds=round(time.perf_counter() - started, 3))
+            return True
+
+    def search(self, query: str, k: int = KNOWLEDGE_TOP_K, min_score: float = KNOWLEDGE_MIN_SCORE) -> List[Dict]:
+        """
+        Best-matching snippets for a query
+
+        Returns:
+            Up to k docs ({"id", "topic", "title", "text", "score"}), best first
+        """
+        if not self.available:
+            return []
+        np = self.np
+        term_ids = {self.terms[t]: w for t, w in query_terms(query).items() if t in self.terms}
+        if not term_ids:
+            return []
+        scores = np.zeros(len(self.docs), dtype=np.float32)
+        for t, weight in term_ids.items():
+            start, end = self.term_ptr[t], self.term_ptr[t + 1]
+            # A term's postings hold each document once, so fancy-index += is safe
+            scores[self.doc_ids[start:end]] += self.weights[start:end] * weight
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [
+            {**self.docs[i], "score": round(float(scores[i]), 3)}
+            for i in top if scores[i] >= min_score
+        ]
+
+
+index = KnowledgeIndex()
+
+async def lookup(query: str, k: int = KNOWLEDGE_TOP_K) -> List[str]:
+    """Snippet texts for a prompt (empty when disabled, unbuilt or nothing matches)"""
+    if not KNOWLEDGE_ENABLED:
+        return []
+    if not index.loaded:
+        await asyncio.to_thread(index.load)
+    return [doc["text"] for doc in index.search(query, k)]
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] not in ("build", "search"):
+        sys.exit("Usage: python knowledge.py build | search <query>")
+    if sys.argv[1] == "build":
+        summary = build_index()
+        print(f"Indexed {summary['documents']} snippets ({summary['terms']} terms) into {index.path}")
+    else:
+        index.load()
+        for doc in index.search(" ".join(sys.argv[2:])):
+            print(f"{doc['score']:6.2f}  {doc['text']}")
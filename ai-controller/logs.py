@@ -0,0 +1,90 @@
+"""
+STRUCTURED LOGGING
+JSON logs via structlog, tagged with the request's correlation ID
+
+Every log line written while handling a request (or a job that request
+queued) carries the same `request_id`, which is also returned to clients
+in the X-Request-ID header, plus the active trace and span IDs.
+"""
+
+import os
+import uuid
+import logging
+from typing import Optional
+
+import orjson
+import structlog
+from opentelemetry import trace
+from structlog.contextvars import bind_contextvars, clear_contextvars, get_contextvars
+
+# =============================================================================
+# CONFIGURATION
+# =============================================================================
+
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json")  # json | console
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+
+REQUEST_ID_HEADER = "X-Request-ID"
+
+# =============================================================================
+# SETUP
+# =============================================================================
+
+def add_trace_context(logger, method_name, event_dict):
+    """Tag lines logged inside a span with its trace and span IDs"""
+    ctx = trace.get_current_span().get_span_context()
+    if ctx.is_valid:
+        event_dict["trace_id"] = format(ctx.trace_id, "032x")
+        event_dict["span_id"] = format(ctx.span_id, "016x")
+    return event_dict
+
+def configure_logging() -> None:
+    """Configure structlog once for the process"""
+    processors = [
+        structlog.contextvars.merge_contextvars,
+        add_trace_context,
+        structlog.processors.add_log_level,
+        structlog.processors.TimeStamper(fmt="iso", utc=True),
+        structlog.processors.format_exc_info,
+    ]
+    if LOG_FORMAT == "console":
+        processors.append(structlog.dev.ConsoleRenderer())
+        factory = structlog.PrintLoggerFactory()
+    else:
+        processors.append(structlog.processors.JSONRenderer(serializer=orjson.dumps))
+        factory = structlog.BytesLoggerFactory()
+
+    structlog.configure(
+        processors=processors,
+        wrapper_class=structlog.make_filtering_bound_logger(logging.getLevelName(LOG_LEVEL)),
+        logger_factory=factory,
+        cache_logger_on_first_use=True,
+    )
+
+configure_logging()
+
+def get_logger(name: str) -> structlog.typing.FilteringBoundLogger:
+    """Logger that tags each line with the module it came from"""
+    return structlog.get_logger().bind(logger=name)
+
+# =============================================================================
+# CORRELATION IDS
+# =============================================================================
+
+def new_request_id() -> str:
+    return uuid.uuid4().hex
+
+def bind_request_id(request_id: Optional[str] = None) -> str:
+    """
+    Start a fresh logging context for a request or job
+
+    Returns:
+        The bound request ID (generated if none was given)
+    """
+    request_id = request_id or new_request_id()
+    clear_contextvars()
+    bind_contextvars(request_id=request_id)
+    return request_id
+
+def current_request_id() -> Optional[str]:
+    return get_contextvars().get("request_id")
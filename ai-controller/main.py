@@ -3,40 +3,48 @@ CHAOS AI CONTROLLER
 Central orchestration API for multi-AI Minecraft integration
 """
 
-import os
+import time
+
+# Taken before the heavy imports so the startup report covers them
+BOOT_STARTED = time.perf_counter()
+
+import random
 import asyncio
 from datetime import datetime
 from contextlib import asynccontextmanager
-from typing import Optional
+from typing import AsyncIterator, Optional
 
-from fastapi import FastAPI, HTTPException, BackgroundTasks, Query
+from fastapi import FastAPI, HTTPException, BackgroundTasks, Depends, Query, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
-import redis.asyncio as redis
-
-from personas import AI_PERSONAS, get_ai_response
-from events import CHAOS_EVENTS, trigger_chaos_event
-from minecraft import rcon_command, mc_say, mc_title, get_online_players
-from quests import generate_quest
 
-
-# =============================================================================
-# CONFIGURATION
-# =============================================================================
-
-REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379")
-
-# =============================================================================
-# REDIS CONNECTION
-# =============================================================================
-
-redis_pool = None
-
-async def get_redis():
-    global redis_pool
-    if redis_pool is None:
-        redis_pool = redis.from_url(REDIS_URL, decode_responses=True)
-    return redis_pool
+from personas import persona_registry
+from providers import providers
+from events import CHAOS_EVENTS, get_event_by_name
+from datapack import install as install_datapack
+from minecraft import rcon_command, rcon_batch, mc_say, mc_title, get_roster, fan_out, close_pools
+from servers import registry, UnknownServerError
+from quests import generate_quest, generate_quests, quest_announcements
+from objectives import QUEST_POLL_INTERVAL, QuestPoller, finish_quest, start_tracking, store_quests
+from store import get_redis, close_redis
+from jobs import EXECUTION_MODE, dispatch, get_job, play_chat
+from status import get_status
+from ticks import TICK_HISTORY, TICK_SAMPLE_INTERVAL, TickSampler, get_ticks
+from world import WORLD_STATE_REFRESH, WorldRefresher, get_world_state, restorer
+from admission import admit
+from usage import get_usage
+from chatlog import start_chat_ingest
+from autopilot import AUTOPILOT_ENABLED, Autopilot, get_schedule
+from alerts import HEALTH_CHECK_INTERVAL, HealthWatcher
+from bus import bus, Subscription
+from logs import get_logger
+from metrics import RequestMetricsMiddleware, render_metrics
+from tracing import init_tracing, shutdown_tracing
+
+log = get_logger(__name__)
+
+init_tracing("chaos-controller")
 
 # =============================================================================
 # FASTAPI APP
@@ -45,15 +53,65 @@ async def get_redis():
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Application lifespan handler"""
-    print("🚀 Chaos AI Controller starting...")
+    log.info("controller_starting", execution_mode=EXECUTION_MODE)
     # Initialize Redis connection
     await get_redis()
+    # SDKs load on first use unless LLM_PRELOAD names them
+    await providers.preload()
+    # Compile chaos events into the world's datapacks (CHAOS_DATAPACK_DIR)
+    try:
+        await install_datapack(CHAOS_EVENTS)
+    except OSError as e:
+        log.warning("chaos_datapack_failed", error=str(e))
+    log.info("startup_report", startup_seconds=round(time.perf_counter() - BOOT_STARTED, 3),
+             providers=providers.report())
+    # Push health transitions to subscribers instead of waiting to be polled
+    stop = asyncio.Event()
+    watcher = None
+    if HEALTH_CHECK_INTERVAL > 0:
+        watcher = asyncio.create_task(HealthWatcher().run(stop))
+    # Tick timing history; chaos playback backs off when a server lags
+    sampler = None
+    if TICK_SAMPLE_INTERVAL > 0:
+        sampler = asyncio.create_task(TickSampler().run(stop))
+    # Measurable quests complete themselves from scoreboard progress
+    poller = None
+    if QUEST_POLL_INTERVAL > 0:
+        poller = asyncio.create_task(QuestPoller().run(stop))
+    # Time/weather/difficulty served from memory
+    refresher = None
+    if WORLD_STATE_REFRESH > 0:
+        refresher = asyncio.create_task(WorldRefresher().run(stop))
+    # Share /stream events with other replicas and the workers
+    relay = asyncio.create_task(bus.run_relay())
+    # Scheduled chaos; replicas elect one leader through Redis
+    autopilot = None
+    if AUTOPILOT_ENABLED:
+        autopilot = Autopilot()
+        autopilot.start()
+    # Answer @persona mentions typed in game (servers with a log_file)
+    ingest = start_chat_ingest(stop)
     yield
     # Cleanup
-    global redis_pool
-    if redis_pool:
-        await redis_pool.close()
-    print("👋 Chaos AI Controller shutting down...")
+    stop.set()
+    if autopilot:
+        await autopilot.stop()
+    if ingest:
+        await asyncio.gather(*ingest, return_exceptions=True)
+    if watcher:
+        await watcher
+    if sampler:
+        await sampler
+    if refresher:
+        await refresher
+    if poller:
+        await poller
+    restorer.cancel()
+    relay.cancel()
+    shutdown_tracing()
+    await close_redis()
+    close_pools()
+    log.info("controller_stopped")
 
 app = FastAPI(
     title="Chaos AI Controller",
@@ -69,8 +127,12 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Request-ID"],
 )
 
+# Outermost, so timings include CORS and every response gets a request ID
+app.add_middleware(RequestMetricsMiddleware)
+
 # =============================================================================
 # REQUEST/RESPONSE MODELS
 # =============================================================================
@@ -79,14 +141,49 @@ class ChatMessage(BaseModel):
     player: str
     message: str
     persona: str = "oracle"
+    server: Optional[str] = None
 
 class CommandRequest(BaseModel):
     command: str
+    server: Optional[str] = None
 
 class AnnounceRequest(BaseModel):
     message: str
     title: bool = False
     color: str = "white"
+    server: Optional[str] = None
+
+# =============================================================================
+# SERVER TARGETING
+# =============================================================================
+
+SERVER_QUERY = Query(None, description="Server, group, comma-separated list, or 'all'")
+
+def resolve_servers(target: Optional[str]) -> list:
+    """Resolve a server target, turning unknown names into a 404"""
+    try:
+        return [s.name for s in registry.resolve(target)]
+    except UnknownServerError as e:
+        raise HTTPException(status_code=404, detail=f"Unknown server or group: {e.args[0]}")
+
+# =============================================================================
+# ADMISSION CONTROL
+# =============================================================================
+
+# Only the LLM-backed endpoints are admitted; health, status and admin routes
+# skip this entirely so they answer promptly while these shed load
+
+async def admit_chat(msg: ChatMessage) -> AsyncIterator[None]:
+    async with admit("chat", player=msg.player):
+        yield
+
+async def admit_debate() -> AsyncIterator[None]:
+    async with admit("debate"):
+        yield
+
+async def admit_quest(player: str) -> AsyncIterator[None]:
+    async with admit("quest", player=player):
+        yield
 
 # =============================================================================
 # HEALTH & STATUS ENDPOINTS
@@ -102,15 +199,22 @@ async def root():
         "timestamp": datetime.now().isoformat()
     }
 
+@app.get("/servers")
+async def list_servers():
+    """List configured Minecraft servers and groups"""
+    return {
+        "default": registry.default,
+        "servers": [s.public() for s in registry.servers.values()],
+        "groups": registry.groups
+    }
+
 @app.get("/health")
 async def health():
     """Health check endpoint"""
-    # Check RCON connection
-    try:
-        result = rcon_command("list")
-        rcon_status = "ok" if "players" in result.lower() else "error"
-    except Exception as e:
-        rcon_status = f"error: {str(e)}"
+    # Check RCON connection on every server concurrently
+    results = await fan_out("all", rcon_command, "list")
+    servers = {name: "ok" if get_roster(result) else f"error: {result}" for name, result in results.items()}
+    rcon_status = "ok" if all(status == "ok" for status in servers.values()) else "error"
     
     # Check Redis connection
     try:
@@ -124,18 +228,66 @@ async def health():
         "status": "healthy" if rcon_status == "ok" and redis_status == "ok" else "degraded",
         "rcon": rcon_status,
         "redis": redis_status,
+        "servers": servers,
         "timestamp": datetime.now().isoformat()
     }
 
+@app.get("/providers")
+async def list_providers():
+    """LLM provider load state and SDK load times"""
+    return providers.report()
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus metrics"""
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
+@app.get("/status")
+async def status(server: Optional[str] = SERVER_QUERY):
+    """Aggregated status: RCON, roster, TPS, Redis and recent events in one call"""
+    return await get_status(resolve_servers(server))
+
+@app.get("/status/ticks")
+async def status_ticks(
+    server: Optional[str] = SERVER_QUERY,
+    limit: int = Query(TICK_HISTORY, ge=1, le=TICK_HISTORY)
+):
+    """Recent TPS/MSPT samples per server, and whether chaos is being throttled"""
+    return get_ticks(resolve_servers(server), limit)
+
+@app.get("/world")
+async def world_state(server: Optional[str] = SERVER_QUERY):
+    """Time, weather, difficulty and seed per server, from the world-state cache"""
+    names = resolve_servers(server)
+    states = await asyncio.gather(*(asyncio.to_thread(get_world_state, name) for name in names))
+    return {"servers": dict(zip(names, states))}
+
 @app.get("/players")
-async def get_players():
-    """Get online players"""
-    result = rcon_command("list")
-    players = get_online_players(result)
+async def get_players(server: Optional[str] = SERVER_QUERY):
+    """Get online players (per server when several are targeted)"""
+    names = resolve_servers(server)
+    results = await fan_out(",".join(names), rcon_command, "list")
+
+    by_server = {}
+    for name, result in results.items():
+        roster = get_roster(result)
+        players = list(roster.players) if roster else []
+        by_server[name] = {
+            "raw": result,
+            "players": players,
+            "count": len(players),
+            "max": roster.max_players if roster else None
+        }
+
+    if len(by_server) == 1:
+        return by_server[names[0]]
+
+    players = [p for entry in by_server.values() for p in entry["players"]]
     return {
-        "raw": result,
         "players": players,
-        "count": len(players)
+        "count": len(players),
+        "servers": by_server
     }
 
 # =============================================================================
@@ -145,71 +297,43 @@ async def get_players():
 @app.get("/ai/personas")
 async def list_personas():
     """List available AI personas"""
-    return {
-        persona: {
-            "name": config["name"],
-            "model": config["model"],
-            "color": config["color"],
-            "description": config["system"][:100] + "..."
-        }
-        for persona, config in AI_PERSONAS.items()
-    }
+    return persona_registry.listing
+
+@app.get("/ai/usage")
+async def ai_usage(
+    day: Optional[str] = Query(None, pattern=r"^\d{4}-\d{2}-\d{2}$"),
+    player: Optional[str] = None,
+    persona: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=500)
+):
+    """LLM tokens used per player and persona on one day (UTC, default today), and the budgets"""
+    return await get_usage(day, player, persona, limit)
 
-@app.post("/ai/chat")
+@app.post("/ai/chat", dependencies=[Depends(admit_chat)])
 async def ai_chat(msg: ChatMessage):
     """Chat with an AI persona"""
-    if msg.persona not in AI_PERSONAS:
+    if msg.persona not in persona_registry:
         raise HTTPException(status_code=400, detail=f"Unknown persona: {msg.persona}")
-    
-    response = await get_ai_response(msg.persona, msg.message, msg.player)
-    
-    # Send to Minecraft
-    persona_config = AI_PERSONAS[msg.persona]
-    name = persona_config["name"]
-    color = persona_config["color"]
-    
-    mc_say(f"§7[{name}]§r {response}", color)
-    
-    # Log to Redis
-    r = await get_redis()
-    await r.lpush("chat:log", f"{datetime.now().isoformat()}|{msg.persona}|{msg.player}|{msg.message}|{response}")
-    await r.ltrim("chat:log", 0, 999)  # Keep last 1000 messages
-    
-    return {
+    names = resolve_servers(msg.server)
+    return await play_chat({
         "persona": msg.persona,
-        "name": name,
-        "response": response,
-        "timestamp": datetime.now().isoformat()
-    }
-
-@app.post("/ai/debate")
-async def ai_debate(topic: str = Query(..., description="Topic for the AIs to debate")):
+        "player": msg.player,
+        "message": msg.message,
+        "servers": names
+    })
+
+@app.post("/ai/debate", dependencies=[Depends(admit_debate)])
+async def ai_debate(
+    topic: str = Query(..., description="Topic for the AIs to debate"),
+    server: Optional[str] = SERVER_QUERY,
+    wait: float = Query(60, ge=0, le=120, description="Seconds to wait for a queued debate")
+):
     """Have all AIs debate a topic"""
-    responses = {}
-    
-    # Announce debate start
-    mc_title("§d§l🎭 AI DEBATE 🎭", f"§7Topic: {topic[:50]}")
-    await asyncio.sleep(2)
-    
-    for persona in ["oracle", "architect", "explorer"]:
-        prompt = f"Give your brief opinion on this Minecraft debate topic: {topic}"
-        response = await get_ai_response(persona, prompt, "Debate")
-        responses[persona] = response
-        
-        # Send to Minecraft with delay
-        persona_config = AI_PERSONAS[persona]
-        mc_say(f"§7[{persona_config['name']}]§r {response}")
-        await asyncio.sleep(3)  # Delay between responses
-    
-    # Log debate
-    r = await get_redis()
-    await r.lpush("debates:log", f"{datetime.now().isoformat()}|{topic}|{responses}")
-    
-    return {
-        "topic": topic,
-        "responses": responses,
-        "timestamp": datetime.now().isoformat()
-    }
+    names = resolve_servers(server)
+    job_id, result = await dispatch("debate", {"topic": topic, "servers": names}, wait=wait)
+    if result is None:
+        return {"topic": topic, "status": "queued", "job_id": job_id}
+    return result
 
 # =============================================================================
 # CHAOS EVENT ENDPOINTS
@@ -229,22 +353,33 @@ async def list_chaos_events():
 @app.post("/chaos/trigger")
 async def trigger_chaos(
     background_tasks: BackgroundTasks,
-    event_name: Optional[str] = Query(None, description="Specific event to trigger")
+    event_name: Optional[str] = Query(None, description="Specific event to trigger"),
+    server: Optional[str] = SERVER_QUERY
 ):
-    """Trigger a chaos event (random or specific)"""
-    event = await trigger_chaos_event(event_name)
-    
-    # Log to Redis
-    r = await get_redis()
-    await r.lpush("chaos:events", f"{datetime.now().isoformat()}|{event['name']}")
-    await r.ltrim("chaos:events", 0, 99)  # Keep last 100 events
+    """Trigger a chaos event (random or specific) on one or more servers"""
+    names = resolve_servers(server)
+
+    # Pick once so every targeted server plays the same event
+    event = get_event_by_name(event_name) if event_name else None
+    if event is None:
+        event = random.choice(CHAOS_EVENTS)
+
+    job_id, _ = await dispatch("chaos", {"event": event["name"], "servers": names})
     
     return {
         "event": event["name"],
-        "status": "triggered",
+        "status": "queued" if job_id else "triggered",
+        "job_id": job_id,
+        "servers": names,
         "timestamp": datetime.now().isoformat()
     }
 
+@app.get("/chaos/autopilot")
+async def chaos_autopilot():
+    """Autopilot leader and when each server's next event is due"""
+    names = registry.names()
+    return await get_schedule(names, await get_status(names))
+
 @app.get("/chaos/history")
 async def chaos_history(limit: int = Query(10, ge=1, le=100)):
     """Get chaos event history"""
@@ -259,21 +394,71 @@ async def chaos_history(limit: int = Query(10, ge=1, le=100)):
 # QUEST ENDPOINTS
 # =============================================================================
 
-@app.post("/quest/generate/{player}")
-async def generate_player_quest(player: str):
+@app.post("/quest/generate/{player}", dependencies=[Depends(admit_quest)])
+async def generate_player_quest(player: str, server: Optional[str] = SERVER_QUERY):
     """Generate a quest for a player"""
-    quest = await generate_quest(player)
+    names = resolve_servers(server)
+    targets = ",".join(names)
+    quest = await generate_quest(player, names[0])
+    # Measurable quests get a scoreboard baseline and complete themselves
+    quest = (await start_tracking({player: quest}, {player: names[0]}))[player]
     
     # Announce in game
-    mc_title(f"§6NEW QUEST", f"§e{quest['title']}")
-    mc_say(f"§7[The Oracle]§r {player}, your quest: {quest['description']}")
+    await fan_out(targets, mc_title, f"§6NEW QUEST", f"§e{quest['title']}")
+    await fan_out(targets, mc_say, f"§7[The Oracle]§r {player}, your quest: {quest['description']}")
     
     # Store in Redis
-    r = await get_redis()
-    await r.hset(f"quest:{player}", mapping=quest)
+    await store_quests({player: quest})
+    bus.emit("quest", action="generated", player=player, quest=quest, servers=targets.split(","))
     
     return quest
 
+@app.post("/quest/generate-all")
+async def generate_all_quests(
+    server: Optional[str] = SERVER_QUERY,
+    replace: bool = Query(False, description="Also replace quests players already have")
+):
+    """Generate quests for every online player at once"""
+    names = resolve_servers(server)
+    rosters = await fan_out(",".join(names), rcon_command, "list")
+    players = {}
+    for name in names:
+        roster = get_roster(rosters[name])
+        for player in (roster.players if roster else ()):
+            players.setdefault(player, name)
+
+    r = await get_redis()
+    skipped = []
+    if not replace and players:
+        async with r.pipeline(transaction=False) as pipe:
+            for player in players:
+                pipe.exists(f"quest:{player}")
+            active = await pipe.execute()
+        skipped = [player for player, has in zip(players, active) if has]
+        for player in skipped:
+            del players[player]
+    if not players:
+        return {"quests": {}, "count": 0, "skipped": skipped, "servers": names}
+
+    # Charged one token per quest, held as one request
+    async with admit("quest", cost=len(players)):
+        quests = await generate_quests(players)
+    quests = await start_tracking(quests, players)
+    await store_quests(quests)
+
+    # One RCON batch of titles and messages per server
+    by_server = {}
+    for player, quest in quests.items():
+        by_server.setdefault(players[player], {})[player] = quest
+    await asyncio.gather(*(
+        asyncio.to_thread(rcon_batch, quest_announcements(server_quests), name)
+        for name, server_quests in by_server.items()
+    ))
+    for player, quest in quests.items():
+        bus.emit("quest", action="generated", player=player, quest=quest, servers=[players[player]])
+
+    return {"quests": quests, "count": len(quests), "skipped": skipped, "servers": names}
+
 @app.get("/quest/{player}")
 async def get_player_quest(player: str):
     """Get active quest for a player"""
@@ -284,15 +469,16 @@ async def get_player_quest(player: str):
     return quest
 
 @app.delete("/quest/{player}")
-async def complete_quest(player: str):
-    """Mark a quest as complete"""
+async def complete_quest(player: str, server: Optional[str] = SERVER_QUERY):
+    """Mark a quest as complete (measurable quests also complete on their own)"""
+    names = resolve_servers(server)
     r = await get_redis()
     quest = await r.hgetall(f"quest:{player}")
     if not quest:
         raise HTTPException(status_code=404, detail=f"No active quest for {player}")
     
-    await r.delete(f"quest:{player}")
-    mc_say(f"§a✓ {player} has completed: {quest.get('title', 'Unknown Quest')}!")
+    if not await finish_quest(player, quest, names):
+        raise HTTPException(status_code=409, detail=f"{player}'s quest changed while completing it")
     
     return {"status": "completed", "quest": quest}
 
@@ -303,21 +489,102 @@ async def complete_quest(player: str):
 @app.post("/rcon")
 async def execute_rcon(req: CommandRequest):
     """Execute raw RCON command"""
-    result = rcon_command(req.command)
-    return {
+    names = resolve_servers(req.server)
+    results = await fan_out(",".join(names), rcon_command, req.command)
+    response = {
         "command": req.command,
-        "result": result,
+        "result": results[names[0]],
         "timestamp": datetime.now().isoformat()
     }
+    if len(names) > 1:
+        response["results"] = results
+    return response
 
 @app.post("/announce")
 async def announce(req: AnnounceRequest):
     """Announce message to all players"""
-    if req.title:
-        mc_title(req.message)
-    else:
-        mc_say(req.message, req.color)
-    return {"status": "sent", "message": req.message}
+    names = resolve_servers(req.server)
+    job_id, _ = await dispatch("announce", {
+        "message": req.message,
+        "title": req.title,
+        "color": req.color,
+        "servers": names
+    })
+    return {"status": "queued" if job_id else "sent", "message": req.message, "servers": names, "job_id": job_id}
+
+# =============================================================================
+# JOBS
+# =============================================================================
+
+@app.get("/jobs/{job_id}")
+async def job_status(job_id: str):
+    """Get the status of a queued job"""
+    job = await get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail=f"Unknown job: {job_id}")
+    return job
+
+# =============================================================================
+# LIVE STREAM
+# =============================================================================
+
+STREAM_KEEPALIVE = 15  # Seconds of silence before a keepalive is sent
+
+TOPICS_QUERY = Query(None, description="Comma-separated event types (chat, chaos, quest, roster, health)")
+
+def _subscribe(topics: Optional[str]) -> Subscription:
+    return bus.subscribe([t.strip() for t in topics.split(",") if t.strip()] if topics else None)
+
+@app.get("/stream")
+async def stream_events(request: Request, topics: Optional[str] = TOPICS_QUERY):
+    """
+    Server-Sent Events feed of controller activity
+
+    Slow clients lose their oldest events (announced with a `dropped` event)
+    rather than holding up the controller.
+    """
+    sub = _subscribe(topics)
+
+    async def frames() -> AsyncIterator[str]:
+        try:
+            yield "retry: 3000\n\n"
+            while not await request.is_disconnected():
+                event = await sub.get(timeout=STREAM_KEEPALIVE)
+                dropped = sub.take_dropped()
+                if dropped:
+                    yield f"event: dropped\ndata: {{\"dropped\": {dropped}}}\n\n"
+                if event is None:
+                    yield ": keepalive\n\n"
+                    continue
+                yield f"id: {event.seq}\nevent: {event.type}\ndata: {event.payload}\n\n"
+        finally:
+            bus.unsubscribe(sub)
+
+    return StreamingResponse(
+        frames(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.websocket("/stream")
+async def stream_events_ws(websocket: WebSocket, topics: Optional[str] = None):
+    """WebSocket flavour of /stream: one JSON event per text message"""
+    await websocket.accept()
+    sub = _subscribe(topics)
+    try:
+        while True:
+            event = await sub.get(timeout=STREAM_KEEPALIVE)
+            dropped = sub.take_dropped()
+            if dropped:
+                await websocket.send_text(f'{{"type": "dropped", "dropped": {dropped}}}')
+            if event is None:
+                await websocket.send_text('{"type": "keepalive"}')
+                continue
+            await websocket.send_text(event.payload)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        bus.unsubscribe(sub)
 
 # =============================================================================
 # MAIN
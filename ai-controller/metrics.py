@@ -0,0 +1,164 @@
+"""
+METRICS
+Prometheus instrumentation for the controller's hot paths
+
+Histograms cover HTTP requests, RCON round trips, LLM calls, Redis commands,
+chaos playback and quest generation, counters track LLM tokens and budget
+downgrades, and a gauge follows each server's tick time; they are served
+from /metrics.
+Labels are kept to bounded sets (route templates, command verbs, persona
+names) so cardinality doesn't grow with players or free-form input.
+"""
+
+import time
+from contextlib import contextmanager
+from typing import Iterator
+
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+
+from logs import REQUEST_ID_HEADER, bind_request_id, get_logger
+from tracing import SpanKind, extract_context, mark_error, span
+
+log = get_logger(__name__)
+
+# =============================================================================
+# METRIC DEFINITIONS
+# =============================================================================
+
+FAST_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+SLOW_BUCKETS = (0.1, 0.25, 0.5, 1, 2, 4, 8, 15, 30, 60, 120)
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "chaos_http_request_duration_seconds", "HTTP request latency",
+    ["method", "route", "status"], buckets=FAST_BUCKETS + (10, 30, 60)
+)
+HTTP_IN_FLIGHT = Gauge("chaos_http_requests_in_flight", "HTTP requests being handled")
+
+RCON_SECONDS = Histogram(
+    "chaos_rcon_command_duration_seconds", "RCON round-trip latency",
+    ["server", "command", "outcome"], buckets=FAST_BUCKETS
+)
+
+LLM_SECONDS = Histogram(
+    "chaos_llm_request_duration_seconds", "LLM completion latency",
+    ["provider", "persona", "outcome"], buckets=SLOW_BUCKETS
+)
+LLM_TOKENS = Counter(
+    "chaos_llm_tokens_total", "LLM tokens used",
+    ["provider", "persona", "direction"]
+)
+
+LLM_BUDGET_ACTIONS = Counter(
+    "chaos_llm_budget_actions_total", "Completions changed by a token budget",
+    ["persona", "action"]
+)
+
+REDIS_SECONDS = Histogram(
+    "chaos_redis_command_duration_seconds", "Redis command latency",
+    ["command"], buckets=FAST_BUCKETS
+)
+
+CHAOS_EVENT_SECONDS = Histogram(
+    "chaos_event_duration_seconds", "Chaos event playback time",
+    ["event", "server"], buckets=SLOW_BUCKETS
+)
+
+QUEST_SECONDS = Histogram(
+    "chaos_quest_generation_duration_seconds", "Quest generation time",
+    ["source"], buckets=SLOW_BUCKETS
+)
+
+SERVER_MSPT = Gauge(
+    "chaos_server_mspt", "Average milliseconds per tick from the latest `tick query`",
+    ["server"]
+)
+
+ADMISSION_REJECTED = Counter(
+    "chaos_admission_rejected_total", "Requests shed with a 429",
+    ["endpoint", "reason"]
+)
+
+# =============================================================================
+# HELPERS
+# =============================================================================
+
+@contextmanager
+def timed(histogram: Histogram, **labels) -> Iterator[dict]:
+    """
+    Observe the duration of a block
+
+    Yields a dict of labels the block may update (e.g. outcome) before it
+    finishes; an exception sets outcome to "error" if the label exists.
+    """
+    start = time.perf_counter()
+    try:
+        yield labels
+    except BaseException:
+        if "outcome" in labels:
+            labels["outcome"] = "error"
+        raise
+    finally:
+        histogram.labels(**labels).observe(time.perf_counter() - start)
+
+def command_verb(command: str) -> str:
+    """First word of an RCON command, for a bounded label"""
+    return command.split(" ", 1)[0].lstrip("/") or "empty"
+
+def render_metrics() -> tuple:
+    """(body, content type) for the /metrics endpoint"""
+    return generate_latest(), CONTENT_TYPE_LATEST
+
+# =============================================================================
+# REQUEST MIDDLEWARE
+# =============================================================================
+
+class RequestMetricsMiddleware:
+    """
+    Pure ASGI middleware timing and tracing every HTTP request
+
+    Continues the caller's trace from its traceparent header, and assigns
+    the correlation ID (reusing an incoming X-Request-ID) that structured
+    logs and queued jobs carry, echoing it in the response.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        headers = {k.decode("latin-1"): v.decode("latin-1") for k, v in scope["headers"]}
+        header = REQUEST_ID_HEADER.lower()
+        request_id = bind_request_id(headers.get(header))
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message.setdefault("headers", []).append((header.encode(), request_id.encode()))
+            await send(message)
+
+        method = scope["method"]
+        HTTP_IN_FLIGHT.inc()
+        start = time.perf_counter()
+        with span(
+            f"{method} {scope['path']}", SpanKind.SERVER, parent=extract_context(headers),
+            **{"http.request.method": method, "url.path": scope["path"], "request.id": request_id}
+        ) as current:
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                elapsed = time.perf_counter() - start
+                HTTP_IN_FLIGHT.dec()
+                # Route templates (not raw paths) keep /quest/{player} to one series
+                route = getattr(scope.get("route"), "path", "unmatched")
+                HTTP_REQUEST_SECONDS.labels(method, route, str(status)).observe(elapsed)
+                current.update_name(f"{method} {route}")
+                current.set_attribute("http.route", route)
+                current.set_attribute("http.response.status_code", status)
+                if status >= 500:
+                    mark_error(current, f"HTTP {status}")
+                log.info("request", method=method, path=scope["path"],
+                         status=status, duration_ms=round(elapsed * 1000, 1))
@@ -4,17 +4,28 @@ RCON commands and Minecraft server interaction utilities
 """
 
 import os
-import re
-from typing import List, Optional
-from mcrcon import MCRcon
+import asyncio
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from components import component, dumps, text_json, static_json, tellraw_lines
+from parsers import (
+    PlayerList, Whitelist, EntityCount, DataResult,
+    parse_list, parse_whitelist, parse_entity_count, parse_data_get,
+)
+from rcon import RconPool
+from servers import registry, UnknownServerError
+from metrics import RCON_SECONDS, command_verb, timed
+from tracing import child_span, mark_error
 
 # =============================================================================
 # CONFIGURATION
 # =============================================================================
 
-RCON_HOST = os.getenv("RCON_HOST", "localhost")
-RCON_PORT = int(os.getenv("RCON_PORT", 25575))
-RCON_PASSWORD = os.getenv("RCON_PASSWORD", "")
+RCON_POOL_SIZE = int(os.getenv("RCON_POOL_SIZE", 4))
+RCON_TIMEOUT = float(os.getenv("RCON_TIMEOUT", 5))
 
 # Minecraft color codes
 COLORS = {
@@ -40,43 +51,184 @@ COLORS = {
 # RCON COMMANDS
 # =============================================================================
 
-def rcon_command(command: str) -> str:
+# Server targeted by helpers that are not given one explicitly
+current_server: ContextVar[Optional[str]] = ContextVar("current_server", default=None)
+
+_pools: Dict[str, RconPool] = {}
+_pools_lock = threading.Lock()
+
+def get_pool(server: Optional[str] = None) -> RconPool:
+    """
+    Get the RCON pool for a server, creating it on first use
+    
+    Args:
+        server: Server name (defaults to the context server, then the registry default)
+    """
+    config = registry.get(server or current_server.get())
+    pool = _pools.get(config.name)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(config.name)
+            if pool is None:
+                pool = RconPool(config.host, config.port, config.password, RCON_POOL_SIZE, RCON_TIMEOUT)
+                _pools[config.name] = pool
+    return pool
+
+def close_pools() -> None:
+    """Close all pooled RCON connections"""
+    with _pools_lock:
+        for pool in _pools.values():
+            pool.close()
+        _pools.clear()
+
+@contextmanager
+def use_server(server: Optional[str]) -> Iterator[None]:
+    """Route helper calls in this context to a specific server"""
+    token = current_server.set(server)
+    try:
+        yield
+    finally:
+        current_server.reset(token)
+
+def _rcon_error(e: Exception) -> str:
+    if isinstance(e, ConnectionRefusedError):
+        return "RCON Error: Connection refused - is the server running?"
+    if isinstance(e, UnknownServerError):
+        return f"RCON Error: Unknown server {e.args[0]}"
+    return f"RCON Error: {str(e)}"
+
+def rcon_command(command: str, server: Optional[str] = None) -> str:
     """
     Execute RCON command on Minecraft server
     
     Args:
         command: The command to execute
+        server: Target server (defaults to the context server)
         
     Returns:
         Command output string
     """
-    try:
-        with MCRcon(RCON_HOST, RCON_PASSWORD, port=RCON_PORT) as mcr:
-            return mcr.command(command)
-    except ConnectionRefusedError:
-        return "RCON Error: Connection refused - is the server running?"
-    except Exception as e:
-        return f"RCON Error: {str(e)}"
+    name = server or current_server.get() or registry.default
+    verb = command_verb(command)
+    with child_span(f"rcon {verb}", **{"mc.server": name, "mc.command": verb}) as span, \
+            timed(RCON_SECONDS, server=name, command=verb, outcome="ok") as labels:
+        try:
+            return get_pool(server).command(command)
+        except Exception as e:
+            labels["outcome"] = "error"
+            mark_error(span, str(e))
+            return _rcon_error(e)
+
+def rcon_batch(commands: List[str], server: Optional[str] = None) -> List[str]:
+    """
+    Execute several commands in order over one pooled connection
+    
+    Args:
+        commands: Commands to execute
+        server: Target server (defaults to the context server)
+        
+    Returns:
+        One output string per command
+    """
+    name = server or current_server.get() or registry.default
+    with child_span("rcon batch", **{"mc.server": name, "mc.commands": len(commands)}) as span, \
+            timed(RCON_SECONDS, server=name, command="batch", outcome="ok") as labels:
+        try:
+            return get_pool(server).command_batch(commands)
+        except Exception as e:
+            labels["outcome"] = "error"
+            mark_error(span, str(e))
+            return [_rcon_error(e)] * len(commands)
+
+def rcon_chain(
+    commands: List[str],
+    follow_up: Callable[[List[str]], List[str]],
+    server: Optional[str] = None
+) -> Tuple[List[str], List[str]]:
+    """
+    Execute commands, then follow-ups built from their output, over one
+    pooled connection (e.g. `list`, then one query per online player)
+    
+    Args:
+        commands: Commands to execute first
+        follow_up: Builds the next commands from the first outputs
+        server: Target server (defaults to the context server)
+        
+    Returns:
+        (first outputs, follow-up outputs); on failure every output of the
+        first batch is the error and there are no follow-ups
+    """
+    name = server or current_server.get() or registry.default
+    with child_span("rcon chain", **{"mc.server": name, "mc.commands": len(commands)}) as span, \
+            timed(RCON_SECONDS, server=name, command="chain", outcome="ok") as labels:
+        try:
+            return get_pool(server).command_chain(commands, follow_up)
+        except Exception as e:
+            labels["outcome"] = "error"
+            mark_error(span, str(e))
+            return [_rcon_error(e)] * len(commands), []
+
+async def fan_out(target: Optional[str], func: Callable[..., Any], *args, **kwargs) -> Dict[str, Any]:
+    """
+    Run a synchronous helper against every server in a target, concurrently
+    
+    Args:
+        target: Server target (None, "all", name, group, or comma-separated)
+        func: Helper to call, e.g. mc_say
+        
+    Returns:
+        Mapping of server name to the helper's return value
+    """
+    servers = registry.resolve(target)
 
-def mc_say(message: str, color: str = "white") -> str:
+    async def run(name: str) -> Any:
+        # Each gathered task has its own context, so this does not leak
+        current_server.set(name)
+        return await asyncio.to_thread(func, *args, **kwargs)
+
+    results = await asyncio.gather(*(run(s.name) for s in servers), return_exceptions=True)
+    return {
+        s.name: (_rcon_error(r) if isinstance(r, Exception) else r)
+        for s, r in zip(servers, results)
+    }
+
+def mc_say(message: str, color: str = "white", static: bool = False) -> str:
     """
     Broadcast message to all players using tellraw
     
     Args:
-        message: Message to broadcast
+        message: Message to broadcast (§ codes are converted to components)
         color: Color name (white, red, gold, etc.)
+        static: Cache the serialized component (for fixed announcements)
         
     Returns:
         RCON response
     """
-    # Escape quotes in message
-    safe_message = message.replace('"', '\\"').replace("'", "\\'")
-    
-    # Use tellraw for colored messages
-    json_text = f'{{"text":"{safe_message}","color":"{color}"}}'
-    return rcon_command(f'tellraw @a {json_text}')
+    json_text = static_json(message, color) if static else text_json(message, color)
+    return rcon_command(f"tellraw @a {json_text}")
 
-def mc_title(title: str, subtitle: str = "", fade_in: int = 10, stay: int = 70, fade_out: int = 20) -> None:
+def mc_say_lines(prefix: str, message: str, color: str = "white") -> List[str]:
+    """
+    Broadcast a long message word-wrapped over several chat lines, in one batch
+    
+    Args:
+        prefix: Shown before the first line, e.g. "§7[The Oracle]§r "
+        message: Message body (wrapped at CHAT_LINE_WIDTH)
+        color: Color name
+        
+    Returns:
+        One RCON response per line
+    """
+    return rcon_batch(tellraw_lines("@a", prefix, message, color))
+
+def mc_title(
+    title: str,
+    subtitle: str = "",
+    fade_in: int = 10,
+    stay: int = 70,
+    fade_out: int = 20,
+    static: bool = False
+) -> None:
     """
     Show title to all players
     
@@ -86,18 +238,17 @@ def mc_title(title: str, subtitle: str = "", fade_in: int = 10, stay: int = 70,
         fade_in: Fade in time in ticks
         stay: Stay time in ticks
         fade_out: Fade out time in ticks
+        static: Cache the serialized components (for fixed announcements)
     """
-    # Set timing
-    rcon_command(f'title @a times {fade_in} {stay} {fade_out}')
-    
-    # Show title
-    safe_title = title.replace('"', '\\"')
-    rcon_command(f'title @a title {{"text":"{safe_title}","bold":true}}')
-    
-    # Show subtitle if provided
+    serialize = static_json if static else text_json
+
+    # Timing, subtitle and title go out over one pooled connection;
+    # the subtitle must be set before the title that displays it
+    commands = [f"title @a times {fade_in} {stay} {fade_out}"]
     if subtitle:
-        safe_subtitle = subtitle.replace('"', '\\"')
-        rcon_command(f'title @a subtitle {{"text":"{safe_subtitle}"}}')
+        commands.append(f"title @a subtitle {serialize(subtitle)}")
+    commands.append(f"title @a title {serialize(title, None, True)}")
+    rcon_batch(commands)
 
 def mc_actionbar(message: str) -> str:
     """
@@ -109,45 +260,52 @@ def mc_actionbar(message: str) -> str:
     Returns:
         RCON response
     """
-    safe_message = message.replace('"', '\\"')
-    return rcon_command(f'title @a actionbar {{"text":"{safe_message}"}}')
+    return rcon_command(f"title @a actionbar {text_json(message)}")
 
-def mc_whisper(player: str, message: str) -> str:
+def mc_whisper(player: str, message: str, color: str = "gray") -> str:
     """
     Send private message to specific player
     
     Args:
         player: Player name
         message: Message to send
+        color: Color name
         
     Returns:
         RCON response
     """
-    return rcon_command(f'tell {player} {message}')
+    return rcon_command(f"tellraw {player} {text_json(message, color)}")
 
 # =============================================================================
 # PLAYER MANAGEMENT
 # =============================================================================
 
-def get_online_players(list_output: Optional[str] = None) -> List[str]:
+def get_roster(list_output: Optional[str] = None) -> Optional[PlayerList]:
     """
-    Get list of online players
+    Get the online roster as a typed result
     
     Args:
         list_output: Pre-fetched output from 'list' command (optional)
         
     Returns:
-        List of player names
+        PlayerList, or None if the server did not return a roster
     """
     if list_output is None:
         list_output = rcon_command("list")
+    return parse_list(list_output)
+
+def get_online_players(list_output: Optional[str] = None) -> List[str]:
+    """
+    Get list of online players
     
-    # Parse "There are X of Y players online: player1, player2, ..."
-    if ":" in list_output:
-        players_part = list_output.split(":")[-1].strip()
-        if players_part:
-            return [p.strip() for p in players_part.split(",") if p.strip()]
-    return []
+    Args:
+        list_output: Pre-fetched output from 'list' command (optional)
+        
+    Returns:
+        List of player names
+    """
+    roster = get_roster(list_output)
+    return list(roster.players) if roster else []
 
 def whitelist_add(player: str) -> str:
     """Add player to whitelist"""
@@ -157,9 +315,9 @@ def whitelist_remove(player: str) -> str:
     """Remove player from whitelist"""
     return rcon_command(f"whitelist remove {player}")
 
-def whitelist_list() -> str:
+def whitelist_list() -> Optional[Whitelist]:
     """Get whitelist"""
-    return rcon_command("whitelist list")
+    return parse_whitelist(rcon_command("whitelist list"))
 
 def kick_player(player: str, reason: str = "You have been kicked") -> str:
     """Kick a player"""
@@ -177,33 +335,12 @@ def deop_player(player: str) -> str:
 # WORLD MANAGEMENT
 # =============================================================================
 
+# Time, weather, difficulty and seed live in world.py, which caches them
+
 def save_world() -> str:
     """Save the world"""
     return rcon_command("save-all")
 
-def set_time(time: str) -> str:
-    """
-    Set world time
-    
-    Args:
-        time: Time value (day, night, noon, midnight, or ticks)
-    """
-    return rcon_command(f"time set {time}")
-
-def set_weather(weather: str, duration: int = 300) -> str:
-    """
-    Set weather
-    
-    Args:
-        weather: Weather type (clear, rain, thunder)
-        duration: Duration in seconds
-    """
-    return rcon_command(f"weather {weather} {duration}")
-
-def get_seed() -> str:
-    """Get world seed"""
-    return rcon_command("seed")
-
 # =============================================================================
 # ENTITY COMMANDS
 # =============================================================================
@@ -238,6 +375,28 @@ def kill_entities(entity_type: str, radius: int = 50) -> str:
     """
     return rcon_command(f"kill @e[type={entity_type},distance=..{radius}]")
 
+def count_entities(selector: str) -> Optional[EntityCount]:
+    """
+    Count entities matching a selector
+    
+    Args:
+        selector: Entity selector (e.g., @e[type=minecraft:zombie])
+    """
+    return parse_entity_count(rcon_command(f"execute if entity {selector}"))
+
+def get_entity_data(target: str, path: str = "") -> Optional[DataResult]:
+    """
+    Read entity NBT with `data get entity`
+    
+    Args:
+        target: Player name or single-entity selector
+        path: NBT path (e.g., Pos, Health, SelectedItem)
+    """
+    cmd = f"data get entity {target}"
+    if path:
+        cmd += f" {path}"
+    return parse_data_get(rcon_command(cmd))
+
 def give_item(player: str, item: str, count: int = 1) -> str:
     """
     Give item to player
@@ -301,7 +460,9 @@ def play_sound(
 
 def broadcast_advancement(player: str, message: str) -> str:
     """Fake an advancement notification"""
-    safe_message = message.replace('"', '\\"')
-    return rcon_command(
-        f'tellraw @a {{"text":"[{player} has made the advancement {safe_message}]","color":"green"}}'
-    )
+    json_text = dumps([
+        "",
+        component(f"{player} has made the advancement "),
+        component(f"[{message}]", "green", hover=message),
+    ])
+    return rcon_command(f"tellraw @a {json_text}")
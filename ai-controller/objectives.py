@@ -0,0 +1,341 @@
+"""
+QUEST OBJECTIVES
+Scoreboard-tracked quest progress and automatic completion
+
+A quest whose objective can be measured (mine, kill, collect, craft,
+harvest, travel) carries the statistic criteria that count it, e.g.
+"Defeat 12 zombies" -> minecraft.killed:minecraft.zombie, target 12. Each
+criterion gets one shared scoreboard objective per server, named after a
+hash of the criterion. Stat objectives only count from when they are
+created, and other quests may share them, so a quest stores each player's
+score at assignment as its baseline; progress is the sum of its objectives
+minus that baseline.
+
+Every QUEST_POLL_INTERVAL seconds one replica (whoever takes the round's
+Redis key) reads the scores of every player with a tracked quest: one
+`scoreboard players list <player>` each, all in one RCON batch per server.
+Progress is written back to the quest hashes in one pipeline, and quests
+that reach their target are completed and announced the same way as
+DELETE /quest/{player}. Every stored quest gets an id; progress updates and
+completion are Lua scripts that only touch the quest with that id, so a
+quest completed or replaced while its scores were being read is left alone.
+
+Quests that can't be measured (most free-form AI quests) are still
+completed by hand.
+"""
+
+import os
+import re
+import uuid
+import hashlib
+import asyncio
+from typing import Dict, List, Optional, Set, Tuple
+
+from store import get_redis
+from minecraft import rcon_batch, fan_out, mc_say
+from parsers import parse_score, parse_scores
+from alerts import publish
+from bus import bus
+from logs import get_logger
+
+log = get_logger(__name__)
+
+# =============================================================================
+# CONFIGURATION
+# =============================================================================
+
+QUEST_POLL_INTERVAL = float(os.getenv("QUEST_POLL_INTERVAL", 15))   # Seconds; 0 disables auto-completion
+
+ACTIVE_KEY = "quests:tracked"     # Set of players with a tracked quest
+POLL_KEY = "quests:poll"          # Claimed by the replica polling this round
+
+# Write progress / finish a quest only if it is still the one that was read
+PROGRESS_LUA = """
+if redis.call('EXISTS', KEYS[1]) == 1 and (redis.call('HGET', KEYS[1], 'id') or '') == ARGV[1] then
+    return redis.call('HSET', KEYS[1], 'progress', ARGV[2])
+end
+return -1
+"""
+FINISH_LUA = """
+if redis.call('EXISTS', KEYS[1]) == 1 and (redis.call('HGET', KEYS[1], 'id') or '') == ARGV[1] then
+    redis.call('DEL', KEYS[1])
+    redis.call('SREM', KEYS[2], ARGV[2])
+    return 1
+end
+return 0
+"""
+
+# Quest wording -> statistic criteria, per kind of objective
+TRACKABLE: Dict[str, Dict[str, List[str]]] = {
+    "killed": {
+        "zombies": ["zombie"], "skeletons": ["skeleton"], "spiders": ["spider"],
+        "creepers": ["creeper"], "endermen": ["enderman"], "witches": ["witch"],
+    },
+    "mined": {
+        "iron": ["iron_ore", "deepslate_iron_ore"], "gold": ["gold_ore", "deepslate_gold_ore"],
+        "diamond": ["diamond_ore", "deepslate_diamond_ore"], "copper": ["copper_ore", "deepslate_copper_ore"],
+        "lapis lazuli": ["lapis_ore", "deepslate_lapis_ore"], "redstone": ["redstone_ore", "deepslate_redstone_ore"],
+        "wheat": ["wheat"], "carrots": ["carrots"], "potatoes": ["potatoes"],
+        "beetroot": ["beetroots"], "melons": ["melon"], "pumpkins": ["pumpkin"],
+    },
+    "picked_up": {
+        "diamonds": ["diamond"], "emeralds": ["emerald"], "iron ingots": ["iron_ingot"],
+        "gold ingots": ["gold_ingot"], "coal": ["coal"], "redstone": ["redstone"],
+    },
+    "crafted": {
+        "torches": ["torch"], "chests": ["chest"], "ladders": ["ladder"],
+        "bookshelves": ["bookshelf"], "rails": ["rail"],
+    },
+}
+
+# Distance stats are in centimetres
+TRAVEL_CRITERIA = [
+    "minecraft.custom:minecraft.walk_one_cm", "minecraft.custom:minecraft.sprint_one_cm",
+    "minecraft.custom:minecraft.boat_one_cm", "minecraft.custom:minecraft.aviate_one_cm",
+]
+
+# Free-form objectives: "Mine 20 iron ore", "Defeat 12 zombies", "Travel 800 blocks"
+VERBS = {
+    "mine": "mined", "harvest": "mined", "kill": "killed", "defeat": "killed", "slay": "killed",
+    "collect": "picked_up", "gather": "picked_up", "craft": "crafted",
+}
+OBJECTIVE_RE = re.compile(r"\b(?P<verb>" + "|".join(VERBS) + r")\s+(?P<count>\d+)\s+(?P<rest>[a-z ]+)")
+TRAVEL_RE = re.compile(r"\b(?:travel|walk|journey)\s+(?P<count>\d+)\s+blocks")
+
+# =============================================================================
+# CRITERIA
+# =============================================================================
+
+def criteria_for(stat: str, noun: str) -> Optional[List[str]]:
+    """Criteria counting `noun` for a stat kind, or None if it isn't tracked"""
+    ids = TRACKABLE.get(stat, {}).get(noun)
+    return [f"minecraft.{stat}:minecraft.{i}" for i in ids] if ids else None
+
+def tracking(stat: str, noun: str, count: int) -> Dict[str, str]:
+    """
+    Quest fields for a measurable objective
+
+    Args:
+        stat: killed, mined, picked_up, crafted or travel
+        noun: Thing counted, as worded in the quest (ignored for travel)
+        count: Amount required (blocks, for travel)
+
+    Returns:
+        {"criteria", "target"} to store with the quest, or {} if untracked
+    """
+    if stat == "travel":
+        return {"criteria": ",".join(TRAVEL_CRITERIA), "target": str(count * 100)}
+    criteria = criteria_for(stat, noun)
+    return {"criteria": ",".join(criteria), "target": str(count)} if criteria else {}
+
+def infer_tracking(objective: str) -> Dict[str, str]:
+    """Tracking fields read from a free-form objective, or {} if none fit"""
+    text = objective.lower()
+    match = TRAVEL_RE.search(text)
+    if match:
+        return tracking("travel", "", int(match.group("count")))
+    match = OBJECTIVE_RE.search(text)
+    if not match:
+        return {}
+    stat = VERBS[match.group("verb")]
+    # Longest wording first, so "iron ingots" wins over "iron"
+    for noun in sorted(TRACKABLE[stat], key=len, reverse=True):
+        if re.search(rf"\b{noun}\b", match.group("rest")):
+            return tracking(stat, noun, int(match.group("count")))
+    return {}
+
+def objective_name(criterion: str) -> str:
+    """Stable scoreboard objective for a criterion (short enough for pre-1.18)"""
+    return "q" + hashlib.sha1(criterion.encode()).hexdigest()[:12]
+
+# =============================================================================
+# SCOREBOARD
+# =============================================================================
+
+# (server, objective) pairs this process has created
+_registered: Set[Tuple[str, str]] = set()
+
+def objective_commands(server: str, criteria: List[str]) -> List[str]:
+    """`scoreboard objectives add` for criteria not yet set up on a server"""
+    commands = []
+    for criterion in criteria:
+        name = objective_name(criterion)
+        if (server, name) not in _registered:
+            # Fails harmlessly if another replica or an earlier run created it
+            commands.append(f'scoreboard objectives add {name} {criterion} "{name}"')
+            _registered.add((server, name))
+    return commands
+
+def baselines(server: str, criteria: Dict[str, List[str]]) -> Dict[str, int]:
+    """
+    Register objectives and read each player's current total in one batch (blocking)
+
+    Args:
+        server: Server name
+        criteria: Player -> the criteria of their quest
+    """
+    setup = []
+    gets: List[Tuple[str, str]] = []
+    for player, player_criteria in criteria.items():
+        setup.extend(objective_commands(server, player_criteria))
+        gets.extend((player, f"scoreboard players get {player} {objective_name(c)}") for c in player_criteria)
+    outputs = rcon_batch(setup + [command for _, command in gets], server)
+
+    totals = {player: 0 for player in criteria}
+    for (player, _), output in zip(gets, outputs[len(setup):]):
+        totals[player] += parse_score(output) or 0
+    return totals
+
+async def start_tracking(quests: Dict[str, Dict], servers: Dict[str, str]) -> Dict[str, Dict]:
+    """
+    Add baseline and progress fields to quests that have criteria
+
+    Args:
+        quests: Player -> quest
+        servers: Player -> server they are playing on
+
+    Returns:
+        Player -> quest, ready to store
+    """
+    by_server: Dict[str, Dict[str, List[str]]] = {}
+    for player, quest in quests.items():
+        if quest.get("criteria"):
+            by_server.setdefault(servers[player], {})[player] = quest["criteria"].split(",")
+
+    results = await asyncio.gather(*(
+        asyncio.to_thread(baselines, server, criteria) for server, criteria in by_server.items()
+    ))
+    tracked = dict(quests)
+    for server, totals in zip(by_server, results):
+        for player, start in totals.items():
+            tracked[player] = {**quests[player], "server": server, "baseline": str(start), "progress": "0"}
+    return tracked
+
+# =============================================================================
+# COMPLETION
+# =============================================================================
+
+async def store_quests(quests: Dict[str, Dict]) -> None:
+    """Replace players' active quests (and their tracking) in one pipeline
+
+    Each quest is given an id (in place) that later updates check against.
+    """
+    r = await get_redis()
+    async with r.pipeline(transaction=True) as pipe:
+        for player, quest in quests.items():
+            quest.setdefault("id", uuid.uuid4().hex[:12])
+            pipe.delete(f"quest:{player}")
+            pipe.hset(f"quest:{player}", mapping=quest)
+            if quest.get("criteria"):
+                pipe.sadd(ACTIVE_KEY, player)
+            else:
+                pipe.srem(ACTIVE_KEY, player)
+        await pipe.execute()
+
+async def finish_quest(player: str, quest: Dict, servers: List[str]) -> bool:
+    """
+    Remove a completed quest and announce it
+
+    Returns:
+        False (and nothing announced) if the player's quest is no longer
+        this one, e.g. it was already completed or a new one was assigned
+    """
+    r = await get_redis()
+    removed = await r.eval(FINISH_LUA, 2, f"quest:{player}", ACTIVE_KEY, quest.get("id", ""), player)
+    if not removed:
+        return False
+    targets = ",".join(servers)
+    await fan_out(targets, mc_say, f"§a✓ {player} has completed: {quest.get('title', 'Unknown Quest')}!")
+    await publish("quest_completed", player=player, quest=quest.get("title"), servers=servers)
+    bus.emit("quest", action="completed", player=player, quest=quest, servers=servers)
+    return True
+
+# =============================================================================
+# POLLER
+# =============================================================================
+
+def read_scores(server: str, quests: Dict[str, Dict]) -> Dict[str, Optional[Dict[str, int]]]:
+    """Every tracked player's scores on one server, in one batch (blocking)"""
+    players = list(quests)
+    setup = []
+    for quest in quests.values():
+        setup.extend(objective_commands(server, quest["criteria"].split(",")))
+    outputs = rcon_batch(setup + [f"scoreboard players list {p}" for p in players], server)
+    return {player: parse_scores(output) for player, output in zip(players, outputs[len(setup):])}
+
+def progress_of(quest: Dict, scores: Dict[str, int]) -> int:
+    total = sum(scores.get(objective_name(c), 0) for c in quest["criteria"].split(","))
+    return max(0, total - int(quest.get("baseline", 0)))
+
+
+class QuestPoller:
+    """Updates tracked quests from the scoreboard until stopped"""
+
+    def __init__(self, interval: float = QUEST_POLL_INTERVAL):
+        self.interval = interval
+
+    async def poll(self) -> int:
+        """
+        One round over every tracked quest
+
+        Returns:
+            Number of quests completed
+        """
+        r = await get_redis()
+        if not await r.set(POLL_KEY, "1", nx=True, ex=max(1, int(self.interval * 0.8))):
+            return 0  # Another replica has this round
+
+        players = sorted(await r.smembers(ACTIVE_KEY))
+        if not players:
+            return 0
+        async with r.pipeline(transaction=False) as pipe:
+            for player in players:
+                pipe.hgetall(f"quest:{player}")
+            quests = await pipe.execute()
+
+        by_server: Dict[str, Dict[str, Dict]] = {}
+        stale = []
+        for player, quest in zip(players, quests):
+            if quest.get("criteria") and quest.get("server"):
+                by_server.setdefault(quest["server"], {})[player] = quest
+            else:
+                stale.append(player)
+
+        results = await asyncio.gather(*(
+            asyncio.to_thread(read_scores, server, server_quests)
+            for server, server_quests in by_server.items()
+        ))
+
+        done = []
+        async with r.pipeline(transaction=False) as pipe:
+            if stale:
+                pipe.srem(ACTIVE_KEY, *stale)
+            for (server, server_quests), scores in zip(by_server.items(), results):
+                for player, quest in server_quests.items():
+                    if scores.get(player) is None:
+                        continue  # Server down or unreadable; try next round
+                    progress = progress_of(quest, scores[player])
+                    if str(progress) != quest.get("progress"):
+                        pipe.eval(PROGRESS_LUA, 1, f"quest:{player}", quest.get("id", ""), progress)
+                    if progress >= int(quest["target"]):
+                        done.append((player, quest, server))
+            await pipe.execute()
+
+        completed = 0
+        for player, quest, server in done:
+            if await finish_quest(player, quest, [server]):
+                log.info("quest_auto_completed", player=player, quest=quest.get("title"), server=server)
+                completed += 1
+        return completed
+
+    async def run(self, stop: asyncio.Event) -> None:
+        log.info("quest_poller_started", interval=self.interval)
+        while not stop.is_set():
+            try:
+                await self.poll()
+            except Exception as e:
+                log.warning("quest_poll_failed", error=str(e))
+            try:
+                await asyncio.wait_for(stop.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
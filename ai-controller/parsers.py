@@ -0,0 +1,417 @@
+"""
+RCON PARSERS
+Typed parsing of Minecraft command output
+
+RCON returns human-readable text whose wording shifts between Minecraft
+versions and server platforms (vanilla, Fabric, Paper). Every pattern here
+is compiled once at import time so pollers can parse at high frequency.
+"""
+
+import re
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple, Union
+
+# =============================================================================
+# PATTERNS
+# =============================================================================
+
+# Legacy formatting codes (§a, §l, ...) leak into output on some platforms
+FORMAT_CODE_RE = re.compile(r"§[0-9a-fk-orx]", re.IGNORECASE)
+
+# 1.13+:  "There are 2 of a max of 20 players online: Steve, Alex"
+# 1.12:   "There are 2/20 players online:\nSteve, Alex"
+# Paper:  "There are 2 out of maximum 20 players online.\ndefault: Steve, Alex"
+LIST_HEADER_RE = re.compile(
+    r"There (?:are|is) (?P<online>\d+)"
+    r"(?: of a max(?: of)?|/| out of maximum| out of) ?(?P<max>\d+) players? online[:.]?",
+    re.IGNORECASE,
+)
+
+# Player names, optionally with a Floodgate prefix and a "list uuids" suffix
+PLAYER_NAME_RE = re.compile(
+    r"(?P<name>[.*]?[A-Za-z0-9_]{1,16})"
+    r"(?: \((?P<uuid>[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12})\))?"
+)
+
+# Paper/Essentials group prefix ("default: ", "[AFK]", "admins: ")
+GROUP_PREFIX_RE = re.compile(r"^\s*[\w\- ]+:\s*")
+AFK_TAG_RE = re.compile(r"\[AFK\]|\[HIDDEN\]", re.IGNORECASE)
+
+# 1.13+: "Seed: [-1234567890]"   1.12: "Seed: -1234567890"
+SEED_RE = re.compile(r"Seed: \[?(?P<seed>-?\d+)\]?")
+
+# 1.13+: "There are 3 whitelisted player(s): a, b, c"
+# 1.12:  "There are 3 (out of 5 seen) whitelisted players:\na, b, c"
+WHITELIST_RE = re.compile(
+    r"There (?:are|is) (?P<count>\d+)(?: \(out of \d+ seen\))? whitelisted players?(?:\(s\))?:\s*(?P<names>.*)",
+    re.IGNORECASE | re.DOTALL,
+)
+WHITELIST_EMPTY_RE = re.compile(r"There are no whitelisted players", re.IGNORECASE)
+
+# "execute if entity ..." -> "Test passed, count: 12" / "Test failed"
+# "kill ..."              -> "Killed 5 entities" / "Killed Zombie"
+TEST_COUNT_RE = re.compile(r"Test passed(?:, count: (?P<count>\d+))?")
+TEST_FAILED_RE = re.compile(r"Test failed")
+KILLED_MANY_RE = re.compile(r"Killed (?P<count>\d+) entities")
+KILLED_ONE_RE = re.compile(r"Killed (?!\d+ entities)\S")
+NO_ENTITY_RE = re.compile(r"No entity was found|No player was found")
+
+# "Steve has the following entity data: [1.5d, 64.0d, -3.2d]"
+DATA_GET_RE = re.compile(
+    r"^(?P<target>.+?) has the following (?:entity|block|storage) data: (?P<value>.*)$",
+    re.DOTALL,
+)
+DATA_MISSING_RE = re.compile(r"Found no elements matching (?P<path>.+)")
+
+# SNBT scalars and homogeneous numeric lists
+SNBT_NUMBER_RE = re.compile(r"^(?P<num>[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?)(?P<suffix>[bBsSlLfFdD]?)$")
+SNBT_STRING_RE = re.compile(r'^"(?P<str>(?:[^"\\]|\\.)*)"$|^\'(?P<sstr>(?:[^\'\\]|\\.)*)\'$')
+SNBT_ITEM_ID_RE = re.compile(r'\bid: ?"(?P<id>[a-z0-9_.\-]+:[a-z0-9_./\-]+)"')
+SNBT_ITEM_COUNT_RE = re.compile(r"\b[Cc]ount: ?(?P<count>\d+)b?")
+
+# "tick query" (1.20.3+). RCON joins the feedback lines without separators
+TICK_STATE_RE = re.compile(r"The game is (?P<state>running normally|sprinting|frozen|running, but can't keep up)")
+TICK_STATES = {
+    "running normally": "running",
+    "sprinting": "sprinting",
+    "frozen": "frozen",
+    "running, but can't keep up": "lagging",
+}
+TICK_RATE_RE = re.compile(r"Target tick rate: (?P<rate>[\d.]+) per second")
+TICK_MSPT_RE = re.compile(r"Average time per tick: (?P<mspt>[\d.]+)ms")
+TICK_PERCENTILES_RE = re.compile(
+    r"P50: (?P<p50>[\d.]+)ms P95: (?P<p95>[\d.]+)ms P99: (?P<p99>[\d.]+)ms, sample: (?P<sample>\d+)"
+)
+
+# "scoreboard players list Steve" -> "Steve has 2 scores:[q1]: 5[q2]: 7" / "Steve has no scores"
+# "scoreboard players get Steve q1" -> "Steve has 5 [q1]" / "Can't get value of q1 for Steve; none is set"
+SCORES_RE = re.compile(r"has (?:\d+ scores?:|no scores)")
+SCORE_ENTRY_RE = re.compile(r"\[(?P<objective>[^\]]+)\]: (?P<score>-?\d+)")
+SCORE_GET_RE = re.compile(r"has (?P<score>-?\d+) \[(?P<objective>[^\]]+)\]")
+SCORE_UNSET_RE = re.compile(r"none is set|Can't get value")
+
+# "The time is 13000"  /  "The difficulty is Hard"
+TIME_RE = re.compile(r"The time is (?P<ticks>\d+)")
+DIFFICULTY_RE = re.compile(r"The difficulty is (?P<difficulty>\w+)")
+
+# Server log chat (logs/latest.log), vanilla and Fabric/Forge-style loggers:
+#   "[12:34:56] [Server thread/INFO]: <Steve> hello"
+#   "[12:34:56] [Server thread/INFO]: [Not Secure] <Steve> hello"
+#   "[12:34:56] [Server thread/INFO] [minecraft/MinecraftServer]: <Steve> hello"
+CHAT_LINE_RE = re.compile(
+    r"^\[[^\]]+\] \[[^\]]+/INFO\](?: \[[^\]]+\])?: (?:\[Not Secure\] )?"
+    r"<(?P<player>[.*]?[A-Za-z0-9_]{1,16})> (?P<message>.*)$"
+)
+# "@oracle where are diamonds?" - a mention anywhere in the message
+MENTION_RE = re.compile(r"(?<!\S)@(?P<name>[A-Za-z][A-Za-z0-9_]*)")
+
+# =============================================================================
+# RESULT TYPES
+# =============================================================================
+
+SnbtValue = Union[int, float, str, Tuple[Union[int, float], ...], None]
+
+
+@dataclass(frozen=True, slots=True)
+class PlayerList:
+    """Online roster from the `list` command"""
+    online: int
+    max_players: int
+    players: Tuple[str, ...]
+    uuids: Tuple[Optional[str], ...] = ()
+
+
+@dataclass(frozen=True, slots=True)
+class Seed:
+    """World seed from the `seed` command"""
+    value: int
+
+
+@dataclass(frozen=True, slots=True)
+class Whitelist:
+    """Whitelisted names from `whitelist list`"""
+    count: int
+    players: Tuple[str, ...]
+
+
+@dataclass(frozen=True, slots=True)
+class EntityCount:
+    """Entity count from `execute if entity` or `kill`"""
+    count: int
+
+
+@dataclass(frozen=True, slots=True)
+class DataResult:
+    """Value returned by `data get`"""
+    target: str
+    raw: str
+    value: SnbtValue
+    found: bool = True
+
+
+@dataclass(frozen=True, slots=True)
+class TickStatus:
+    """Tick timing from `tick query`"""
+    state: str
+    target_rate: float
+    mspt: float
+    p50: Optional[float] = None
+    p95: Optional[float] = None
+    p99: Optional[float] = None
+    sample: int = 0
+
+    @property
+    def tps(self) -> float:
+        """Effective ticks per second (capped at the target rate)"""
+        if self.mspt <= 0:
+            return self.target_rate
+        return min(self.target_rate, 1000.0 / self.mspt)
+
+
+@dataclass(frozen=True, slots=True)
+class ChatLine:
+    """A player chat message from the server log"""
+    player: str
+    message: str
+    mentions: Tuple[str, ...]
+
+
+@dataclass(frozen=True, slots=True)
+class ItemStack:
+    """Item summary extracted from SNBT (e.g. SelectedItem)"""
+    id: str
+    count: int = 1
+
+
+# =============================================================================
+# HELPERS
+# =============================================================================
+
+def strip_format_codes(text: str) -> str:
+    """Remove legacy § formatting codes from command output"""
+    if "§" not in text:
+        return text
+    return FORMAT_CODE_RE.sub("", text)
+
+
+def is_rcon_error(output: str) -> bool:
+    """True if the output is an error produced by our own RCON layer"""
+    return output.startswith("RCON Error")
+
+
+def _split_names(names: str) -> Tuple[Tuple[str, ...], Tuple[Optional[str], ...]]:
+    players = []
+    uuids = []
+    for line in names.splitlines():
+        line = AFK_TAG_RE.sub("", line)
+        if ":" in line:
+            line = GROUP_PREFIX_RE.sub("", line, count=1)
+        for chunk in line.split(","):
+            chunk = chunk.strip()
+            if not chunk:
+                continue
+            match = PLAYER_NAME_RE.fullmatch(chunk)
+            if match:
+                players.append(match.group("name"))
+                uuids.append(match.group("uuid"))
+    return tuple(players), tuple(uuids)
+
+# =============================================================================
+# PARSERS
+# =============================================================================
+
+def parse_list(output: str) -> Optional[PlayerList]:
+    """
+    Parse `list` / `list uuids` output
+
+    Args:
+        output: Raw RCON response
+
+    Returns:
+        PlayerList, or None if the output is not a roster
+    """
+    output = strip_format_codes(output)
+    header = LIST_HEADER_RE.search(output)
+    if not header:
+        return None
+
+    players, uuids = _split_names(output[header.end():])
+    return PlayerList(
+        online=int(header.group("online")),
+        max_players=int(header.group("max")),
+        players=players,
+        uuids=uuids if any(uuids) else (),
+    )
+
+
+def parse_seed(output: str) -> Optional[Seed]:
+    """Parse `seed` output"""
+    match = SEED_RE.search(output)
+    return Seed(int(match.group("seed"))) if match else None
+
+
+def parse_whitelist(output: str) -> Optional[Whitelist]:
+    """Parse `whitelist list` output"""
+    output = strip_format_codes(output)
+    if WHITELIST_EMPTY_RE.search(output):
+        return Whitelist(count=0, players=())
+    match = WHITELIST_RE.search(output)
+    if not match:
+        return None
+    players, _ = _split_names(match.group("names"))
+    return Whitelist(count=int(match.group("count")), players=players)
+
+
+def parse_entity_count(output: str) -> Optional[EntityCount]:
+    """
+    Parse an entity count from `execute if entity` or `kill` output
+
+    Returns:
+        EntityCount (0 when nothing matched), or None if unrecognized
+    """
+    match = TEST_COUNT_RE.search(output)
+    if match:
+        return EntityCount(int(match.group("count") or 1))
+    match = KILLED_MANY_RE.search(output)
+    if match:
+        return EntityCount(int(match.group("count")))
+    if KILLED_ONE_RE.search(output):
+        return EntityCount(1)
+    if TEST_FAILED_RE.search(output) or NO_ENTITY_RE.search(output):
+        return EntityCount(0)
+    return None
+
+
+def parse_snbt_value(raw: str) -> SnbtValue:
+    """
+    Parse scalar SNBT and numeric lists; compounds are left as raw text
+
+    Examples:
+        "20.0f" -> 20.0, "3b" -> 3, '"minecraft:overworld"' -> "minecraft:overworld",
+        "[1.5d, 64.0d, -3.2d]" -> (1.5, 64.0, -3.2)
+    """
+    raw = raw.strip()
+    if not raw:
+        return None
+
+    match = SNBT_NUMBER_RE.match(raw)
+    if match:
+        num = match.group("num")
+        suffix = match.group("suffix").lower()
+        if suffix in ("f", "d") or "." in num or "e" in num.lower():
+            return float(num)
+        return int(num)
+
+    match = SNBT_STRING_RE.match(raw)
+    if match:
+        value = match.group("str") if match.group("str") is not None else match.group("sstr")
+        return value.replace('\\"', '"').replace("\\'", "'").replace("\\\\", "\\")
+
+    if raw[0] == "[" and raw[-1] == "]" and "{" not in raw:
+        body = raw[1:-1]
+        # Typed arrays: [I; 1, 2, 3]
+        if ";" in body:
+            body = body.split(";", 1)[1]
+        items = []
+        for part in body.split(","):
+            part = part.strip()
+            if not part:
+                continue
+            match = SNBT_NUMBER_RE.match(part)
+            if not match:
+                return raw
+            items.append(parse_snbt_value(part))
+        return tuple(items)
+
+    return raw
+
+
+def parse_data_get(output: str) -> Optional[DataResult]:
+    """
+    Parse `data get entity|block|storage` output
+
+    Returns:
+        DataResult (found=False when the path or entity is missing),
+        or None if unrecognized
+    """
+    match = DATA_GET_RE.match(output.strip())
+    if match:
+        raw = match.group("value")
+        return DataResult(target=match.group("target"), raw=raw, value=parse_snbt_value(raw))
+    if DATA_MISSING_RE.search(output) or NO_ENTITY_RE.search(output):
+        return DataResult(target="", raw=output, value=None, found=False)
+    return None
+
+
+def parse_item_stack(raw: str) -> Optional[ItemStack]:
+    """Extract item id and count from an item compound (pre- and post-1.20.5)"""
+    match = SNBT_ITEM_ID_RE.search(raw)
+    if not match:
+        return None
+    count = SNBT_ITEM_COUNT_RE.search(raw)
+    return ItemStack(id=match.group("id"), count=int(count.group("count")) if count else 1)
+
+
+def parse_tick_query(output: str) -> Optional[TickStatus]:
+    """Parse `tick query` output (None on servers without the command)"""
+    mspt = TICK_MSPT_RE.search(output)
+    if not mspt:
+        return None
+    state = TICK_STATE_RE.search(output)
+    rate = TICK_RATE_RE.search(output)
+    percentiles = TICK_PERCENTILES_RE.search(output)
+    return TickStatus(
+        state=TICK_STATES.get(state.group("state"), "running") if state else "running",
+        target_rate=float(rate.group("rate")) if rate else 20.0,
+        mspt=float(mspt.group("mspt")),
+        p50=float(percentiles.group("p50")) if percentiles else None,
+        p95=float(percentiles.group("p95")) if percentiles else None,
+        p99=float(percentiles.group("p99")) if percentiles else None,
+        sample=int(percentiles.group("sample")) if percentiles else 0,
+    )
+
+
+def parse_time(output: str) -> Optional[int]:
+    """Parse `time query` output into ticks"""
+    match = TIME_RE.search(output)
+    return int(match.group("ticks")) if match else None
+
+
+def parse_difficulty(output: str) -> Optional[str]:
+    """Parse `difficulty` output into a lowercase difficulty name"""
+    match = DIFFICULTY_RE.search(output)
+    return match.group("difficulty").lower() if match else None
+
+
+def parse_test(output: str) -> Optional[bool]:
+    """Parse `execute if ...` output (e.g. a predicate check) into pass/fail"""
+    if TEST_COUNT_RE.search(output):
+        return True
+    if TEST_FAILED_RE.search(output):
+        return False
+    return None
+
+
+def parse_scores(output: str) -> Optional[Dict[str, int]]:
+    """Parse `scoreboard players list <player>` into objective -> score"""
+    if not SCORES_RE.search(output):
+        return None
+    return {m.group("objective"): int(m.group("score")) for m in SCORE_ENTRY_RE.finditer(output)}
+
+
+def parse_score(output: str) -> Optional[int]:
+    """Parse `scoreboard players get` (0 when the player has no score yet)"""
+    match = SCORE_GET_RE.search(output)
+    if match:
+        return int(match.group("score"))
+    return 0 if SCORE_UNSET_RE.search(output) else None
+
+
+def parse_chat_line(line: str) -> Optional[ChatLine]:
+    """Parse a server log line into a chat message (None for anything else)"""
+    match = CHAT_LINE_RE.match(line)
+    if not match:
+        return None
+    message = strip_format_codes(match.group("message")).strip()
+    mentions = tuple(m.group("name").lower() for m in MENTION_RE.finditer(message))
+    return ChatLine(player=match.group("player"), message=message, mentions=mentions)
@@ -2,171 +2,277 @@
 AI PERSONAS
 Defines the AI characters and their interaction logic
 
-Updated to match the actual 3-bot architecture:
+Personas are loaded from JSON files, one per persona, named <key>.json.
+The bundled persona_configs/ holds the three bots:
 - The Oracle (Claude) - Team Leader
 - The Architect (GPT) - Building Expert
 - The Explorer (Gemini) - Scout/Navigator
+
+PERSONAS_DIRS adds comma-separated directories read after the bundled one
+(a later file with the same key replaces the earlier persona), so
+event-specific personas need no code changes:
+
+    {
+        "name": "The Blood Moon",
+        "provider": "claude",
+        "model": "claude-3-5-haiku-20241022",
+        "color": "dark_red",
+        "system": ["You are the Blood Moon...", "Speak in omens.",
+                   "Keep responses under {chat_budget} characters."],
+        "temperature": 0.9,
+        "chat_budget": 200,
+        "debate": false,
+        "knowledge": true,
+        "order": 10
+    }
+
+Only name, provider and system are required; system may be a string or a
+list of lines. model defaults to the provider's default model. Personas are
+listed, and take their turn in debates, by ascending order (default 100).
+
+chat_budget is how many characters of a reply are shown in game (wrapped
+over several chat lines); {chat_budget} in the system prompt is replaced by
+it. max_tokens defaults to what the budget can show, so generation stops
+where display stops; set it only to override that. With knowledge (the
+default) the persona is shown the bundled facts that match each message
+(see knowledge.py).
 """
 
 import os
-from typing import Optional
-import anthropic
-import openai
-import google.generativeai as genai
+import time
+import glob
+import json
+import math
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+from opentelemetry import trace
+
+from providers import providers
+from logs import get_logger
+from metrics import LLM_BUDGET_ACTIONS, LLM_SECONDS, LLM_TOKENS, timed
+from knowledge import lookup
+from usage import budget_model, budget_state, over_budget_reply, record_usage
+from tracing import SpanKind, mark_error, span
+
+log = get_logger(__name__)
 
 # =============================================================================
-# API CLIENTS
+# CONFIGURATION
 # =============================================================================
 
-claude_client = anthropic.AsyncAnthropic(
-    api_key=os.getenv("ANTHROPIC_API_KEY", "")
-)
+BUNDLED_PERSONAS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "persona_configs")
+PERSONAS_DIRS = os.getenv("PERSONAS_DIRS", "")
 
-openai_client = openai.AsyncOpenAI(
-    api_key=os.getenv("OPENAI_API_KEY", "")
-)
+DEFAULT_CHAT_BUDGET = int(os.getenv("DEFAULT_CHAT_BUDGET", 240))   # Characters of reply shown in game
+CHARS_PER_TOKEN = 3.5         # Rough average for English chat replies
 
-# Configure Gemini
-genai.configure(api_key=os.getenv("GOOGLE_API_KEY", ""))
-gemini_model = genai.GenerativeModel('gemini-2.0-flash')
+def tokens_for(budget: int) -> int:
+    """max_tokens that covers a character budget"""
+    return math.ceil(budget / CHARS_PER_TOKEN)
 
 # =============================================================================
-# AI PERSONAS
+# PERSONA REGISTRY
 # =============================================================================
 
-AI_PERSONAS = {
-    "oracle": {
-        "name": "The Oracle",
-        "model": "claude",
-        "color": "purple",
-        "system": """You are The Oracle, the wise team leader in a Minecraft world.
-
-You speak with gravitas and ancient wisdom, offering guidance and coordinating the team.
-You know secrets about the world - where ores lie, what dangers lurk, and paths to success.
-You give quests and lead your companions (The Architect and The Explorer) with insight.
-
-Personality traits:
-- Wise and helpful team leader
-- Speaks with authority but kindness
-- References "the ancient crafters" and "forgotten lore"
-- Coordinates team efforts
-- Shows genuine care for the players' wellbeing
-
-IMPORTANT: Keep responses under 100 characters for Minecraft chat limits.
-Be concise but impactful. Every word should matter."""
-    },
-
-    "architect": {
-        "name": "The Architect",
-        "model": "gpt",
-        "color": "aqua",
-        "system": """You are The Architect, the building expert in a Minecraft world.
-
-You're the practical one - giving construction advice, material calculations,
-design ideas, and efficient building strategies. You love redstone, farms, and
-clever automation. You work alongside The Oracle and The Explorer.
-
-Personality traits:
-- Practical and supportive
-- Loves efficiency and good design
-- Gets genuinely excited about clever builds
-- Gives specific, actionable advice
-- Appreciates both aesthetic and functional builds
-
-IMPORTANT: Keep responses under 100 characters for Minecraft chat limits.
-Be helpful and specific but concise."""
-    },
-
-    "explorer": {
-        "name": "The Explorer",
-        "model": "gemini",
-        "color": "green",
-        "system": """You are The Explorer, the scout and navigator in a Minecraft world.
-
-You're always on the move - scouting ahead, finding resources, detecting threats,
-and mapping the terrain. You work with The Oracle and The Architect as the team's
-eyes and ears.
-
-Personality traits:
-- Adventurous and alert
-- Loves discovering new places
-- Reports threats and opportunities quickly
-- Gives directions and navigation help
-- Excited about exploration and discovery
-
-IMPORTANT: Keep responses under 100 characters for Minecraft chat limits.
-Be quick and informative."""
-    }
-}
+@dataclass(frozen=True)
+class Persona:
+    """One AI character, with everything a request needs precomputed"""
+    key: str
+    name: str
+    provider: str
+    model: str
+    color: str
+    system: str
+    max_tokens: int = tokens_for(DEFAULT_CHAT_BUDGET)
+    temperature: Optional[float] = None
+    chat_budget: int = DEFAULT_CHAT_BUDGET
+    debate: bool = False
+    knowledge: bool = True
+    order: int = 100
+    prefix: Any = field(default=None, compare=False, repr=False)   # Provider-shaped system prompt
+    listing: Dict = field(default_factory=dict, compare=False, repr=False)
+
+
+class PersonaRegistry:
+    """Personas by key, plus the dispatch table and /ai/personas payload"""
+
+    def __init__(self, personas: List[Persona]):
+        personas = sorted(personas, key=lambda p: (p.order, p.key))
+        self.personas: Dict[str, Persona] = {p.key: p for p in personas}
+        self.listing: Dict[str, Dict] = {p.key: p.listing for p in personas}
+        self.debaters: List[str] = [p.key for p in personas if p.debate]
+
+    def get(self, key: str) -> Optional[Persona]:
+        return self.personas.get(key)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.personas
+
+    def names(self) -> List[str]:
+        return list(self.personas)
+
+
+def build_persona(key: str, entry: Dict) -> Persona:
+    """Validate one persona config and precompute its prompt prefix and listing"""
+    provider = providers.get(entry["provider"])
+    if provider is None:
+        raise ValueError(f"Persona {key!r} uses unknown provider {entry['provider']!r}")
+
+    system = entry["system"]
+    if isinstance(system, list):
+        system = "\n".join(system)
+    chat_budget = int(entry.get("chat_budget", DEFAULT_CHAT_BUDGET))
+    system = system.replace("{chat_budget}", str(chat_budget))
+    model = entry.get("model") or provider.model
+    description = entry.get("description") or system[:100] + "..."
+
+    return Persona(
+        key=key,
+        name=entry["name"],
+        provider=provider.name,
+        model=model,
+        color=entry.get("color", "white"),
+        system=system,
+        max_tokens=int(entry.get("max_tokens") or tokens_for(chat_budget)),
+        temperature=entry.get("temperature"),
+        chat_budget=chat_budget,
+        debate=bool(entry.get("debate", False)),
+        knowledge=bool(entry.get("knowledge", True)),
+        order=int(entry.get("order", 100)),
+        prefix=provider.prefix(system),
+        listing={
+            "name": entry["name"],
+            "provider": provider.name,
+            "model": model,
+            "color": entry.get("color", "white"),
+            "description": description
+        }
+    )
+
+
+def load_personas() -> PersonaRegistry:
+    """Build the registry from the bundled and configured persona directories"""
+    dirs = [BUNDLED_PERSONAS_DIR] + [d.strip() for d in PERSONAS_DIRS.split(",") if d.strip()]
+    entries: Dict[str, Dict] = {}
+    for directory in dirs:
+        for path in sorted(glob.glob(os.path.join(directory, "*.json"))):
+            with open(path, encoding="utf-8") as f:
+                entries[os.path.splitext(os.path.basename(path))[0]] = json.load(f)
+    return PersonaRegistry([build_persona(key, entry) for key, entry in entries.items()])
+
+
+persona_registry = load_personas()
 
 # =============================================================================
 # AI RESPONSE GENERATION
 # =============================================================================
 
+FALLBACK_REPLY = "Unknown entity whispers something unintelligible..."
+
+def clip(text: str, budget: int) -> str:
+    """Cut text to a character budget at a word boundary"""
+    text = " ".join(text.split())
+    if len(text) <= budget:
+        return text
+    cut = text[:budget - 1]
+    if " " in cut:
+        cut = cut[:cut.rindex(" ")]
+    return cut.rstrip(",;:-") + "…"
+
 async def get_ai_response(
     persona: str,
     prompt: str,
-    player: str = "Player"
+    player: str = "Player",
+    context: Optional[str] = None,
+    budget: Optional[int] = None,
+    billed_to: Optional[str] = None,
+    knowledge: bool = True
 ) -> str:
-    """Get response from appropriate AI based on persona"""
+    """
+    Get response from appropriate AI based on persona
 
-    config = AI_PERSONAS.get(persona)
+    Args:
+        persona: Persona key
+        prompt: What the player said
+        player: Player name
+        context: Compact game state for the player (see players.py)
+        budget: Characters to generate and return, instead of the persona's
+            chat_budget (e.g. for structured output that must not be cut)
+        billed_to: Player whose token budget pays for the call; None for
+            system calls (debates), which count only against the persona
+            and the day
+        knowledge: Add matching facts from the knowledge index (if the
+            persona uses it)
+
+    Over a soft token budget the persona answers with a cheaper model; over a
+    hard one it reuses an earlier reply or declines (see usage.py).
+    """
+
+    config = persona_registry.get(persona)
     if not config:
-        return "Unknown entity whispers something unintelligible..."
+        return FALLBACK_REPLY
+    provider = providers.get(config.provider)
+    max_tokens = tokens_for(budget) if budget else config.max_tokens
+    budget = budget or config.chat_budget
 
-    model = config["model"]
-    system = config["system"]
+    model = config.model
+    state = budget_state(billed_to, persona)
+    if state == "hard":
+        return await over_budget_reply(persona, prompt)
+    if state == "soft":
+        model = budget_model(config.provider, provider.model)
+        LLM_BUDGET_ACTIONS.labels(persona, "downgraded").inc()
 
     # Add player context
     full_prompt = f"Player '{player}' says: {prompt}"
+    if context:
+        full_prompt = f"[{context}]\n{full_prompt}"
+    facts = await lookup(prompt) if knowledge and config.knowledge else []
+    if facts:
+        full_prompt = "[Facts you may use: " + " | ".join(facts) + "]\n" + full_prompt
 
-    try:
-        if model == "claude":
-            response = await claude_client.messages.create(
-                model="claude-3-5-haiku-20241022",
-                max_tokens=150,
-                system=system,
-                messages=[{"role": "user", "content": full_prompt}]
+    with span(
+        f"llm {config.provider}", SpanKind.CLIENT,
+        **{"gen_ai.system": config.provider, "gen_ai.request.model": model, "persona": persona}
+    ) as current, timed(LLM_SECONDS, provider=config.provider, persona=persona, outcome="ok") as labels:
+        try:
+            started = time.perf_counter()
+            completion = await provider.complete(
+                model, config.prefix, full_prompt, max_tokens, config.temperature
             )
-            return response.content[0].text[:100]
-
-        elif model == "gpt":
-            response = await openai_client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=[
-                    {"role": "system", "content": system},
-                    {"role": "user", "content": full_prompt}
-                ],
-                max_tokens=150
+            seconds = time.perf_counter() - started
+            count_tokens(config.provider, persona, completion.input_tokens, completion.output_tokens)
+            reply = clip(completion.text, budget)
+            await record_usage(
+                config.provider, model, persona, billed_to, prompt, reply,
+                completion.input_tokens, completion.output_tokens, seconds
             )
-            return response.choices[0].message.content[:100]
-
-        elif model == "gemini":
-            chat = gemini_model.start_chat(history=[])
-            response = await chat.send_message_async(f"{system}\n\n{full_prompt}")
-            return response.text[:100]
-
-    except anthropic.APIError as e:
-        print(f"Claude API error: {e}")
-        return "The Oracle's vision is clouded..."
-    except openai.APIError as e:
-        print(f"OpenAI API error: {e}")
-        return "The Architect's blueprints blur..."
-    except Exception as e:
-        print(f"AI API error ({model}): {e}")
-        return "*static* ...connection unstable... *static*"
+            return reply
+        except Exception as e:
+            labels["outcome"] = "error"
+            mark_error(current, str(e))
+            log.warning("llm_error", provider=config.provider, persona=persona, error=str(e))
+            return provider.reply_for_error(e)
+
+def count_tokens(provider: str, persona: str, prompt_tokens: int, completion_tokens: int) -> None:
+    """Record token usage reported by a provider on the metrics and the current span"""
+    LLM_TOKENS.labels(provider, persona, "input").inc(prompt_tokens or 0)
+    LLM_TOKENS.labels(provider, persona, "output").inc(completion_tokens or 0)
+    current = trace.get_current_span()
+    current.set_attribute("gen_ai.usage.input_tokens", prompt_tokens or 0)
+    current.set_attribute("gen_ai.usage.output_tokens", completion_tokens or 0)
 
 # =============================================================================
 # HELPER FUNCTIONS
 # =============================================================================
 
-def get_persona_by_model(model: str) -> Optional[dict]:
-    """Get persona config by model name"""
-    for persona, config in AI_PERSONAS.items():
-        if config["model"] == model:
-            return config
+def get_persona_by_provider(provider: str) -> Optional[Persona]:
+    """Get the first persona served by a provider"""
+    for persona in persona_registry.personas.values():
+        if persona.provider == provider:
+            return persona
     return None
 
 def list_persona_names() -> list:
     """List all available persona names"""
-    return list(AI_PERSONAS.keys())
+    return persona_registry.names()
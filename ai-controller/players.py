@@ -0,0 +1,198 @@
+"""
+PLAYER CONTEXT
+Cached per-player snapshots so personas know where a player is
+
+One refresh per server runs `list` and `time query daytime`, then four
+`data get entity` queries per online player (position, dimension, health,
+held item), all over one pooled RCON connection. Snapshots are shared by
+every request for PLAYER_CONTEXT_TTL seconds, and concurrent refreshes of
+the same server share one round trip.
+
+The chat path never waits on RCON: it uses whatever snapshot is cached and
+refreshes a stale one in the background. Quest generation, which is slower
+anyway, waits for a fresh snapshot.
+
+A snapshot renders as a compact line for the prompt, e.g.
+    Steve: overworld at 120 64 -30, health 18/20, holding diamond_pickaxe, night
+"""
+
+import os
+import time
+import asyncio
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from minecraft import rcon_chain
+from parsers import parse_data_get, parse_item_stack, parse_list, parse_time
+from logs import get_logger
+
+log = get_logger(__name__)
+
+# =============================================================================
+# CONFIGURATION
+# =============================================================================
+
+PLAYER_CONTEXT_ENABLED = os.getenv("PLAYER_CONTEXT_ENABLED", "true").lower() == "true"
+PLAYER_CONTEXT_TTL = float(os.getenv("PLAYER_CONTEXT_TTL", 10))        # Seconds a snapshot is fresh
+PLAYER_CONTEXT_MAX_AGE = float(os.getenv("PLAYER_CONTEXT_MAX_AGE", 120))  # Older snapshots aren't shown
+
+# NBT paths read per player, in order
+PLAYER_PATHS = ("Pos", "Dimension", "Health", "SelectedItem")
+
+# =============================================================================
+# SNAPSHOTS
+# =============================================================================
+
+@dataclass(frozen=True, slots=True)
+class PlayerContext:
+    player: str
+    pos: Optional[Tuple[int, int, int]] = None
+    dimension: Optional[str] = None
+    health: Optional[float] = None
+    held: Optional[str] = None
+
+    def describe(self) -> str:
+        parts = []
+        if self.dimension or self.pos:
+            where = (self.dimension or "").removeprefix("minecraft:")
+            if self.pos:
+                where += " at " + " ".join(str(c) for c in self.pos)
+            parts.append(where.strip())
+        if self.health is not None:
+            parts.append(f"health {self.health:g}/20")
+        parts.append(f"holding {self.held}" if self.held else "empty-handed")
+        return f"{self.player}: " + ", ".join(parts)
+
+
+@dataclass(frozen=True, slots=True)
+class ServerSnapshot:
+    at: float
+    daytime: Optional[int]
+    players: Dict[str, PlayerContext]
+
+
+def time_of_day(daytime: Optional[int]) -> Optional[str]:
+    if daytime is None:
+        return None
+    ticks = daytime % 24000
+    if ticks < 1000 or ticks >= 23000:
+        return "sunrise"
+    if ticks < 12000:
+        return "day"
+    if ticks < 13000:
+        return "sunset"
+    return "night"
+
+def player_queries(first: List[str]) -> List[str]:
+    """`data get entity` queries for everyone in the `list` output"""
+    roster = parse_list(first[0])
+    if roster is None:
+        return []
+    return [f"data get entity {player} {path}" for player in roster.players for path in PLAYER_PATHS]
+
+def _is_number(value) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+# Shape each path's value must have; anything else (an error message parsed
+# as a string, a modded server's extra data) drops just that field
+PATH_CHECKS = {
+    "Pos": lambda v: isinstance(v, tuple) and len(v) == 3 and all(_is_number(c) for c in v),
+    "Dimension": lambda v: isinstance(v, str),
+    "Health": _is_number,
+    "SelectedItem": lambda v: True,  # Read from the raw compound
+}
+
+def parse_player(player: str, outputs: List[str]) -> PlayerContext:
+    values = {}
+    for path, output in zip(PLAYER_PATHS, outputs):
+        result = parse_data_get(output)
+        if result and result.found and PATH_CHECKS[path](result.value):
+            values[path] = result.value if path != "SelectedItem" else result.raw
+    item = parse_item_stack(values["SelectedItem"]) if "SelectedItem" in values else None
+    return PlayerContext(
+        player=player,
+        pos=tuple(round(c) for c in values["Pos"]) if "Pos" in values else None,
+        dimension=values.get("Dimension"),
+        health=values.get("Health"),
+        held=item.id.removeprefix("minecraft:") if item else None
+    )
+
+def collect(server: str) -> Optional[ServerSnapshot]:
+    """Query every online player over one connection (blocking)"""
+    (list_output, time_output), outputs = rcon_chain(["list", "time query daytime"], player_queries, server)
+    roster = parse_list(list_output)
+    if roster is None:
+        return None
+    width = len(PLAYER_PATHS)
+    players = {
+        player: parse_player(player, outputs[i * width:(i + 1) * width])
+        for i, player in enumerate(roster.players)
+    }
+    return ServerSnapshot(time.time(), parse_time(time_output), players)
+
+# =============================================================================
+# CACHE
+# =============================================================================
+
+_snapshots: Dict[str, ServerSnapshot] = {}
+_inflight: Dict[str, asyncio.Task] = {}
+
+async def _refresh(server: str) -> Optional[ServerSnapshot]:
+    try:
+        snapshot = await asyncio.to_thread(collect, server)
+    except Exception as e:
+        log.warning("player_context_failed", server=server, error=str(e))
+        return None
+    if snapshot:
+        _snapshots[server] = snapshot
+    return snapshot
+
+def refresh(server: str) -> asyncio.Task:
+    """Start (or join) a refresh of one server's snapshot"""
+    task = _inflight.get(server)
+    if task is None:
+        task = asyncio.create_task(_refresh(server))
+        _inflight[server] = task
+        task.add_done_callback(lambda _: _inflight.pop(server, None))
+    return task
+
+async def get_snapshot(server: str, wait: bool = False) -> Optional[ServerSnapshot]:
+    """
+    A server's snapshot, refreshed when older than PLAYER_CONTEXT_TTL
+
+    Args:
+        server: Server name
+        wait: Wait for the refresh instead of returning the cached snapshot
+    """
+    cached = _snapshots.get(server)
+    if cached and time.time() - cached.at < PLAYER_CONTEXT_TTL:
+        return cached
+    task = refresh(server)
+    if wait:
+        return await asyncio.shield(task) or cached
+    return cached
+
+async def describe_player(server: str, player: str, wait: bool = False) -> Optional[str]:
+    """
+    Prompt context for one player, or None if they aren't known to be online
+
+    Args:
+        server: Server the player is on
+        player: Player name
+        wait: Wait for fresh data (off on the chat path)
+    """
+    if not PLAYER_CONTEXT_ENABLED:
+        return None
+    try:
+        snapshot = await get_snapshot(server, wait)
+        if snapshot is None or time.time() - snapshot.at > PLAYER_CONTEXT_MAX_AGE:
+            return None
+        context = snapshot.players.get(player)
+        if context is None:
+            return None
+        daytime = time_of_day(snapshot.daytime)
+        return context.describe() + (f", {daytime}" if daytime else "")
+    except Exception as e:
+        # Context is a nice-to-have; a bad lookup must not fail the reply
+        log.warning("player_context_describe_failed", server=server, player=player, error=str(e))
+        return None
@@ -0,0 +1,267 @@
+"""
+LLM PROVIDERS
+Plugin registry for the model SDKs, loaded on first use
+
+Importing anthropic, openai and google.generativeai costs seconds of cold
+start and tens of MB each, so nothing is imported until a provider is first
+asked for (or preloaded at startup via LLM_PRELOAD). A deployment that never
+routes to Gemini never imports its SDK.
+
+Each provider wraps one SDK behind `complete()`, returning the text and the
+token usage the SDK reports.
+"""
+
+import os
+import time
+import asyncio
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple, Type
+
+from logs import get_logger
+
+log = get_logger(__name__)
+
+# =============================================================================
+# CONFIGURATION
+# =============================================================================
+
+# Providers to load during startup instead of on first request:
+# comma-separated names, "all", or empty for fully lazy loading
+LLM_PRELOAD = os.getenv("LLM_PRELOAD", "")
+
+FALLBACK_ERROR_REPLY = "*static* ...connection unstable... *static*"
+
+# =============================================================================
+# PROVIDER BASE
+# =============================================================================
+
+@dataclass
+class Completion:
+    text: str
+    input_tokens: int = 0
+    output_tokens: int = 0
+
+
+class Provider:
+    """
+    One LLM SDK, imported and connected on first use
+
+    Subclasses set `name`, `model` and `api_key_env` and implement `build()`
+    (import the SDK, return the client) and `complete()`. `prefix()` turns a
+    system prompt into whatever `complete()` sends ahead of the user prompt,
+    so personas can build it once at load time.
+    """
+
+    name: str = ""
+    model: str = ""                        # Default model for personas that don't pick one
+    api_key_env: str = ""
+    error_reply: str = FALLBACK_ERROR_REPLY  # In-game reply when the SDK raises
+
+    def __init__(self):
+        self.client: Any = None
+        self.api_errors: Tuple[Type[BaseException], ...] = ()
+        self.load_seconds: Optional[float] = None
+        self._lock = asyncio.Lock()
+
+    @property
+    def configured(self) -> bool:
+        return bool(os.getenv(self.api_key_env))
+
+    @property
+    def loaded(self) -> bool:
+        return self.client is not None
+
+    def build(self) -> Tuple[Any, Tuple[Type[BaseException], ...]]:
+        """Import the SDK and return (client, SDK API error types)"""
+        raise NotImplementedError
+
+    def prefix(self, system: str) -> Any:
+        return system
+
+    async def complete(
+        self,
+        model: str,
+        prefix: Any,
+        prompt: str,
+        max_tokens: int,
+        temperature: Optional[float] = None
+    ) -> Completion:
+        raise NotImplementedError
+
+    def use(self, client: Any) -> None:
+        """Use a prebuilt client instead of the SDK (benchmarks, tests)"""
+        self.client = client
+        self.load_seconds = 0.0
+
+    async def load(self) -> Any:
+        """Return the client, importing the SDK in a thread the first time"""
+        if self.client is None:
+            async with self._lock:
+                if self.client is None:
+                    started = time.perf_counter()
+                    client, self.api_errors = await asyncio.to_thread(self.build)
+                    self.load_seconds = time.perf_counter() - started
+                    self.client = client
+                    log.info("provider_loaded", provider=self.name,
+                             seconds=round(self.load_seconds, 3), configured=self.configured)
+        return self.client
+
+    def reply_for_error(self, error: Exception) -> str:
+        """In-game reply for a failed completion"""
+        if self.api_errors and isinstance(error, self.api_errors):
+            return self.error_reply
+        return FALLBACK_ERROR_REPLY
+
+# =============================================================================
+# PROVIDERS
+# =============================================================================
+
+class ClaudeProvider(Provider):
+    name = "claude"
+    model = "claude-3-5-haiku-20241022"
+    api_key_env = "ANTHROPIC_API_KEY"
+    error_reply = "The Oracle's vision is clouded..."
+
+    def build(self):
+        import anthropic
+        client = anthropic.AsyncAnthropic(api_key=os.getenv(self.api_key_env, ""))
+        return client, (anthropic.APIError,)
+
+    async def complete(self, model, prefix, prompt, max_tokens, temperature=None):
+        client = await self.load()
+        options = {} if temperature is None else {"temperature": temperature}
+        response = await client.messages.create(
+            model=model,
+            max_tokens=max_tokens,
+            system=prefix,
+            messages=[{"role": "user", "content": prompt}],
+            **options
+        )
+        return Completion(response.content[0].text, response.usage.input_tokens, response.usage.output_tokens)
+
+
+class OpenAIProvider(Provider):
+    name = "gpt"
+    model = "gpt-4o-mini"
+    api_key_env = "OPENAI_API_KEY"
+    error_reply = "The Architect's blueprints blur..."
+
+    def build(self):
+        import openai
+        client = openai.AsyncOpenAI(api_key=os.getenv(self.api_key_env, ""))
+        return client, (openai.APIError,)
+
+    def prefix(self, system):
+        return [{"role": "system", "content": system}]
+
+    async def complete(self, model, prefix, prompt, max_tokens, temperature=None):
+        client = await self.load()
+        options = {} if temperature is None else {"temperature": temperature}
+        response = await client.chat.completions.create(
+            model=model,
+            messages=prefix + [{"role": "user", "content": prompt}],
+            max_tokens=max_tokens,
+            **options
+        )
+        usage = response.usage
+        return Completion(
+            response.choices[0].message.content,
+            usage.prompt_tokens if usage else 0,
+            usage.completion_tokens if usage else 0
+        )
+
+
+class GeminiProvider(Provider):
+    name = "gemini"
+    model = "gemini-2.0-flash"
+    api_key_env = "GOOGLE_API_KEY"
+
+    def __init__(self):
+        super().__init__()
+        self._models: Dict[str, Any] = {}
+
+    def build(self):
+        import google.generativeai as genai
+        from google.api_core.exceptions import GoogleAPIError
+        genai.configure(api_key=os.getenv(self.api_key_env, ""))
+        return genai, (GoogleAPIError,)
+
+    def use(self, client):
+        super().use(client)
+        self._models.clear()
+
+    def prefix(self, system):
+        # Sent as part of the message rather than as a system instruction,
+        # so one GenerativeModel per model name serves every persona
+        return f"{system}\n\n"
+
+    async def complete(self, model, prefix, prompt, max_tokens, temperature=None):
+        genai = await self.load()
+        if model not in self._models:
+            self._models[model] = genai.GenerativeModel(model)
+        chat = self._models[model].start_chat(history=[])
+        config = {"max_output_tokens": max_tokens}
+        if temperature is not None:
+            config["temperature"] = temperature
+        response = await chat.send_message_async(prefix + prompt, generation_config=config)
+        usage = getattr(response, "usage_metadata", None)
+        return Completion(
+            response.text,
+            usage.prompt_token_count if usage else 0,
+            usage.candidates_token_count if usage else 0
+        )
+
+# =============================================================================
+# REGISTRY
+# =============================================================================
+
+class ProviderRegistry:
+    """Providers by name; registering one never imports its SDK"""
+
+    def __init__(self):
+        self._providers: Dict[str, Provider] = {}
+
+    def register(self, provider: Provider) -> Provider:
+        self._providers[provider.name] = provider
+        return provider
+
+    def get(self, name: str) -> Optional[Provider]:
+        return self._providers.get(name)
+
+    def names(self) -> List[str]:
+        return list(self._providers)
+
+    async def preload(self, spec: str = LLM_PRELOAD) -> None:
+        """Load the providers named in `spec` ("all" or comma-separated) concurrently"""
+        if spec.strip() == "all":
+            names = self.names()
+        else:
+            names = [n.strip() for n in spec.split(",") if n.strip()]
+        unknown = [n for n in names if n not in self._providers]
+        if unknown:
+            log.warning("unknown_providers", providers=unknown)
+        results = await asyncio.gather(
+            *(self._providers[n].load() for n in names if n in self._providers),
+            return_exceptions=True
+        )
+        for name, result in zip([n for n in names if n in self._providers], results):
+            if isinstance(result, Exception):
+                log.warning("provider_load_failed", provider=name, error=str(result))
+
+    def report(self) -> Dict[str, Dict]:
+        """Load state and timings per provider"""
+        return {
+            name: {
+                "model": p.model,
+                "configured": p.configured,
+                "loaded": p.loaded,
+                "load_ms": round(p.load_seconds * 1000, 1) if p.load_seconds is not None else None,
+            }
+            for name, p in self._providers.items()
+        }
+
+
+providers = ProviderRegistry()
+providers.register(ClaudeProvider())
+providers.register(OpenAIProvider())
+providers.register(GeminiProvider())
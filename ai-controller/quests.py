@@ -3,10 +3,23 @@ QUEST SYSTEM
 Dynamic quest generation using AI
 """
 
+import os
 import json
 import random
-from typing import Dict, Optional
+import asyncio
+from typing import Dict, List, Optional
 from personas import get_ai_response
+from components import text_json
+from players import describe_player
+from objectives import infer_tracking, tracking
+from servers import registry
+from logs import get_logger
+from metrics import QUEST_SECONDS, timed
+
+log = get_logger(__name__)
+
+QUEST_BULK_CONCURRENCY = int(os.getenv("QUEST_BULK_CONCURRENCY", 8))  # LLM calls at once for generate-all
+QUEST_BUDGET = 600    # Characters the Oracle may use for a quest's JSON
 
 # =============================================================================
 # QUEST TEMPLATES (Fallback)
@@ -18,14 +31,16 @@ QUEST_TEMPLATES = [
         "template": "Collect {count} {item}",
         "items": ["diamonds", "emeralds", "iron ingots", "gold ingots", "coal", "redstone"],
         "count_range": (5, 20),
-        "reward_template": "{reward_count} {reward_item}"
+        "reward_template": "{reward_count} {reward_item}",
+        "track": ("picked_up", "item")
     },
     {
         "title": "The Hunt",
         "template": "Defeat {count} {mob}",
         "mobs": ["zombies", "skeletons", "spiders", "creepers", "endermen", "witches"],
         "count_range": (10, 30),
-        "reward_template": "{reward_count} levels of XP"
+        "reward_template": "{reward_count} levels of XP",
+        "track": ("killed", "mob")
     },
     {
         "title": "The Builder",
@@ -37,7 +52,8 @@ QUEST_TEMPLATES = [
         "title": "The Explorer",
         "template": "Travel {count} blocks from spawn",
         "count_range": (500, 2000),
-        "reward_template": "Coordinates to a {reward_item}"
+        "reward_template": "Coordinates to a {reward_item}",
+        "track": ("travel", None)
     },
     {
         "title": "The Survivor",
@@ -63,14 +79,24 @@ QUEST_TEMPLATES = [
         "template": "Harvest {count} {crop}",
         "crops": ["wheat", "carrots", "potatoes", "beetroot", "melons", "pumpkins"],
         "count_range": (32, 128),
-        "reward_template": "{reward_count} bone meal"
+        "reward_template": "{reward_count} bone meal",
+        "track": ("mined", "crop")
     },
     {
         "title": "The Miner",
         "template": "Mine {count} blocks of {ore} ore",
         "ores": ["iron", "gold", "diamond", "copper", "lapis lazuli", "redstone"],
         "count_range": (10, 50),
-        "reward_template": "A diamond pickaxe"
+        "reward_template": "A diamond pickaxe",
+        "track": ("mined", "ore")
+    },
+    {
+        "title": "The Craftsman",
+        "template": "Craft {count} {item}",
+        "items": ["torches", "chests", "ladders", "bookshelves", "rails"],
+        "count_range": (8, 32),
+        "reward_template": "{reward_count} {reward_item}",
+        "track": ("crafted", "item")
     },
     {
         "title": "The Adventurer",
@@ -95,32 +121,45 @@ REWARDS = [
 # QUEST GENERATION
 # =============================================================================
 
-async def generate_quest(player: str) -> Dict:
+async def generate_quest(player: str, server: Optional[str] = None) -> Dict:
     """
     Generate a dynamic quest for a player using AI
     
     Args:
         player: Player name
+        server: Server the player is on, to fit the quest to where they are
         
     Returns:
         Quest dictionary with title, description, objective, reward
     """
-    
+    with timed(QUEST_SECONDS, source="ai") as labels:
+        context = await describe_player(server or registry.default, player, wait=True)
+        quest = await _generate_ai_quest(player, context)
+        if quest is None:
+            labels["source"] = "template"
+            quest = generate_template_quest(player)
+        return quest
+
+async def _generate_ai_quest(player: str, context: Optional[str] = None) -> Optional[Dict]:
+    """Ask the Oracle for a quest, or None if its answer isn't usable"""
     # Try AI generation first
+    situation = "\n- Fit the player's current situation (bracketed above)" if context else ""
     prompt = f"""Generate a unique Minecraft quest for player "{player}".
 
 The quest should be:
 - Achievable in 15-45 minutes of gameplay
 - Fun and slightly challenging
 - Have a clear, measurable objective
-- Include a meaningful reward
+- Include a meaningful reward{situation}
 
 Respond ONLY with valid JSON in this exact format (no other text):
 {{"title": "Quest Name", "description": "What to do in 1-2 sentences", "objective": "Specific measurable goal", "reward": "What they receive"}}
 """
     
     try:
-        response = await get_ai_response("oracle", prompt, "System")
+        response = await get_ai_response(
+            "oracle", prompt, "System", context, budget=QUEST_BUDGET, billed_to=player, knowledge=False
+        )
         
         # Try to extract JSON from response
         # Handle cases where AI might include extra text
@@ -137,15 +176,17 @@ Respond ONLY with valid JSON in this exact format (no other text):
         if all(field in quest for field in required_fields):
             quest["generated_by"] = "ai"
             quest["player"] = player
+            # Measurable objectives complete themselves (see objectives.py)
+            quest.update(infer_tracking(str(quest["objective"])))
             return quest
             
     except (json.JSONDecodeError, ValueError, KeyError) as e:
-        print(f"AI quest generation failed: {e}, using template")
+        log.info("quest_ai_unparseable", player=player, error=str(e))
     except Exception as e:
-        print(f"Unexpected error in quest generation: {e}")
+        log.error("quest_generation_failed", player=player, error=str(e))
     
-    # Fallback to template-based generation
-    return generate_template_quest(player)
+    # Caller falls back to template-based generation
+    return None
 
 def generate_template_quest(player: str) -> Dict:
     """
@@ -161,14 +202,14 @@ def generate_template_quest(player: str) -> Dict:
     
     # Build description
     count = random.randint(*template["count_range"])
-    description = template["template"].format(
-        count=count,
-        item=random.choice(template.get("items", ["items"])),
-        mob=random.choice(template.get("mobs", ["mobs"])),
-        biome=random.choice(template.get("biomes", ["wilderness"])),
-        crop=random.choice(template.get("crops", ["crops"])),
-        ore=random.choice(template.get("ores", ["ore"]))
-    )
+    picks = {
+        "item": random.choice(template.get("items", ["items"])),
+        "mob": random.choice(template.get("mobs", ["mobs"])),
+        "biome": random.choice(template.get("biomes", ["wilderness"])),
+        "crop": random.choice(template.get("crops", ["crops"])),
+        "ore": random.choice(template.get("ores", ["ore"]))
+    }
+    description = template["template"].format(count=count, **picks)
     
     # Build reward
     reward_count = random.randint(1, 5)
@@ -178,7 +219,7 @@ def generate_template_quest(player: str) -> Dict:
         reward_item=reward_item
     )
     
-    return {
+    quest = {
         "title": template["title"],
         "description": description,
         "objective": description,  # Same as description for templates
@@ -186,6 +227,51 @@ def generate_template_quest(player: str) -> Dict:
         "generated_by": "template",
         "player": player
     }
+    if "track" in template:
+        stat, pick = template["track"]
+        quest.update(tracking(stat, picks.get(pick, ""), count))
+    return quest
+
+async def generate_quests(players: Dict[str, str]) -> Dict[str, Dict]:
+    """
+    Generate quests for many players concurrently
+
+    At most QUEST_BULK_CONCURRENCY quests are generated at once, so a full
+    server takes about one LLM round trip per batch instead of one per player.
+
+    Args:
+        players: Player name -> server they are on
+
+    Returns:
+        Player name -> quest
+    """
+    gate = asyncio.Semaphore(max(1, QUEST_BULK_CONCURRENCY))
+
+    async def one(player: str, server: str) -> Dict:
+        async with gate:
+            return await generate_quest(player, server)
+
+    quests = await asyncio.gather(*(one(player, server) for player, server in players.items()))
+    return dict(zip(players, quests))
+
+def quest_announcements(quests: Dict[str, Dict]) -> List[str]:
+    """
+    RCON commands announcing a set of new quests, to send as one batch
+
+    Each player gets the title and their quest privately; everyone sees one
+    line saying how many quests went out.
+    """
+    commands = []
+    for player, quest in quests.items():
+        commands += [
+            f"title {player} times 10 70 20",
+            f"title {player} subtitle {text_json('§e' + quest['title'])}",
+            f"title {player} title {text_json('§6NEW QUEST', None, True)}",
+            f"tellraw {player} {text_json(f'§7[The Oracle]§r {player}, your quest: ' + quest['description'])}",
+        ]
+    count = f"{len(quests)} new quest" + ("s have" if len(quests) != 1 else " has")
+    commands.append(f"tellraw @a {text_json(f'§7[The Oracle]§r {count} been handed out!')}")
+    return commands
 
 # =============================================================================
 # QUEST MANAGEMENT
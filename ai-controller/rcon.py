@@ -0,0 +1,241 @@
+"""
+RCON CLIENT
+Minimal, thread-safe Source RCON client with connection pooling
+
+mcrcon installs a SIGALRM handler per connection, which only works on the
+main thread and rules out reusing connections from worker threads. This
+client uses socket timeouts instead and keeps authenticated connections
+warm in a per-server pool.
+"""
+
+import queue
+import select
+import socket
+import struct
+import threading
+from contextlib import contextmanager
+from typing import Callable, Iterator, List, Optional, Tuple
+
+# =============================================================================
+# PROTOCOL
+# =============================================================================
+
+SERVERDATA_AUTH = 3
+SERVERDATA_EXECCOMMAND = 2
+SERVERDATA_RESPONSE_VALUE = 0
+
+# Vanilla reads requests into a 1460-byte buffer (4 length + 8 header + 2 nul)
+MAX_COMMAND_BYTES = 1446
+
+# Vanilla splits long responses into 4096-byte packets
+MAX_RESPONSE_CHUNK = 4096
+
+# How long to wait for a follow-up packet after a full-size chunk
+FRAGMENT_WAIT = 0.05
+
+
+class RconError(Exception):
+    """Raised for RCON connection, authentication and protocol failures"""
+
+
+class CommandTooLongError(ValueError):
+    """Raised before sending a command the server would reject for its size
+
+    Not an RconError: the connection is fine and a retry would fail the same way.
+    """
+
+
+def check_command(command: str) -> None:
+    """Raise CommandTooLongError if a command doesn't fit in one request packet"""
+    size = len(command.encode("utf-8"))
+    if size > MAX_COMMAND_BYTES:
+        raise CommandTooLongError(f"Command too long ({size} > {MAX_COMMAND_BYTES} bytes)")
+
+
+class RconConnection:
+    """A single authenticated RCON connection"""
+
+    def __init__(self, host: str, port: int, password: str, timeout: float = 5.0):
+        self.host = host
+        self.port = port
+        self.password = password
+        self.timeout = timeout
+        self.sock: Optional[socket.socket] = None
+        self.uses = 0
+        self._request_id = 0
+
+    def connect(self) -> None:
+        """Open the socket and authenticate"""
+        self.sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        request_id = self._send(SERVERDATA_AUTH, self.password)
+        response_id, _, _ = self._read_packet()
+        if response_id == -1 or response_id != request_id:
+            self.close()
+            raise RconError("Authentication failed - check RCON_PASSWORD")
+
+    def close(self) -> None:
+        if self.sock is not None:
+            try:
+                self.sock.close()
+            finally:
+                self.sock = None
+
+    @property
+    def connected(self) -> bool:
+        return self.sock is not None
+
+    def _send(self, packet_type: int, body: str) -> int:
+        if self.sock is None:
+            raise RconError("Not connected")
+        if packet_type == SERVERDATA_EXECCOMMAND:
+            check_command(body)
+        payload = body.encode("utf-8")
+        self._request_id = (self._request_id % 0x7FFFFFFF) + 1
+        packet = struct.pack("<ii", self._request_id, packet_type) + payload + b"\x00\x00"
+        self.sock.sendall(struct.pack("<i", len(packet)) + packet)
+        return self._request_id
+
+    def _recv_exact(self, length: int) -> bytes:
+        data = bytearray()
+        while len(data) < length:
+            chunk = self.sock.recv(length - len(data))
+            if not chunk:
+                raise RconError("Connection closed by server")
+            data += chunk
+        return bytes(data)
+
+    def _read_packet(self):
+        length, = struct.unpack("<i", self._recv_exact(4))
+        if length < 10:
+            raise RconError(f"Malformed packet (length {length})")
+        payload = self._recv_exact(length)
+        response_id, packet_type = struct.unpack("<ii", payload[:8])
+        return response_id, packet_type, payload[8:-2]
+
+    def _more_pending(self) -> bool:
+        readable, _, _ = select.select([self.sock], [], [], FRAGMENT_WAIT)
+        return bool(readable)
+
+    def command(self, command: str) -> str:
+        """Execute one command and return its (reassembled) output"""
+        request_id = self._send(SERVERDATA_EXECCOMMAND, command)
+        self.uses += 1
+        chunks = []
+        while True:
+            response_id, _, body = self._read_packet()
+            if response_id != request_id:
+                # Stale response from an earlier, abandoned request
+                continue
+            chunks.append(body)
+            if len(body) < MAX_RESPONSE_CHUNK or not self._more_pending():
+                break
+        return b"".join(chunks).decode("utf-8", errors="replace")
+
+    def command_batch(self, commands: List[str]) -> List[str]:
+        """
+        Execute several commands back to back on this connection
+
+        Vanilla drops the connection when two packets arrive in one read,
+        so requests are not pipelined; the batch saves pool checkouts,
+        reconnects and keeps the commands ordered.
+        """
+        return [self.command(cmd) for cmd in commands]
+
+# =============================================================================
+# CONNECTION POOL
+# =============================================================================
+
+class RconPool:
+    """Thread-safe pool of warm RCON connections to one server"""
+
+    def __init__(self, host: str, port: int, password: str, size: int = 4, timeout: float = 5.0):
+        self.host = host
+        self.port = port
+        self.password = password
+        self.size = size
+        self.timeout = timeout
+        self._idle: "queue.LifoQueue[RconConnection]" = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+
+    def _new_connection(self) -> RconConnection:
+        conn = RconConnection(self.host, self.port, self.password, self.timeout)
+        conn.connect()
+        return conn
+
+    @contextmanager
+    def connection(self) -> Iterator[RconConnection]:
+        """Check out a connection; broken connections are discarded"""
+        if not self._slots.acquire(timeout=self.timeout):
+            raise RconError("Timed out waiting for a pooled RCON connection")
+        conn = None
+        try:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                conn = self._new_connection()
+            yield conn
+        except (OSError, RconError):
+            if conn is not None:
+                conn.close()
+                conn = None
+            raise
+        finally:
+            if conn is not None and conn.connected:
+                self._idle.put(conn)
+            self._slots.release()
+
+    def _run(self, func):
+        reused = False
+        try:
+            with self.connection() as conn:
+                reused = conn.uses > 0
+                return func(conn)
+        except (OSError, RconError) as e:
+            # Retry once if the server had closed an idle pooled connection;
+            # a timeout means the command may have run, so never repeat it
+            if not reused or isinstance(e, socket.timeout):
+                raise
+        with self.connection() as conn:
+            return func(conn)
+
+    def command(self, command: str) -> str:
+        # Checked before checkout so an oversized command never costs a connection
+        check_command(command)
+        return self._run(lambda conn: conn.command(command))
+
+    def command_batch(self, commands: List[str]) -> List[str]:
+        for cmd in commands:
+            check_command(cmd)
+        results: List[str] = []
+
+        def run(conn: RconConnection) -> List[str]:
+            # Resume after the last completed command if we had to retry
+            for cmd in commands[len(results):]:
+                results.append(conn.command(cmd))
+            return results
+
+        return self._run(run)
+
+    def command_chain(
+        self, commands: List[str], follow_up: Callable[[List[str]], List[str]]
+    ) -> Tuple[List[str], List[str]]:
+        """
+        Run commands, then the commands follow_up derives from their output,
+        on one connection. A retry reruns both, so keep this to queries.
+        """
+        for cmd in commands:
+            check_command(cmd)
+
+        def run(conn: RconConnection) -> Tuple[List[str], List[str]]:
+            first = [conn.command(cmd) for cmd in commands]
+            return first, [conn.command(cmd) for cmd in follow_up(first)]
+
+        return self._run(run)
+
+    def close(self) -> None:
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
@@ -0,0 +1,146 @@
+"""
+SERVER REGISTRY
+The Minecraft servers this controller drives
+
+Servers are read from MC_SERVERS_FILE (a JSON list) or the MC_SERVERS
+environment variable, falling back to a single "default" server built from
+RCON_HOST / RCON_PORT / RCON_PASSWORD:
+
+    [
+        {"name": "survival", "host": "mc-survival", "port": 25575,
+         "password": "...", "groups": ["main"]},
+        {"name": "creative", "host": "mc-creative", "groups": ["main", "build"],
+         "log_file": "/minecraft-creative/logs/latest.log"}
+    ]
+
+log_file (optional) is the server's logs/latest.log as seen by the
+controller, used for in-game chat; the single default server takes it from
+SERVER_LOG_FILE.
+
+Targets accepted by `resolve`: None (default server), "all" / "*", a server
+name, a group name, or a comma-separated mix of those.
+"""
+
+import json
+import os
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+# =============================================================================
+# CONFIGURATION
+# =============================================================================
+
+RCON_HOST = os.getenv("RCON_HOST", "localhost")
+RCON_PORT = int(os.getenv("RCON_PORT", 25575))
+RCON_PASSWORD = os.getenv("RCON_PASSWORD", "")
+SERVER_LOG_FILE = os.getenv("SERVER_LOG_FILE", "")
+
+MC_SERVERS_FILE = os.getenv("MC_SERVERS_FILE", "")
+MC_SERVERS = os.getenv("MC_SERVERS", "")
+DEFAULT_SERVER = os.getenv("DEFAULT_SERVER", "")
+
+ALL_SERVERS = ("all", "*")
+
+# =============================================================================
+# REGISTRY
+# =============================================================================
+
+@dataclass(frozen=True)
+class ServerConfig:
+    """Connection details for one Minecraft server"""
+    name: str
+    host: str
+    port: int = 25575
+    password: str = ""
+    groups: Tuple[str, ...] = field(default_factory=tuple)
+    log_file: str = ""
+
+    def public(self) -> dict:
+        """Config safe to return from the API (no password)"""
+        return {"name": self.name, "host": self.host, "port": self.port, "groups": list(self.groups)}
+
+
+class UnknownServerError(KeyError):
+    """Raised when a target names no known server or group"""
+
+
+class ServerRegistry:
+    """Lookup of servers by name and group"""
+
+    def __init__(self, servers: List[ServerConfig], default: Optional[str] = None):
+        if not servers:
+            raise ValueError("At least one server must be configured")
+        self.servers: Dict[str, ServerConfig] = {s.name: s for s in servers}
+        self.default = default if default in self.servers else servers[0].name
+        self.groups: Dict[str, List[str]] = {}
+        for server in servers:
+            for group in server.groups:
+                self.groups.setdefault(group, []).append(server.name)
+
+    def get(self, name: Optional[str] = None) -> ServerConfig:
+        """Get one server by name (None for the default)"""
+        name = name or self.default
+        if name not in self.servers:
+            raise UnknownServerError(name)
+        return self.servers[name]
+
+    def resolve(self, target: Optional[str] = None) -> List[ServerConfig]:
+        """
+        Resolve a target expression to a list of servers
+
+        Args:
+            target: None, "all", a server name, a group, or a comma-separated list
+
+        Returns:
+            Servers in registry order, without duplicates
+        """
+        if not target:
+            return [self.servers[self.default]]
+
+        names = set()
+        for part in target.split(","):
+            part = part.strip()
+            if not part:
+                continue
+            if part in ALL_SERVERS:
+                names.update(self.servers)
+            elif part in self.servers:
+                names.add(part)
+            elif part in self.groups:
+                names.update(self.groups[part])
+            else:
+                raise UnknownServerError(part)
+        return [s for name, s in self.servers.items() if name in names]
+
+    def names(self) -> List[str]:
+        return list(self.servers)
+
+
+def load_registry() -> ServerRegistry:
+    """Build the registry from environment/config file"""
+    raw = None
+    if MC_SERVERS_FILE:
+        with open(MC_SERVERS_FILE, encoding="utf-8") as f:
+            raw = json.load(f)
+    elif MC_SERVERS:
+        raw = json.loads(MC_SERVERS)
+
+    if not raw:
+        return ServerRegistry([ServerConfig("default", RCON_HOST, RCON_PORT, RCON_PASSWORD, log_file=SERVER_LOG_FILE)])
+
+    servers = [
+        ServerConfig(
+            name=entry["name"],
+            host=entry.get("host", RCON_HOST),
+            port=int(entry.get("port", 25575)),
+            # Fall back to the shared password so it can stay out of the file
+            password=entry.get("password", RCON_PASSWORD),
+            groups=tuple(entry.get("groups", ())),
+            log_file=entry.get("log_file", ""),
+        )
+        for entry in raw
+    ]
+    return ServerRegistry(servers, DEFAULT_SERVER or None)
+
+
+registry = load_registry()
@@ -0,0 +1,151 @@
+"""
+STATUS AGGREGATION
+One concurrent snapshot of RCON, roster, TPS, Redis and recent events
+
+Each server is probed with a single batched RCON checkout (`list` and
+`tick query` together), every probe has its own timeout, and snapshots are
+cached briefly so bursts of /status calls share one set of round trips.
+"""
+
+import os
+import time
+import asyncio
+from datetime import datetime
+from typing import Any, Awaitable, Dict, List, Tuple
+
+from store import get_redis
+from minecraft import rcon_batch
+from parsers import parse_list, parse_tick_query
+from ticks import record as record_tick
+
+# =============================================================================
+# CONFIGURATION
+# =============================================================================
+
+STATUS_CACHE_TTL = float(os.getenv("STATUS_CACHE_TTL", 2))
+RCON_PROBE_TIMEOUT = float(os.getenv("RCON_PROBE_TIMEOUT", 3))
+REDIS_PROBE_TIMEOUT = float(os.getenv("REDIS_PROBE_TIMEOUT", 1))
+RECENT_EVENTS = 5
+
+# =============================================================================
+# PROBES
+# =============================================================================
+
+async def _with_timeout(probe: Awaitable, timeout: float, fallback: Any) -> Tuple[Any, float]:
+    """Run a probe, returning (result, elapsed ms) or the fallback on failure"""
+    start = time.perf_counter()
+    try:
+        result = await asyncio.wait_for(probe, timeout)
+    except asyncio.TimeoutError:
+        result = fallback("timeout")
+    except Exception as e:
+        result = fallback(str(e))
+    return result, round((time.perf_counter() - start) * 1000, 1)
+
+def _server_error(reason: str) -> Dict:
+    return {"rcon": f"error: {reason}", "players": [], "count": 0, "max": None, "tps": None, "mspt": None}
+
+async def probe_server(name: str) -> Dict:
+    """Roster and tick timing for one server over one pooled connection"""
+    list_output, tick_output = await asyncio.to_thread(rcon_batch, ["list", "tick query"], name)
+    roster = parse_list(list_output)
+    if roster is None:
+        return _server_error(list_output)
+
+    # tick query needs 1.20.3+; older servers just report no TPS
+    tick = parse_tick_query(tick_output)
+    if tick:
+        record_tick(name, tick)
+    return {
+        "rcon": "ok",
+        "players": list(roster.players),
+        "count": roster.online,
+        "max": roster.max_players,
+        "tps": round(tick.tps, 1) if tick else None,
+        "mspt": tick.mspt if tick else None
+    }
+
+async def probe_redis() -> Dict:
+    """Redis liveness and the most recent chaos events, in one round trip"""
+    r = await get_redis()
+    async with r.pipeline(transaction=False) as pipe:
+        pipe.ping()
+        pipe.lrange("chaos:events", 0, RECENT_EVENTS - 1)
+        _, events = await pipe.execute()
+
+    recent = []
+    for entry in events:
+        parts = entry.split("|")
+        recent.append({
+            "timestamp": parts[0],
+            "event": parts[1] if len(parts) > 1 else "",
+            "server": parts[2] if len(parts) > 2 else None
+        })
+    return {"redis": "ok", "recent_events": recent}
+
+# =============================================================================
+# SNAPSHOT
+# =============================================================================
+
+async def collect_status(servers: List[str]) -> Dict:
+    """Probe every server and Redis concurrently"""
+    probes = [
+        _with_timeout(probe_server(name), RCON_PROBE_TIMEOUT, _server_error)
+        for name in servers
+    ]
+    probes.append(_with_timeout(
+        probe_redis(), REDIS_PROBE_TIMEOUT,
+        lambda reason: {"redis": f"error: {reason}", "recent_events": []}
+    ))
+    results = await asyncio.gather(*probes)
+
+    redis_result, redis_ms = results[-1]
+    by_server = {}
+    for name, (result, elapsed) in zip(servers, results[:-1]):
+        result["latency_ms"] = elapsed
+        by_server[name] = result
+
+    rcon_ok = all(s["rcon"] == "ok" for s in by_server.values())
+    players = [p for s in by_server.values() for p in s["players"]]
+    tps = [s["tps"] for s in by_server.values() if s["tps"] is not None]
+    primary = by_server[servers[0]]
+
+    return {
+        "status": "healthy" if rcon_ok and redis_result["redis"] == "ok" else "degraded",
+        "rcon": "ok" if rcon_ok else "error",
+        "redis": redis_result["redis"],
+        "players": players,
+        "count": len(players),
+        "max": primary["max"] if len(servers) == 1 else None,
+        "tps": min(tps) if tps else None,
+        "mspt": primary["mspt"] if len(servers) == 1 else None,
+        "recent_events": redis_result["recent_events"],
+        "servers": by_server,
+        "latency_ms": {"redis": redis_ms},
+        "timestamp": datetime.now().isoformat()
+    }
+
+_cache: Dict[str, Tuple[float, Dict]] = {}
+_inflight: Dict[str, asyncio.Task] = {}
+
+async def get_status(servers: List[str], max_age: float = STATUS_CACHE_TTL) -> Dict:
+    """
+    Cached status snapshot
+
+    Concurrent callers for the same servers share one in-flight collection
+    instead of each probing RCON.
+    """
+    key = ",".join(servers)
+    cached = _cache.get(key)
+    if cached and time.monotonic() - cached[0] < max_age:
+        return {**cached[1], "cached": True}
+
+    task = _inflight.get(key)
+    if task is None:
+        task = asyncio.create_task(collect_status(servers))
+        _inflight[key] = task
+        task.add_done_callback(lambda _: _inflight.pop(key, None))
+
+    snapshot = await asyncio.shield(task)
+    _cache[key] = (time.monotonic(), snapshot)
+    return {**snapshot, "cached": False}
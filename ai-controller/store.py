@@ -0,0 +1,71 @@
+"""
+REDIS STORE
+Shared Redis connection for the API and worker processes
+"""
+
+import os
+import time
+from typing import Optional
+
+import redis.asyncio as redis
+from redis.asyncio.client import Pipeline
+
+from metrics import REDIS_SECONDS
+from tracing import child_span
+
+# =============================================================================
+# CONFIGURATION
+# =============================================================================
+
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379")
+
+# =============================================================================
+# INSTRUMENTED CLIENT
+# =============================================================================
+
+class InstrumentedPipeline(Pipeline):
+    """Pipeline whose round trip is timed as a single `pipeline` command"""
+
+    async def execute(self, raise_on_error: bool = True):
+        start = time.perf_counter()
+        with child_span("redis PIPELINE", **{"db.system": "redis", "db.operation": "PIPELINE",
+                                             "db.redis.commands": len(self.command_stack)}):
+            try:
+                return await super().execute(raise_on_error)
+            finally:
+                REDIS_SECONDS.labels("PIPELINE").observe(time.perf_counter() - start)
+
+class InstrumentedRedis(redis.Redis):
+    """Redis client that records the latency of every command (and traces it)"""
+
+    async def execute_command(self, *args, **options):
+        command = str(args[0]).upper()
+        start = time.perf_counter()
+        with child_span(f"redis {command}", **{"db.system": "redis", "db.operation": command}):
+            try:
+                return await super().execute_command(*args, **options)
+            finally:
+                REDIS_SECONDS.labels(command).observe(time.perf_counter() - start)
+
+    def pipeline(self, transaction: bool = True, shard_hint: Optional[str] = None) -> Pipeline:
+        return InstrumentedPipeline(self.connection_pool, self.response_callbacks, transaction, shard_hint)
+
+# =============================================================================
+# CONNECTION
+# =============================================================================
+
+_client: Optional[redis.Redis] = None
+
+async def get_redis() -> redis.Redis:
+    """Get the process-wide Redis client (created on first use)"""
+    global _client
+    if _client is None:
+        _client = InstrumentedRedis.from_url(REDIS_URL, decode_responses=True)
+    return _client
+
+async def close_redis() -> None:
+    """Close the Redis client and its connection pool"""
+    global _client
+    if _client is not None:
+        await _client.close()
+        _client = None
@@ -0,0 +1,193 @@
+"""
+TICK MONITOR
+Samples each server's tick timing so chaos never causes a lag spike
+
+A background sampler runs `tick query` (1.20.3+) on every server each
+TICK_SAMPLE_INTERVAL seconds and keeps the last TICK_HISTORY samples per
+server in memory; status probes add their samples too. /status/ticks serves
+the history and chaos_server_mspt exports the latest value.
+
+Chaos playback checks the server first. While MSPT is over CHAOS_MSPT_LIMIT
+it waits (up to CHAOS_LAG_WAIT seconds) for the server to recover; if it
+doesn't, an event that spawns entities is swapped for one that doesn't, and
+playback drops `summon`s while the server lags: the command-by-command path
+skips them, the datapack path clears their scheduled steps. Servers without
+`tick query` report no samples and are never throttled; once a server has
+answered that it doesn't know the command it isn't asked again for
+TICK_UNSUPPORTED_TTL seconds, so chaos pays no extra round trip there.
+
+Processes without the sampler (queue workers) take a fresh sample on demand
+when the newest one is stale.
+"""
+
+import os
+import time
+import asyncio
+from collections import deque
+from dataclasses import dataclass
+from typing import Deque, Dict, List, Optional
+
+from servers import registry
+from minecraft import rcon_command
+from parsers import TickStatus, is_rcon_error, parse_tick_query
+from metrics import SERVER_MSPT
+from logs import get_logger
+
+log = get_logger(__name__)
+
+# =============================================================================
+# CONFIGURATION
+# =============================================================================
+
+TICK_SAMPLE_INTERVAL = float(os.getenv("TICK_SAMPLE_INTERVAL", 5))   # Seconds; 0 disables the sampler
+TICK_HISTORY = int(os.getenv("TICK_HISTORY", 120))                   # Samples kept per server
+CHAOS_MSPT_LIMIT = float(os.getenv("CHAOS_MSPT_LIMIT", 40))          # 50ms is a full tick
+CHAOS_LAG_WAIT = float(os.getenv("CHAOS_LAG_WAIT", 30))              # Seconds to wait for headroom
+TICK_UNSUPPORTED_TTL = float(os.getenv("TICK_UNSUPPORTED_TTL", 600))  # Seconds before re-probing old servers
+
+# =============================================================================
+# SAMPLES
+# =============================================================================
+
+@dataclass(frozen=True, slots=True)
+class TickSample:
+    at: float
+    state: str
+    mspt: float
+    tps: float
+    p95: Optional[float]
+
+    def as_dict(self) -> Dict:
+        return {
+            "at": round(self.at, 3),
+            "state": self.state,
+            "mspt": self.mspt,
+            "tps": round(self.tps, 1),
+            "p95": self.p95
+        }
+
+
+# Server name -> ring buffer of recent samples, oldest first
+_samples: Dict[str, Deque[TickSample]] = {}
+# Server name -> when it last answered `tick query` as an unknown command
+_unsupported: Dict[str, float] = {}
+
+def record(server: str, tick: TickStatus) -> TickSample:
+    """Add a parsed `tick query` to a server's history"""
+    _unsupported.pop(server, None)
+    sample = TickSample(time.time(), tick.state, tick.mspt, tick.tps, tick.p95)
+    _samples.setdefault(server, deque(maxlen=TICK_HISTORY)).append(sample)
+    SERVER_MSPT.labels(server).set(tick.mspt)
+    return sample
+
+def latest(server: str) -> Optional[TickSample]:
+    history = _samples.get(server)
+    return history[-1] if history else None
+
+def history(server: str) -> List[TickSample]:
+    return list(_samples.get(server, ()))
+
+def unsupported(server: str) -> bool:
+    """Whether the server recently showed it has no `tick query`"""
+    seen = _unsupported.get(server)
+    return seen is not None and time.time() - seen < TICK_UNSUPPORTED_TTL
+
+async def sample(server: str) -> Optional[TickSample]:
+    """Take one sample now (None if the server is down or too old for `tick query`)"""
+    output = await asyncio.to_thread(rcon_command, "tick query", server)
+    tick = parse_tick_query(output)
+    if tick:
+        return record(server, tick)
+    if not is_rcon_error(output):
+        # The server answered, so it is up but predates `tick query`
+        _unsupported[server] = time.time()
+    return None
+
+async def current(server: str, max_age: Optional[float] = None) -> Optional[TickSample]:
+    """The newest sample, re-sampling if it is older than max_age seconds"""
+    if unsupported(server):
+        return None
+    if max_age is None:
+        max_age = TICK_SAMPLE_INTERVAL * 2 or 10
+    newest = latest(server)
+    if newest and time.time() - newest.at <= max_age:
+        return newest
+    return await sample(server)
+
+# =============================================================================
+# THROTTLING
+# =============================================================================
+
+def overloaded(tick: Optional[TickSample], limit: float = CHAOS_MSPT_LIMIT) -> bool:
+    return tick is not None and tick.mspt > limit
+
+async def wait_for_headroom(server: str, max_wait: float = CHAOS_LAG_WAIT) -> Optional[TickSample]:
+    """
+    Wait until the server is under CHAOS_MSPT_LIMIT
+
+    Returns:
+        None once there is headroom (or no timing is available), otherwise
+        the last sample after max_wait seconds
+    """
+    deadline = time.monotonic() + max_wait
+    poll = min(max(TICK_SAMPLE_INTERVAL, 1), 5)
+    tick = await current(server)
+    while overloaded(tick):
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return tick
+        log.info("chaos_waiting_for_headroom", server=server, mspt=tick.mspt, limit=CHAOS_MSPT_LIMIT)
+        await asyncio.sleep(min(poll, remaining))
+        tick = await current(server, max_age=poll / 2)
+    return None
+
+def spawns_entities(command: str) -> bool:
+    """Whether a command summons something (`execute ... run summon` included)"""
+    return command.split(" run ")[-1].lstrip("/").startswith("summon ")
+
+def is_heavy(event: Dict) -> bool:
+    """Events that add entities cost server ticks; effects and items on players don't"""
+    return any(spawns_entities(command) for command in event["commands"])
+
+# =============================================================================
+# SAMPLER
+# =============================================================================
+
+class TickSampler:
+    """Samples every server on an interval until stopped"""
+
+    def __init__(self, interval: float = TICK_SAMPLE_INTERVAL):
+        self.interval = interval
+
+    async def run(self, stop: asyncio.Event) -> None:
+        log.info("tick_sampler_started", interval=self.interval, history=TICK_HISTORY)
+        while not stop.is_set():
+            names = [name for name in registry.names() if not unsupported(name)]
+            results = await asyncio.gather(*(sample(name) for name in names), return_exceptions=True)
+            for name, result in zip(names, results):
+                if isinstance(result, Exception):
+                    log.warning("tick_sample_failed", server=name, error=str(result))
+            try:
+                await asyncio.wait_for(stop.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+
+
+def get_ticks(servers: List[str], limit: int = TICK_HISTORY) -> Dict:
+    """Recent samples per server for the API"""
+    by_server = {}
+    for name in servers:
+        samples = history(name)[-limit:]
+        mspts = [s.mspt for s in samples]
+        by_server[name] = {
+            "latest": samples[-1].as_dict() if samples else None,
+            "avg_mspt": round(sum(mspts) / len(mspts), 2) if mspts else None,
+            "max_mspt": max(mspts) if mspts else None,
+            "throttled": overloaded(samples[-1]) if samples else False,
+            "samples": [s.as_dict() for s in samples]
+        }
+    return {
+        "interval": TICK_SAMPLE_INTERVAL,
+        "mspt_limit": CHAOS_MSPT_LIMIT,
+        "servers": by_server
+    }
@@ -0,0 +1,112 @@
+"""
+TRACING
+OpenTelemetry spans for requests, jobs, RCON, Redis and LLM calls
+
+Trace context arrives in W3C `traceparent` headers (the Discord bot sends
+them), rides along with queued jobs, and is exported either to an OTLP
+collector or to a JSON-lines file for offline analysis. With
+TRACE_EXPORTER=none (the default) spans are created but never exported.
+"""
+
+import os
+from contextlib import contextmanager
+from typing import Dict, Iterator, Mapping, Optional
+
+from opentelemetry import context, propagate, trace
+from opentelemetry.sdk.resources import Resource
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter, SpanExporter
+from opentelemetry.trace import Span, SpanKind, Status, StatusCode
+
+# =============================================================================
+# CONFIGURATION
+# =============================================================================
+
+TRACE_EXPORTER = os.getenv("TRACE_EXPORTER", "none")  # none | otlp | file
+TRACE_FILE = os.getenv("TRACE_FILE", "traces.jsonl")
+# The OTLP endpoint comes from the standard OTEL_EXPORTER_OTLP_ENDPOINT
+# (default http://localhost:4318); sampling from OTEL_TRACES_SAMPLER
+
+tracer = trace.get_tracer("chaos-controller")
+
+# =============================================================================
+# SETUP
+# =============================================================================
+
+def _exporter() -> Optional[SpanExporter]:
+    if TRACE_EXPORTER == "otlp":
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        return OTLPSpanExporter()
+    if TRACE_EXPORTER == "file":
+        out = open(TRACE_FILE, "a", encoding="utf-8")
+        return ConsoleSpanExporter(out=out, formatter=lambda span: span.to_json(indent=None) + "\n")
+    return None
+
+def init_tracing(service_name: str) -> None:
+    """Install the process-wide tracer provider; call once at startup"""
+    provider = TracerProvider(resource=Resource.create({
+        "service.name": os.getenv("OTEL_SERVICE_NAME", service_name)
+    }))
+    exporter = _exporter()
+    if exporter is not None:
+        provider.add_span_processor(BatchSpanProcessor(exporter))
+    trace.set_tracer_provider(provider)
+
+def shutdown_tracing() -> None:
+    """Flush buffered spans"""
+    provider = trace.get_tracer_provider()
+    if isinstance(provider, TracerProvider):
+        provider.shutdown()
+
+# =============================================================================
+# SPANS
+# =============================================================================
+
+@contextmanager
+def span(
+    name: str,
+    kind: SpanKind = SpanKind.INTERNAL,
+    parent: Optional[context.Context] = None,
+    **attributes
+) -> Iterator[Span]:
+    """
+    Run a block inside a span
+
+    Exceptions are recorded and mark the span as an error; attributes
+    with a None value are skipped.
+    """
+    attrs = {k: v for k, v in attributes.items() if v is not None}
+    with tracer.start_as_current_span(name, context=parent, kind=kind, attributes=attrs) as current:
+        yield current
+
+@contextmanager
+def child_span(name: str, kind: SpanKind = SpanKind.CLIENT, **attributes) -> Iterator[Span]:
+    """
+    Like span(), but only inside an existing trace
+
+    Used for RCON and Redis calls so background loops (health checks, the
+    worker's stream polling) don't each start a trace of their own.
+    """
+    if not trace.get_current_span().get_span_context().is_valid:
+        yield trace.INVALID_SPAN
+        return
+    with span(name, kind, **attributes) as current:
+        yield current
+
+def mark_error(current: Span, description: str) -> None:
+    """Flag a span whose failure was handled rather than raised"""
+    current.set_status(Status(StatusCode.ERROR, description))
+
+# =============================================================================
+# PROPAGATION
+# =============================================================================
+
+def inject_context() -> Dict[str, str]:
+    """The current trace context as headers (e.g. for a queued job)"""
+    carrier: Dict[str, str] = {}
+    propagate.inject(carrier)
+    return carrier
+
+def extract_context(carrier: Mapping[str, str]) -> context.Context:
+    """Trace context from incoming headers"""
+    return propagate.extract(carrier)
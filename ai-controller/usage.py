@@ -0,0 +1,302 @@
+"""
+LLM USAGE
+Token accounting per player, persona and day, and the budgets it enforces
+
+Every completion is recorded in one Redis pipeline: input/output tokens and
+call counts per player and per persona (hashes), running totals in per-day
+sorted sets (so the top spenders come back in one read), and the reply
+itself under its persona and prompt, for reuse once a budget runs out.
+Keys expire after USAGE_RETENTION_DAYS.
+
+Budgets are daily token limits, for each player and each persona:
+- over the soft limit, the persona answers with its provider's budget model
+  from BUDGET_MODELS. Without an entry it falls back to the provider's
+  default model, which the shipped personas already use, so the soft limit
+  changes nothing until BUDGET_MODELS names a cheaper model (or a persona
+  picks a pricier one);
+- over the hard limit, no LLM call is made: the last reply to the same
+  prompt is reused if there is one, otherwise the persona declines.
+
+System-initiated calls, such as debates, have no player to bill: they count
+towards the persona and the day but no player's budget.
+
+The budget check runs before every completion, so it never touches Redis:
+it reads the totals this process last saw, which every recorded call
+refreshes from the counters it increments (covering other replicas' calls
+too). Totals not seen for USAGE_SYNC_INTERVAL seconds are re-read in the
+background with one ZSCORE.
+"""
+
+import os
+import time
+import hashlib
+import asyncio
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Set, Tuple
+
+from store import get_redis
+from metrics import LLM_BUDGET_ACTIONS
+from logs import get_logger
+
+log = get_logger(__name__)
+
+# =============================================================================
+# CONFIGURATION
+# =============================================================================
+
+# Daily token limits (input + output); 0 disables a limit
+PLAYER_TOKENS_SOFT = int(os.getenv("PLAYER_TOKENS_SOFT", 20000))
+PLAYER_TOKENS_HARD = int(os.getenv("PLAYER_TOKENS_HARD", 50000))
+PERSONA_TOKENS_SOFT = int(os.getenv("PERSONA_TOKENS_SOFT", 0))
+PERSONA_TOKENS_HARD = int(os.getenv("PERSONA_TOKENS_HARD", 0))
+
+# Model used over the soft limit, per provider: "claude=...,gpt=..."
+BUDGET_MODELS = os.getenv("BUDGET_MODELS", "")
+
+USAGE_RETENTION_DAYS = int(os.getenv("USAGE_RETENTION_DAYS", 35))
+USAGE_SYNC_INTERVAL = float(os.getenv("USAGE_SYNC_INTERVAL", 30))   # Seconds before a total is re-read
+REPLY_CACHE_TTL = int(os.getenv("REPLY_CACHE_TTL", 86400))          # Seconds a reply can be reused
+
+BUDGET_REPLY = "*yawns* I have said enough for today. Ask me again tomorrow."
+
+# =============================================================================
+# KEYS
+# =============================================================================
+
+def today() -> str:
+    return datetime.now(timezone.utc).strftime("%Y-%m-%d")
+
+def usage_key(day: str, kind: str, name: Optional[str] = None) -> str:
+    """
+    Redis key for one day's usage
+
+    Args:
+        day: YYYY-MM-DD (UTC)
+        kind: "player" or "persona" (or "total" for the day's totals)
+        name: Player or persona; None for the per-day ranking of that kind
+    """
+    if kind == "total":
+        return f"usage:{day}:total"
+    return f"usage:{day}:{kind}:{name.lower()}" if name else f"usage:{day}:{kind}s"
+
+def reply_key(persona: str, prompt: str) -> str:
+    digest = hashlib.sha1(" ".join(prompt.lower().split()).encode()).hexdigest()
+    return f"reply:{persona}:{digest}"
+
+# =============================================================================
+# BUDGETS
+# =============================================================================
+
+def parse_models(spec: str) -> Dict[str, str]:
+    models = {}
+    for entry in spec.split(","):
+        provider, _, model = entry.partition("=")
+        if provider.strip() and model.strip():
+            models[provider.strip()] = model.strip()
+    return models
+
+
+BUDGET_MODEL_BY_PROVIDER = parse_models(BUDGET_MODELS)
+
+LIMITS = {
+    "player": (PLAYER_TOKENS_SOFT, PLAYER_TOKENS_HARD),
+    "persona": (PERSONA_TOKENS_SOFT, PERSONA_TOKENS_HARD),
+}
+
+# (kind, lowercased name) -> (day, tokens, when read)
+_spent: Dict[Tuple[str, str], Tuple[str, int, float]] = {}
+_syncing: Set[Tuple[str, str]] = set()
+
+def spent(kind: str, name: str) -> int:
+    """Tokens used today as last seen by this process (no I/O)"""
+    key = (kind, name.lower())
+    entry = _spent.get(key)
+    day = today()
+    if entry is None or entry[0] != day or time.time() - entry[2] > USAGE_SYNC_INTERVAL:
+        _schedule_sync(key, day)
+    return entry[1] if entry and entry[0] == day else 0
+
+def _schedule_sync(key: Tuple[str, str], day: str) -> None:
+    if key in _syncing:
+        return
+    try:
+        asyncio.get_running_loop().create_task(_sync(key, day))
+    except RuntimeError:
+        return  # No loop (called from a thread); the next recorded call refreshes it
+    _syncing.add(key)
+
+async def _sync(key: Tuple[str, str], day: str) -> None:
+    kind, name = key
+    try:
+        r = await get_redis()
+        tokens = await r.zscore(usage_key(day, kind), name)
+        _spent[key] = (day, int(tokens or 0), time.time())
+    except Exception as e:
+        log.warning("usage_sync_failed", kind=kind, name=name, error=str(e))
+    finally:
+        _syncing.discard(key)
+
+def _billed(player: Optional[str], persona: str) -> List[Tuple[str, str]]:
+    """(kind, name) pairs a call counts against; system calls have no player"""
+    return ([("player", player)] if player else []) + [("persona", persona)]
+
+def budget_state(player: Optional[str], persona: str) -> str:
+    """
+    Where a request stands against today's budgets
+
+    Args:
+        player: Player paying for the call, or None for a system call
+        persona: Persona key
+
+    Returns:
+        "ok", "soft" (use the budget model) or "hard" (no LLM call)
+    """
+    state = "ok"
+    for kind, name in _billed(player, persona):
+        soft, hard = LIMITS[kind]
+        if not soft and not hard:
+            continue
+        tokens = spent(kind, name)
+        if hard and tokens >= hard:
+            return "hard"
+        if soft and tokens >= soft:
+            state = "soft"
+    return state
+
+def budget_model(provider: str, default: str) -> str:
+    """Model a provider's personas use over the soft limit"""
+    return BUDGET_MODEL_BY_PROVIDER.get(provider, default)
+
+async def cached_reply(persona: str, prompt: str) -> Optional[str]:
+    """The last reply a persona gave to the same prompt, if still kept"""
+    try:
+        r = await get_redis()
+        return await r.get(reply_key(persona, prompt))
+    except Exception as e:
+        log.warning("reply_cache_unavailable", persona=persona, error=str(e))
+        return None
+
+async def over_budget_reply(persona: str, prompt: str) -> str:
+    """Reply given without an LLM call once a hard limit is reached"""
+    reply = await cached_reply(persona, prompt)
+    LLM_BUDGET_ACTIONS.labels(persona, "cached" if reply else "declined").inc()
+    return reply or BUDGET_REPLY
+
+# =============================================================================
+# RECORDING
+# =============================================================================
+
+async def record_usage(
+    provider: str,
+    model: str,
+    persona: str,
+    player: Optional[str],
+    prompt: str,
+    reply: str,
+    input_tokens: int,
+    output_tokens: int,
+    seconds: float
+) -> None:
+    """
+    Count one completion against its player, persona and day, and keep the reply
+
+    Args:
+        provider: Provider name
+        model: Model actually used
+        persona: Persona key
+        player: Player charged for the call (None for a system call)
+        prompt: What the player said (the reply cache key)
+        reply: Text returned to the player
+        input_tokens, output_tokens: Usage reported by the provider
+        seconds: Completion latency
+    """
+    tokens = (input_tokens or 0) + (output_tokens or 0)
+    log.info("llm_usage", provider=provider, model=model, persona=persona, player=player,
+             input_tokens=input_tokens, output_tokens=output_tokens, seconds=round(seconds, 3))
+    day = today()
+    ttl = USAGE_RETENTION_DAYS * 86400
+    billed = _billed(player, persona)
+    try:
+        r = await get_redis()
+        async with r.pipeline(transaction=False) as pipe:
+            for kind, name in billed:
+                pipe.zincrby(usage_key(day, kind), tokens, name.lower())
+                key = usage_key(day, kind, name)
+                pipe.hincrby(key, "input", input_tokens or 0)
+                pipe.hincrby(key, "output", output_tokens or 0)
+                pipe.hincrby(key, "calls", 1)
+                pipe.expire(key, ttl)
+                pipe.expire(usage_key(day, kind), ttl)
+            total = usage_key(day, "total")
+            pipe.hincrby(total, "input", input_tokens or 0)
+            pipe.hincrby(total, "output", output_tokens or 0)
+            pipe.hincrby(total, "calls", 1)
+            pipe.hincrby(total, f"provider:{provider}", tokens)
+            pipe.expire(total, ttl)
+            pipe.set(reply_key(persona, prompt), reply, ex=REPLY_CACHE_TTL)
+            results = await pipe.execute()
+    except Exception as e:
+        log.warning("usage_record_failed", persona=persona, player=player, error=str(e))
+        return
+
+    # ZINCRBY returns the new totals, including other replicas' calls
+    now = time.time()
+    for i, (kind, name) in enumerate(billed):
+        _spent[(kind, name.lower())] = (day, int(results[i * 6]), now)
+
+# =============================================================================
+# REPORTING
+# =============================================================================
+
+def _totals(entry: Dict[str, str]) -> Dict[str, int]:
+    input_tokens, output_tokens = int(entry.get("input", 0)), int(entry.get("output", 0))
+    return {
+        "input": input_tokens,
+        "output": output_tokens,
+        "tokens": input_tokens + output_tokens,
+        "calls": int(entry.get("calls", 0))
+    }
+
+async def get_usage(
+    day: Optional[str] = None,
+    player: Optional[str] = None,
+    persona: Optional[str] = None,
+    limit: int = 20
+) -> Dict:
+    """
+    One day's usage for the API
+
+    Args:
+        day: YYYY-MM-DD (UTC), default today
+        player: Only this player (instead of the top spenders)
+        persona: Only this persona
+        limit: Top players listed
+    """
+    day = day or today()
+    r = await get_redis()
+    async with r.pipeline(transaction=False) as pipe:
+        pipe.hgetall(usage_key(day, "total"))
+        pipe.zrevrange(usage_key(day, "player"), 0, limit - 1)
+        pipe.zrevrange(usage_key(day, "persona"), 0, -1)
+        total, players, personas = await pipe.execute()
+
+    players = [player.lower()] if player else players
+    personas = [persona.lower()] if persona else personas
+    async with r.pipeline(transaction=False) as pipe:
+        for name in players:
+            pipe.hgetall(usage_key(day, "player", name))
+        for name in personas:
+            pipe.hgetall(usage_key(day, "persona", name))
+        entries = await pipe.execute()
+
+    providers = {k.split(":", 1)[1]: int(v) for k, v in total.items() if k.startswith("provider:")}
+    return {
+        "day": day,
+        "total": {**_totals(total), "providers": providers},
+        "players": {name: _totals(entry) for name, entry in zip(players, entries)},
+        "personas": {name: _totals(entry) for name, entry in zip(personas, entries[len(players):])},
+        "budgets": {
+            **{kind: {"soft": soft, "hard": hard} for kind, (soft, hard) in LIMITS.items()},
+            "models": BUDGET_MODEL_BY_PROVIDER
+        }
+    }
@@ -0,0 +1,53 @@
+"""
+CHAOS WORKER
+Claims queued jobs from Redis and plays them on the Minecraft servers
+
+Run alongside API replicas started with EXECUTION_MODE=queue:
+    python worker.py
+"""
+
+import os
+import asyncio
+import signal
+
+from prometheus_client import start_http_server
+
+from bus import bus
+from jobs import run_worker
+from minecraft import close_pools
+from providers import providers
+from store import close_redis
+from logs import get_logger
+from tracing import init_tracing, shutdown_tracing
+
+log = get_logger(__name__)
+
+# Workers have no API, so metrics get their own port (0 = disabled)
+WORKER_METRICS_PORT = int(os.getenv("WORKER_METRICS_PORT", 0))
+
+
+async def main():
+    init_tracing("chaos-worker")
+    if WORKER_METRICS_PORT:
+        start_http_server(WORKER_METRICS_PORT)
+    await providers.preload()
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    # Chaos progress and debate replies reach /stream clients via Redis
+    relay = asyncio.create_task(bus.run_relay(receive=False))
+    try:
+        await run_worker(stop=stop)
+    finally:
+        relay.cancel()
+        await close_redis()
+        close_pools()
+        shutdown_tracing()
+        log.info("worker_stopped")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
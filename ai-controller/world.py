@@ -0,0 +1,329 @@
+"""
+WORLD STATE
+Cached time, weather, difficulty and seed per server
+
+Reads come from memory. The cache is filled by one batched query per server
+(`time query daytime`, `difficulty` and two weather predicates, since
+vanilla has no `weather query`), refreshed every WORLD_STATE_REFRESH
+seconds, and updated by every state-changing helper here, so it stays
+current between refreshes. The seed never changes and is read once.
+
+Chaos events use it to skip commands that would change nothing (`weather
+thunder` during a storm) and to put the world back afterwards: a weather
+change is undone when its duration ends, a time or difficulty change after
+WORLD_RESTORE_AFTER seconds, unless something else changed it meanwhile.
+Pending restores are kept in memory and don't survive a restart.
+
+Weather predicates are inline (1.20.5+); older servers report weather as
+unknown and are never skipped.
+"""
+
+import os
+import re
+import time
+import asyncio
+import threading
+from dataclasses import dataclass, replace
+from typing import Dict, List, Optional, Set, Tuple
+
+from minecraft import rcon_batch, rcon_command, current_server
+from servers import registry
+from parsers import Seed, parse_difficulty, parse_seed, parse_test, parse_time
+from logs import get_logger
+
+log = get_logger(__name__)
+
+# =============================================================================
+# CONFIGURATION
+# =============================================================================
+
+WORLD_STATE_REFRESH = float(os.getenv("WORLD_STATE_REFRESH", 60))   # Seconds; 0 disables the refresher
+WORLD_RESTORE_AFTER = float(os.getenv("WORLD_RESTORE_AFTER", 300))  # Seconds before undoing time/difficulty
+
+RAIN_CHECK = 'execute if predicate {condition:"minecraft:weather_check",raining:true}'
+THUNDER_CHECK = 'execute if predicate {condition:"minecraft:weather_check",thundering:true}'
+WORLD_QUERIES = ["time query daytime", "difficulty", RAIN_CHECK, THUNDER_CHECK]
+
+# Ticks of slack when telling a running clock from a manual `time set`
+TIME_SET_MARGIN = 100
+
+# `time set` keywords
+TIME_NAMES = {"day": 1000, "noon": 6000, "night": 13000, "midnight": 18000}
+
+# =============================================================================
+# CACHE
+# =============================================================================
+
+@dataclass(frozen=True, slots=True)
+class WorldState:
+    daytime: Optional[int] = None      # As of daytime_at
+    weather: Optional[str] = None      # clear | rain | thunder
+    difficulty: Optional[str] = None
+    seed: Optional[int] = None
+    at: float = 0.0                    # Last full query
+    daytime_at: float = 0.0
+
+    def clock(self) -> Optional[int]:
+        """Estimated daytime now (assumes the daylight cycle is running)"""
+        if self.daytime is None:
+            return None
+        return (self.daytime + round((time.time() - self.daytime_at) * 20)) % 24000
+
+
+def parse_weather(raining: Optional[bool], thundering: Optional[bool]) -> Optional[str]:
+    if raining is None or thundering is None:
+        return None
+    if thundering:
+        return "thunder"
+    return "rain" if raining else "clear"
+
+
+class WorldCache:
+    """Per-server world state; helpers update it from worker threads"""
+
+    def __init__(self):
+        self.states: Dict[str, WorldState] = {}
+        self.lock = threading.Lock()
+
+    def get(self, server: str) -> Optional[WorldState]:
+        return self.states.get(server)
+
+    def record(self, server: str, **fields) -> None:
+        """Apply a known change without querying the server"""
+        with self.lock:
+            self.states[server] = replace(self.states.get(server, WorldState()), **fields)
+
+    def refresh(self, server: str) -> Optional[WorldState]:
+        """Query the server (blocking); None if it didn't answer"""
+        cached = self.states.get(server)
+        queries = WORLD_QUERIES if cached and cached.seed is not None else WORLD_QUERIES + ["seed"]
+        outputs = rcon_batch(queries, server)
+        daytime = parse_time(outputs[0])
+        if daytime is None and outputs[0].startswith("RCON Error"):
+            return None
+        seed = parse_seed(outputs[4]) if len(outputs) > 4 else None
+        with self.lock:
+            now = time.time()
+            state = WorldState(
+                daytime=daytime,
+                weather=parse_weather(parse_test(outputs[2]), parse_test(outputs[3])),
+                difficulty=parse_difficulty(outputs[1]),
+                seed=seed.value if seed else (cached.seed if cached else None),
+                at=now,
+                daytime_at=now
+            )
+            self.states[server] = state
+        return state
+
+    def current(self, server: str, max_age: float = 0) -> Optional[WorldState]:
+        """Cached state, re-queried if older than max_age (default WORLD_STATE_REFRESH)"""
+        cached = self.states.get(server)
+        if cached and cached.at and time.time() - cached.at < (max_age or WORLD_STATE_REFRESH or 60):
+            return cached
+        return self.refresh(server) or cached
+
+
+world = WorldCache()
+
+def _server(server: Optional[str]) -> str:
+    return server or current_server.get() or registry.default
+
+# =============================================================================
+# HELPERS
+# =============================================================================
+
+def set_time(time_value: str, server: Optional[str] = None) -> str:
+    """
+    Set world time
+
+    Args:
+        time_value: Time value (day, night, noon, midnight, or ticks)
+        server: Target server (defaults to the context server)
+    """
+    name = _server(server)
+    result = rcon_command(f"time set {time_value}", name)
+    if not result.startswith("RCON Error"):
+        ticks = TIME_NAMES.get(time_value, int(time_value) if time_value.isdigit() else None)
+        world.record(name, daytime=ticks, daytime_at=time.time())
+    return result
+
+def set_weather(weather: str, duration: int = 300, server: Optional[str] = None, force: bool = False) -> str:
+    """
+    Set weather, unless it is already that weather
+
+    Args:
+        weather: Weather type (clear, rain, thunder)
+        duration: Duration in seconds
+        server: Target server (defaults to the context server)
+        force: Send the command even if the cache says nothing would change
+    """
+    name = _server(server)
+    if not force and (world.current(name) or WorldState()).weather == weather:
+        return f"Weather is already {weather}"
+    result = rcon_command(f"weather {weather} {duration}", name)
+    if not result.startswith("RCON Error"):
+        world.record(name, weather=weather)
+    return result
+
+def set_difficulty(difficulty: str, server: Optional[str] = None) -> str:
+    """
+    Set difficulty
+
+    Args:
+        difficulty: peaceful, easy, normal or hard
+        server: Target server (defaults to the context server)
+    """
+    name = _server(server)
+    result = rcon_command(f"difficulty {difficulty}", name)
+    if not result.startswith("RCON Error"):
+        world.record(name, difficulty=difficulty)
+    return result
+
+def get_seed(server: Optional[str] = None) -> Optional[Seed]:
+    """Get world seed (queried once per server)"""
+    name = _server(server)
+    cached = world.get(name)
+    if cached and cached.seed is not None:
+        return Seed(cached.seed)
+    seed = parse_seed(rcon_command("seed", name))
+    if seed:
+        world.record(name, seed=seed.value)
+    return seed
+
+def get_world_state(server: Optional[str] = None, max_age: float = 0) -> Dict:
+    """World state for the API, from memory unless older than max_age"""
+    state = world.current(_server(server), max_age) or WorldState()
+    return {
+        "daytime": state.clock(),
+        "weather": state.weather,
+        "difficulty": state.difficulty,
+        "seed": state.seed,
+        "age": round(time.time() - state.at, 1) if state.at else None
+    }
+
+# =============================================================================
+# CHAOS EVENTS
+# =============================================================================
+
+WORLD_COMMAND_RE = re.compile(
+    r"^(?:weather (?P<weather>clear|rain|thunder)(?: (?P<duration>\d+))?"
+    r"|time set (?P<time>day|noon|night|midnight|\d+)"
+    r"|difficulty (?P<difficulty>peaceful|easy|normal|hard))$"
+)
+
+def command_effect(command: str) -> Optional[Tuple[str, str, float]]:
+    """
+    What a world-changing command sets, and for how long
+
+    Returns:
+        (field, value, seconds until it should be undone), or None for
+        commands that don't change tracked world state
+    """
+    match = WORLD_COMMAND_RE.match(command.strip().lstrip("/"))
+    if not match:
+        return None
+    if match.group("weather"):
+        duration = match.group("duration")
+        return "weather", match.group("weather"), float(duration) if duration else WORLD_RESTORE_AFTER
+    if match.group("time"):
+        value = match.group("time")
+        return "daytime", str(TIME_NAMES.get(value, value)), WORLD_RESTORE_AFTER
+    return "difficulty", match.group("difficulty"), WORLD_RESTORE_AFTER
+
+def redundant(command: str, server: str) -> bool:
+    """Whether a world command would leave the world as it is (weather/difficulty only;
+    time keeps moving)"""
+    effect = command_effect(command)
+    if effect is None or effect[0] == "daytime":
+        return False
+    state = world.current(server)
+    return state is not None and getattr(state, effect[0]) == effect[1]
+
+def restore_command(field: str, value) -> str:
+    if field == "weather":
+        return f"weather {value}"
+    if field == "daytime":
+        return f"time set {value}"
+    return f"difficulty {value}"
+
+
+class Restorer:
+    """Undoes an event's world changes once they have run their course"""
+
+    def __init__(self):
+        self.pending: Set[asyncio.Task] = set()
+
+    def after_event(self, commands: List[str], server: str, prior: Optional[WorldState]) -> None:
+        """Schedule restores for the world changes an event just made"""
+        if prior is None:
+            return
+        for command in commands:
+            effect = command_effect(command)
+            if effect is None:
+                continue
+            field, value, after = effect
+            before = prior.clock() if field == "daytime" else getattr(prior, field)
+            if before is None or str(before) == value:
+                continue
+            if field == "daytime":
+                world.record(server, daytime=int(value), daytime_at=time.time())
+            else:
+                world.record(server, **{field: value})
+            task = asyncio.create_task(self._restore(server, field, value, before, after))
+            self.pending.add(task)
+            task.add_done_callback(self.pending.discard)
+
+    async def _restore(self, server: str, field: str, value: str, before, after: float) -> None:
+        started = time.time()
+        # Weather is put back just before its duration runs out
+        await asyncio.sleep(max(after - 1, 0) if field == "weather" else after)
+        # Leave it alone if someone else changed it in the meantime
+        state = await asyncio.to_thread(world.refresh, server)
+        if state is None or getattr(state, field) is None:
+            return
+        if field == "daytime":
+            # The clock can only have run forward from what the event set, and
+            # no faster than 20 ticks a second; anything else is a `time set`
+            advanced = (state.daytime - int(value)) % 24000
+            if advanced > (time.time() - started) * 20 + TIME_SET_MARGIN:
+                return
+            # Where the clock would be had the event not moved it
+            before = (before + advanced) % 24000
+        elif getattr(state, field) != value:
+            return
+        log.info("world_restored", server=server, field=field, value=before)
+        await asyncio.to_thread(rcon_command, restore_command(field, before), server)
+        if field == "daytime":
+            world.record(server, daytime=before, daytime_at=time.time())
+        else:
+            world.record(server, **{field: before})
+
+    def cancel(self) -> None:
+        for task in list(self.pending):
+            task.cancel()
+
+
+restorer = Restorer()
+
+# =============================================================================
+# REFRESHER
+# =============================================================================
+
+class WorldRefresher:
+    """Re-queries every server's world state on an interval until stopped"""
+
+    def __init__(self, interval: float = WORLD_STATE_REFRESH):
+        self.interval = interval
+
+    async def run(self, stop: asyncio.Event) -> None:
+        log.info("world_refresher_started", interval=self.interval)
+        while not stop.is_set():
+            for name in registry.names():
+                try:
+                    await asyncio.to_thread(world.refresh, name)
+                except Exception as e:
+                    log.warning("world_refresh_failed", server=name, error=str(e))
+            try:
+                await asyncio.wait_for(stop.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
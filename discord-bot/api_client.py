@@ -0,0 +1,195 @@
+"""
+CHAOS API CLIENT
+Long-lived, pooled HTTP client for the AI controller
+"""
+
+import asyncio
+import random
+from typing import Dict, Optional
+
+import aiohttp
+from opentelemetry import propagate
+from opentelemetry.trace import SpanKind, Status, StatusCode
+
+from tracing import tracer
+
+# =============================================================================
+# CONFIGURATION
+# =============================================================================
+
+# Seconds per request, matched by longest endpoint prefix
+ENDPOINT_TIMEOUTS = {
+    "/health": 5,
+    "/status": 10,
+    "/players": 10,
+    "/ai/chat": 30,
+    "/ai/debate": 90,
+    "/quest/generate": 45,
+    "/chaos/trigger": 30,
+}
+DEFAULT_TIMEOUT = 15
+
+# Responses worth retrying (the request never reached a healthy controller)
+RETRY_STATUSES = {429, 502, 503, 504}
+
+# Don't keep a Discord interaction waiting longer than this between attempts
+MAX_RETRY_DELAY = 5
+
+# Methods safe to repeat after the request may have been processed
+IDEMPOTENT_METHODS = {"GET", "HEAD", "DELETE"}
+
+
+def timeout_for(endpoint: str) -> float:
+    """Pick the timeout for an endpoint by longest matching prefix"""
+    path = endpoint.split("?", 1)[0]
+    best = None
+    for prefix in ENDPOINT_TIMEOUTS:
+        if path.startswith(prefix) and (best is None or len(prefix) > len(best)):
+            best = prefix
+    return ENDPOINT_TIMEOUTS[best] if best else DEFAULT_TIMEOUT
+
+# =============================================================================
+# CLIENT
+# =============================================================================
+
+class ChaosAPIClient:
+    """
+    Keep-alive client for the controller API
+
+    One aiohttp session (and its connection pool) lives for the lifetime of
+    the bot, so calls reuse warm TCP connections instead of opening one each.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        pool_size: int = 20,
+        retries: int = 2,
+        backoff: float = 0.5
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.pool_size = pool_size
+        self.retries = retries
+        self.backoff = backoff
+        self.session: Optional[aiohttp.ClientSession] = None
+
+    async def start(self) -> None:
+        """Create the session; call from the bot's setup hook"""
+        if self.session is None or self.session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.pool_size,
+                keepalive_timeout=60,
+                ttl_dns_cache=300
+            )
+            self.session = aiohttp.ClientSession(connector=connector)
+
+    async def close(self) -> None:
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    def _delay(self, attempt: int, retry_after: Optional[str] = None) -> float:
+        """Exponential backoff with full jitter, honouring Retry-After"""
+        if retry_after:
+            try:
+                return float(retry_after)
+            except ValueError:
+                pass
+        return random.uniform(0, self.backoff * (2 ** attempt))
+
+    @staticmethod
+    async def _error(resp: aiohttp.ClientResponse) -> Dict:
+        """Turn an error response into {"error": ..., "status": ...}"""
+        detail = f"HTTP {resp.status}"
+        try:
+            body = await resp.json(content_type=None)
+            if isinstance(body, dict) and body.get("detail"):
+                detail = f"{detail}: {body['detail']}"
+        except (aiohttp.ContentTypeError, ValueError):
+            pass
+        return {"error": detail, "status": resp.status}
+
+    async def request(
+        self,
+        endpoint: str,
+        method: str = "GET",
+        data: Optional[Dict] = None,
+        params: Optional[Dict] = None,
+        timeout: Optional[float] = None
+    ) -> Dict:
+        """
+        Call the controller API
+
+        Args:
+            endpoint: Path such as /ai/chat
+            method: GET, POST or DELETE
+            data: JSON body
+            params: Query parameters (URL-encoded for you)
+            timeout: Override the per-endpoint timeout
+
+        Returns:
+            Parsed JSON on 2xx, otherwise {"error": ..., "status": ...}
+        """
+        if self.session is None:
+            await self.start()
+
+        method = method.upper()
+        path = endpoint.split("?", 1)[0]
+        with tracer.start_as_current_span(
+            f"{method} {path}", kind=SpanKind.CLIENT,
+            attributes={"http.request.method": method, "url.path": path}
+        ) as span:
+            result = await self._request(method, endpoint, data, params, timeout)
+            if "error" in result:
+                span.set_status(Status(StatusCode.ERROR, result["error"]))
+                if "status" in result:
+                    span.set_attribute("http.response.status_code", result["status"])
+            return result
+
+    async def _request(
+        self,
+        method: str,
+        endpoint: str,
+        data: Optional[Dict],
+        params: Optional[Dict],
+        timeout: Optional[float]
+    ) -> Dict:
+        """Attempt loop behind request(); runs inside its client span"""
+        url = f"{self.base_url}{endpoint}"
+        client_timeout = aiohttp.ClientTimeout(total=timeout or timeout_for(endpoint))
+        if params:
+            params = {k: v for k, v in params.items() if v is not None}
+
+        # traceparent lets the controller continue this trace
+        headers: Dict[str, str] = {}
+        propagate.inject(headers)
+
+        result: Dict = {"error": "Request failed"}
+        for attempt in range(self.retries + 1):
+            last = attempt == self.retries
+            try:
+                async with self.session.request(
+                    method, url, json=data, params=params, headers=headers, timeout=client_timeout
+                ) as resp:
+                    if 200 <= resp.status < 300:
+                        return await resp.json(content_type=None)
+                    result = await self._error(resp)
+                    retryable = resp.status in RETRY_STATUSES and (
+                        method in IDEMPOTENT_METHODS or resp.status == 429
+                    )
+                    delay = self._delay(attempt, resp.headers.get("Retry-After"))
+                    if last or not retryable or delay > MAX_RETRY_DELAY:
+                        return result
+                    await asyncio.sleep(delay)
+            except aiohttp.ClientConnectorError as e:
+                # Connection never established, so any method is safe to retry
+                result = {"error": f"Controller unreachable: {e}"}
+                if last:
+                    return result
+                await asyncio.sleep(self._delay(attempt))
+            except (asyncio.TimeoutError, aiohttp.ClientError) as e:
+                result = {"error": "Request timeout" if isinstance(e, asyncio.TimeoutError) else str(e)}
+                if last or method not in IDEMPOTENT_METHODS:
+                    return result
+                await asyncio.sleep(self._delay(attempt))
+        return result
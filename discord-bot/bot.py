@@ -4,48 +4,69 @@ Control your Minecraft server and interact with AI characters from Discord
 """
 
 import os
+import asyncio
 import discord
 from discord import app_commands
-from discord.ext import commands, tasks
-import aiohttp
-import asyncio
+from discord.ext import commands
 from datetime import datetime
 
+from api_client import ChaosAPIClient
+from notifications import NotificationSubscriber
+from tracing import init_tracing, shutdown_tracing
+
 # Configuration
 DISCORD_TOKEN = os.getenv("DISCORD_TOKEN")
 CHAOS_API_URL = os.getenv("CHAOS_API_URL", "http://ai-controller:3000")
 GUILD_ID = os.getenv("DISCORD_GUILD_ID")
 STATUS_CHANNEL_ID = os.getenv("STATUS_CHANNEL_ID")
+REDIS_URL = os.getenv("REDIS_URL", "redis://redis:6379")
+NOTIFY_CHANNEL = os.getenv("NOTIFY_CHANNEL", "chaos:notify")
+
+CHAOS_API_POOL_SIZE = int(os.getenv("CHAOS_API_POOL_SIZE", 20))
+
+
+class ChaosBot(commands.Bot):
+    """Bot that owns one pooled API client and one alert subscription"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.api = ChaosAPIClient(CHAOS_API_URL, pool_size=CHAOS_API_POOL_SIZE)
+        self.notifications = NotificationSubscriber(REDIS_URL, NOTIFY_CHANNEL)
+        self.alert_task = None
+
+    async def setup_hook(self):
+        init_tracing()
+        await self.api.start()
+        if STATUS_CHANNEL_ID:
+            self.alert_task = asyncio.create_task(relay_alerts())
+
+    async def close(self):
+        if self.alert_task:
+            self.alert_task.cancel()
+        await self.notifications.close()
+        await self.api.close()
+        shutdown_tracing()
+        await super().close()
+
 
 # Bot setup
 intents = discord.Intents.default()
 intents.message_content = True
-bot = commands.Bot(command_prefix="!", intents=intents)
+bot = ChaosBot(command_prefix="!", intents=intents)
 
 
 # =============================================================================
 # HELPER FUNCTIONS
 # =============================================================================
 
-async def api_request(endpoint: str, method: str = "GET", data: dict = None) -> dict:
+async def api_request(
+    endpoint: str,
+    method: str = "GET",
+    data: dict = None,
+    params: dict = None
+) -> dict:
     """Make request to Chaos AI API"""
-    async with aiohttp.ClientSession() as session:
-        url = f"{CHAOS_API_URL}{endpoint}"
-        try:
-            if method == "GET":
-                async with session.get(url, timeout=30) as resp:
-                    if resp.status == 200:
-                        return await resp.json()
-                    return {"error": f"HTTP {resp.status}"}
-            elif method == "POST":
-                async with session.post(url, json=data, timeout=30) as resp:
-                    if resp.status == 200:
-                        return await resp.json()
-                    return {"error": f"HTTP {resp.status}"}
-        except asyncio.TimeoutError:
-            return {"error": "Request timeout"}
-        except Exception as e:
-            return {"error": str(e)}
+    return await bot.api.request(endpoint, method=method, data=data, params=params)
 
 
 # =============================================================================
@@ -66,10 +87,6 @@ async def on_ready():
         print(f"📝 Synced {len(synced)} slash commands")
     except Exception as e:
         print(f"❌ Failed to sync commands: {e}")
-    
-    # Start background tasks
-    if STATUS_CHANNEL_ID:
-        server_status_loop.start()
 
 
 # =============================================================================
@@ -81,10 +98,9 @@ async def status(interaction: discord.Interaction):
     """Check server status"""
     await interaction.response.defer()
     
-    health = await api_request("/health")
-    players = await api_request("/players")
+    snapshot = await api_request("/status")
     
-    is_healthy = health.get("status") == "healthy"
+    is_healthy = snapshot.get("status") == "healthy"
     
     embed = discord.Embed(
         title="🎮 Chaos AI Server Status",
@@ -99,14 +115,23 @@ async def status(interaction: discord.Interaction):
     )
     embed.add_field(
         name="Players", 
-        value=f"{players.get('count', 0)} online", 
+        value=f"{snapshot.get('count', 0)} online", 
         inline=True
     )
+    if snapshot.get("tps") is not None:
+        embed.add_field(name="TPS", value=f"{snapshot['tps']:.1f}", inline=True)
     
-    if players.get('players'):
+    if snapshot.get('players'):
         embed.add_field(
             name="Player List",
-            value=", ".join(players['players']) or "None",
+            value=", ".join(snapshot['players']) or "None",
+            inline=False
+        )
+    
+    if snapshot.get("recent_events"):
+        embed.add_field(
+            name="Recent Chaos",
+            value="\n".join(e["event"] for e in snapshot["recent_events"][:3]),
             inline=False
         )
     
@@ -119,11 +144,7 @@ async def chaos(interaction: discord.Interaction, event: str = None):
     """Trigger chaos event"""
     await interaction.response.defer()
     
-    endpoint = "/chaos/trigger"
-    if event:
-        endpoint += f"?event_name={event}"
-    
-    result = await api_request(endpoint, method="POST")
+    result = await api_request("/chaos/trigger", method="POST", params={"event_name": event})
     
     if "error" in result:
         embed = discord.Embed(
@@ -190,7 +211,7 @@ async def debate(interaction: discord.Interaction, topic: str):
     """Start AI debate"""
     await interaction.response.defer()
     
-    result = await api_request(f"/ai/debate?topic={topic}", method="POST")
+    result = await api_request("/ai/debate", method="POST", params={"topic": topic})
     
     if "error" in result:
         await interaction.followup.send(f"❌ Error: {result['error']}")
@@ -203,7 +224,10 @@ async def debate(interaction: discord.Interaction, topic: str):
         timestamp=datetime.now()
     )
     
-    for persona, response in result.items():
+    if result.get("status") == "queued":
+        embed.add_field(name="Queued", value="The debate is playing in-game now.", inline=False)
+
+    for persona, response in result.get("responses", {}).items():
         if persona in ["oracle", "architect", "explorer"]:
             names = {
                 "oracle": "🔮 Oracle (Claude)",
@@ -227,6 +251,10 @@ async def quest(interaction: discord.Interaction, player: str):
     
     result = await api_request(f"/quest/generate/{player}", method="POST")
     
+    if "error" in result:
+        await interaction.followup.send(f"❌ Error: {result['error']}")
+        return
+    
     embed = discord.Embed(
         title=f"📜 Quest for {player}",
         color=discord.Color.gold()
@@ -239,6 +267,30 @@ async def quest(interaction: discord.Interaction, player: str):
     await interaction.followup.send(embed=embed)
 
 
+@bot.tree.command(name="complete", description="Mark a player's quest as complete")
+@app_commands.describe(player="Minecraft username")
+async def complete(interaction: discord.Interaction, player: str):
+    """Complete quest"""
+    await interaction.response.defer()
+    
+    result = await api_request(f"/quest/{player}", method="DELETE")
+    
+    if "error" in result:
+        message = "No active quest" if result.get("status") == 404 else result["error"]
+        await interaction.followup.send(f"❌ {player}: {message}")
+        return
+    
+    quest = result.get("quest", {})
+    embed = discord.Embed(
+        title=f"✅ Quest Complete: {quest.get('title', 'Unknown Quest')}",
+        description=f"**{player}** earned: {quest.get('reward', 'Glory')}",
+        color=discord.Color.green(),
+        timestamp=datetime.now()
+    )
+    
+    await interaction.followup.send(embed=embed)
+
+
 @bot.tree.command(name="whitelist", description="Manage server whitelist")
 @app_commands.describe(
     action="Add, remove, or list",
@@ -311,28 +363,75 @@ async def events(interaction: discord.Interaction):
 # BACKGROUND TASKS
 # =============================================================================
 
-@tasks.loop(minutes=30)
-async def server_status_loop():
-    """Post server status periodically"""
-    if not STATUS_CHANNEL_ID:
-        return
-        
-    channel = bot.get_channel(int(STATUS_CHANNEL_ID))
-    if not channel:
-        return
-    
-    health = await api_request("/health")
-    
-    if health.get("status") != "healthy":
+def alert_embed(note: dict):
+    """Render a controller notification, or None for types we don't post"""
+    kind = note.get("type")
+    server = note.get("server") or ", ".join(note.get("servers", []))
+    timestamp = datetime.now()
+
+    if kind == "server_down":
         embed = discord.Embed(
             title="🚨 SERVER ALERT",
-            description="Server appears to be having issues!",
+            description=f"**{server}** is not responding to RCON!",
             color=discord.Color.red(),
-            timestamp=datetime.now()
+            timestamp=timestamp
+        )
+        embed.add_field(name="Detail", value=note.get("detail", "unknown")[:1024])
+        return embed
+    if kind == "server_up":
+        return discord.Embed(
+            title="✅ Server Recovered",
+            description=f"**{server}** is responding again.",
+            color=discord.Color.green(),
+            timestamp=timestamp
+        )
+    if kind == "redis_up":
+        return discord.Embed(
+            title="✅ Redis Recovered",
+            description="The controller can reach Redis again; alerts may have been missed.",
+            color=discord.Color.green(),
+            timestamp=timestamp
+        )
+    if kind in ("player_join", "player_leave"):
+        verb = "joined" if kind == "player_join" else "left"
+        return discord.Embed(
+            description=f"{'📥' if kind == 'player_join' else '📤'} **{note.get('player')}** {verb} {server}",
+            color=discord.Color.blurple(),
+            timestamp=timestamp
+        )
+    if kind == "chaos":
+        return discord.Embed(
+            title="⚡ CHAOS EVENT",
+            description=f"**{note.get('event')}** hit {server}",
+            color=discord.Color.orange(),
+            timestamp=timestamp
+        )
+    if kind == "quest_completed":
+        return discord.Embed(
+            title="🏆 Quest Completed",
+            description=f"**{note.get('player')}** completed *{note.get('quest') or 'a quest'}*",
+            color=discord.Color.gold(),
+            timestamp=timestamp
         )
-        embed.add_field(name="RCON", value=health.get("rcon", "unknown"))
-        embed.add_field(name="Redis", value=health.get("redis", "unknown"))
-        await channel.send(embed=embed)
+    return None
+
+
+async def relay_alerts():
+    """Post controller push notifications to the status channel as they arrive"""
+    await bot.wait_until_ready()
+    channel = bot.get_channel(int(STATUS_CHANNEL_ID))
+    if not channel:
+        print(f"❌ Status channel {STATUS_CHANNEL_ID} not found; alerts disabled")
+        return
+
+    async for note in bot.notifications.messages():
+        embed = alert_embed(note)
+        if embed is None:
+            continue
+        try:
+            await channel.send(embed=embed)
+        except discord.HTTPException as e:
+            print(f"❌ Failed to post alert: {e}")
 
 
 # =============================================================================
@@ -0,0 +1,64 @@
+"""
+CONTROLLER NOTIFICATIONS
+Subscribes to the controller's Redis pub/sub channel for push alerts
+"""
+
+import json
+import asyncio
+from typing import AsyncIterator, Dict, Optional
+
+import redis.asyncio as redis
+from redis.exceptions import ConnectionError as RedisConnectionError, TimeoutError as RedisTimeoutError
+
+# =============================================================================
+# CONFIGURATION
+# =============================================================================
+
+# Reconnect delays after losing Redis, doubling up to the cap
+RECONNECT_DELAY = 1
+MAX_RECONNECT_DELAY = 30
+
+# =============================================================================
+# SUBSCRIBER
+# =============================================================================
+
+class NotificationSubscriber:
+    """
+    Long-lived subscription to the controller's alert channel
+
+    Messages are yielded as dicts; a dropped Redis connection is retried
+    with backoff so the bot keeps listening across Redis restarts.
+    """
+
+    def __init__(self, redis_url: str, channel: str = "chaos:notify"):
+        self.redis_url = redis_url
+        self.channel = channel
+        self.client: Optional[redis.Redis] = None
+
+    async def close(self) -> None:
+        if self.client is not None:
+            await self.client.close()
+            self.client = None
+
+    async def messages(self) -> AsyncIterator[Dict]:
+        """Yield notifications forever, reconnecting as needed"""
+        delay = RECONNECT_DELAY
+        while True:
+            try:
+                if self.client is None:
+                    self.client = redis.from_url(self.redis_url, decode_responses=True)
+                async with self.client.pubsub() as pubsub:
+                    await pubsub.subscribe(self.channel)
+                    print(f"📡 Listening for alerts on {self.channel}")
+                    delay = RECONNECT_DELAY
+                    async for message in pubsub.listen():
+                        if message.get("type") != "message":
+                            continue
+                        try:
+                            yield json.loads(message["data"])
+                        except ValueError:
+                            print(f"Ignoring malformed notification: {message['data']!r}")
+            except (RedisConnectionError, RedisTimeoutError, OSError) as e:
+                print(f"Alert subscription lost ({e}), retrying in {delay}s")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, MAX_RECONNECT_DELAY)
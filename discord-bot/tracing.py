@@ -0,0 +1,42 @@
+"""
+TRACING
+OpenTelemetry setup for the bot; API calls start traces the controller continues
+
+TRACE_EXPORTER selects where spans go: none (default), otlp (the standard
+OTEL_EXPORTER_OTLP_ENDPOINT, default http://localhost:4318) or file
+(JSON lines in TRACE_FILE).
+"""
+
+import os
+
+from opentelemetry import trace
+from opentelemetry.sdk.resources import Resource
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter
+
+TRACE_EXPORTER = os.getenv("TRACE_EXPORTER", "none")  # none | otlp | file
+TRACE_FILE = os.getenv("TRACE_FILE", "traces.jsonl")
+
+tracer = trace.get_tracer("chaos-discord-bot")
+
+
+def init_tracing(service_name: str = "chaos-discord-bot") -> None:
+    """Install the tracer provider; call once at startup"""
+    provider = TracerProvider(resource=Resource.create({
+        "service.name": os.getenv("OTEL_SERVICE_NAME", service_name)
+    }))
+    if TRACE_EXPORTER == "otlp":
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter()))
+    elif TRACE_EXPORTER == "file":
+        out = open(TRACE_FILE, "a", encoding="utf-8")
+        exporter = ConsoleSpanExporter(out=out, formatter=lambda span: span.to_json(indent=None) + "\n")
+        provider.add_span_processor(BatchSpanProcessor(exporter))
+    trace.set_tracer_provider(provider)
+
+
+def shutdown_tracing() -> None:
+    """Flush buffered spans"""
+    provider = trace.get_tracer_provider()
+    if isinstance(provider, TracerProvider):
+        provider.shutdown()